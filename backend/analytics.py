@@ -0,0 +1,165 @@
+"""
+Columnar counts over the DSAR and report logs: filter, group by and count, optionally per time bucket.
+
+Every storage chunk (a sealed month, or the open rows) is dictionary-encoded once into NumPy
+code arrays plus the distinct values, and kept until the chunk changes. A query turns each
+filter into a boolean lookup over the distinct values, gathers it through the codes, folds the
+group-by codes into one integer key per row and counts the keys with np.unique, chunk by chunk.
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+# Queryable tables: file, timestamp column used for since/until and buckets, filterable/groupable columns
+ANALYTICS_TABLES = {
+    'mail_replies': ('mail_replies.csv', 'received_at', [
+        'intent', 'otp_status', 'action_status', 'customer_id',
+    ]),
+    'reports_sent': ('reports_sent.csv', 'generated_at', [
+        'report_type', 'incident_id', 'delivery_channel', 'delivery_status', 'generated_by', 'customer_id', 'request_id',
+    ]),
+}
+BUCKETS = ('day', 'week', 'month')
+MAX_GROUPS = 10000
+
+
+def _encode(column):
+    lookup = {}
+    codes = [lookup.setdefault(value, len(lookup)) for value in column]
+    return np.array(codes, dtype=np.int32), list(lookup)
+
+
+def _bucket(day, bucket):
+    """Label of the bucket a 'YYYY-MM-DD' string falls in; None for a missing or malformed date."""
+    try:
+        parsed = date.fromisoformat(day)
+    except ValueError:
+        return None
+    if bucket == 'day':
+        return day
+    if bucket == 'week':
+        # ISO weeks, labelled by their Monday
+        return (parsed - timedelta(days=parsed.weekday())).isoformat()
+    return day[:7]
+
+
+class ColumnarChunk:
+    """One storage chunk as codes[field] (int32 per row) indexing values[field] (the distinct values)."""
+
+    def __init__(self, columns, time_field):
+        self.codes = {}
+        self.values = {}
+        for field, column in columns.items():
+            if field == time_field:
+                # Day precision: a few hundred distinct values instead of one per row
+                column = [value[:10] for value in column]
+            self.codes[field], self.values[field] = _encode(column)
+        self.rows = len(self.codes[time_field])
+
+    def lookup(self, field, accepts):
+        """Boolean mask of the rows whose field value passes accepts."""
+        table = np.fromiter((accepts(v) for v in self.values[field]), dtype=bool, count=len(self.values[field]))
+        return table[self.codes[field]]
+
+    def count(self, filters, time_field, since, until, group_by, bucket):
+        """{labels tuple: count} of the rows matching filters and [since, until), by group_by (+ bucket)."""
+        mask = np.ones(self.rows, dtype=bool)
+        for field, wanted in filters.items():
+            mask &= self.lookup(field, wanted.__contains__)
+        if since is not None or until is not None:
+            mask &= self.lookup(time_field, lambda day: day != '' and (since is None or day >= since) and (until is None or day < until))
+        keys = [(self.codes[field], self.values[field]) for field in group_by]
+        if bucket is not None:
+            labels = [_bucket(day, bucket) for day in self.values[time_field]]
+            bucket_codes, bucket_labels = _encode(labels)
+            keys.insert(0, (bucket_codes[self.codes[time_field]], bucket_labels))
+        if not keys:
+            return {(): int(mask.sum())}
+        if np.prod([float(len(values)) for _, values in keys]) >= 2 ** 63:
+            raise ValueError("Too many group_by combinations")
+        combined = np.zeros(int(mask.sum()), dtype=np.int64)
+        for codes, values in keys:
+            combined = combined * len(values) + codes[mask]
+        found, counts = np.unique(combined, return_counts=True)
+        result = {}
+        for key, count in zip(found.tolist(), counts.tolist()):
+            labels = []
+            for codes, values in reversed(keys):
+                key, code = divmod(key, len(values))
+                labels.append(values[code])
+            result[tuple(reversed(labels))] = count
+        return result
+
+
+class Analytics:
+    """Query entry point; encoded chunks are cached per storage chunk key and rebuilt only when it changes."""
+
+    def __init__(self, csv_mgr):
+        self.csv_mgr = csv_mgr
+        self._chunks = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name, since=None, until=None):
+        filename, time_field, dimensions = ANALYTICS_TABLES[name]
+        fields = [time_field] + dimensions
+        chunks = self.csv_mgr.storage.column_chunks(filename, fields, since, until)
+        with self._lock:
+            cache = self._chunks.setdefault(name, {})
+            loaded = []
+            for key, load in chunks:
+                chunk = cache.get(key)
+                if chunk is None:
+                    chunk = cache[key] = ColumnarChunk(load(), time_field)
+                loaded.append(chunk)
+            # A listed key supersedes the other versions of its chunk (same first two items),
+            # and a query without a range lists every chunk, so anything else is stale
+            listed = {key for key, _ in chunks}
+            slots = {key[:2] for key in listed}
+            for key in set(cache) - listed:
+                if key[:2] in slots or (since is None and until is None):
+                    del cache[key]
+        return loaded
+
+    def query(self, table, filters=None, since=None, until=None, group_by=None, bucket=None, order='key', limit=1000):
+        """Count rows of table (an ANALYTICS_TABLES name) matching filters ({field: value or [values]})
+        and the [since, until) date range, grouped by the group_by fields and the time bucket.
+
+        Raises ValueError for unknown tables, fields, buckets or orders.
+        """
+        started = time.monotonic()
+        if table not in ANALYTICS_TABLES:
+            raise ValueError(f"Unknown table {table!r}; expected one of {', '.join(ANALYTICS_TABLES)}")
+        _, time_field, dimensions = ANALYTICS_TABLES[table]
+        filters = {field: {wanted} if isinstance(wanted, str) else set(wanted) for field, wanted in (filters or {}).items()}
+        group_by = list(group_by or [])
+        for field in list(filters) + group_by:
+            if field not in dimensions:
+                raise ValueError(f"Unknown field {field!r} for {table}; expected one of {', '.join(dimensions)}")
+        if bucket is not None and bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        if order not in ('key', 'count'):
+            raise ValueError("order must be key or count")
+        if not 1 <= limit <= MAX_GROUPS:
+            raise ValueError(f"limit must be between 1 and {MAX_GROUPS}")
+        since = since[:10] if since else None
+        until = until[:10] if until else None
+
+        totals = {}
+        for chunk in self._load(table, since, until):
+            for labels, count in chunk.count(filters, time_field, since, until, group_by, bucket).items():
+                totals[labels] = totals.get(labels, 0) + count
+        columns = (['bucket'] if bucket is not None else []) + group_by
+        ordered = sorted(totals.items(), key=lambda item: [(label is None, label or '') for label in item[0]])
+        if order == 'count':
+            # Stable, so equal counts stay in key order
+            ordered.sort(key=lambda item: -item[1])
+        groups = [{**dict(zip(columns, labels)), 'count': count} for labels, count in ordered[:limit]]
+        return {
+            'table': table,
+            'total': sum(totals.values()),
+            'groups': groups,
+            'truncated': len(ordered) > limit,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        }
@@ -0,0 +1,86 @@
+"""
+PDF renders per second per core, for each document kind, through platypus and the canvas fast path.
+
+    python backend/benchmarks/bench_pdf_render.py --seconds 3 --workers 4
+
+Each kind is rendered repeatedly in this process for --seconds (one core). With --workers,
+the same renders are also spread over a process pool and the aggregate rate divided by the
+number of workers, which shows how close the pool gets to linear scaling.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_service import CANVAS_DOCUMENTS, render_canvas, render_documents, render_story  # noqa: E402
+
+GENERATED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+CUSTOMER = {
+    'customer_id': 'CUST-0001', 'name': 'Aarav Sharma', 'email': 'aarav.sharma@example.com', 'phone': '9876543210',
+    'status': 'ACTIVE', 'created_at': '2026-01-01T00:00:00+00:00', 'updated_at': '2026-01-02T00:00:00+00:00',
+}
+INCIDENT = {
+    'incident_id': 'INC-001', 'discovery_time': '2026-01-01T00:00:00+00:00', 'nature': 'Unauthorized access',
+    'systems': 'Customer Database', 'categories': 'Name, Email, Phone', 'affected_count': 1200,
+}
+DOCUMENT_ARGS = {
+    'data_export': (CUSTOMER,),
+    'deletion_certificate': ('CUST-0001', ['name', 'email', 'phone']),
+    'correction_confirmation': ('CUST-0001', CUSTOMER, {**CUSTOMER, 'name': 'Aarav S. Sharma', 'phone': '9123456789'}),
+    'customer_breach_notice': (INCIDENT, CUSTOMER),
+    'dpb_notice': (INCIDENT,),
+    'audit_report': (INCIDENT, None),
+}
+
+
+def rate(render, kind, args, seconds):
+    render(kind, GENERATED_AT, *args)  # warm up fonts and cached fragments
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        render(kind, GENERATED_AT, *args)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def pool_rate(pool, workers, kind, args, seconds):
+    """Aggregate renders/s over the pool, one chunk per worker sized from the single-core rate."""
+    chunk = max(1, int(rate(render_story if kind not in CANVAS_DOCUMENTS else render_canvas, kind, args, 0.5) * seconds))
+    list(pool.map(render_documents, [kind] * workers, [GENERATED_AT] * workers, [[args]] * workers))
+    started = time.perf_counter()
+    list(pool.map(render_documents, [kind] * workers, [GENERATED_AT] * workers, [[args] * chunk] * workers))
+    return chunk * workers / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--workers', type=int, default=0, help='also measure a process pool of this size')
+    args = parser.parse_args()
+
+    pool = None
+    if args.workers:
+        pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'))
+    print(f"{'kind':<26}{'platypus/s':>12}{'canvas/s':>10}{'speedup':>9}" + (f"{'pool/s/core':>13}" if pool else ''))
+    for kind, doc_args in DOCUMENT_ARGS.items():
+        story = rate(render_story, kind, doc_args, args.seconds)
+        line = f"{kind:<26}{story:>12.0f}"
+        if kind in CANVAS_DOCUMENTS:
+            fast = rate(render_canvas, kind, doc_args, args.seconds)
+            line += f"{fast:>10.0f}{fast / story:>8.1f}x"
+        else:
+            line += f"{'-':>10}{'-':>9}"
+        if pool:
+            line += f"{pool_rate(pool, args.workers, kind, doc_args, args.seconds) / args.workers:>13.0f}"
+        print(line)
+    if pool:
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Resident memory per customer row: csv.DictReader dicts vs the compact tuple-backed _Table.
+
+    python backend/benchmarks/bench_row_memory.py --rows 200000
+"""
+import argparse
+import csv
+import gc
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from csv_manager import CUSTOMER_HEADERS, INDIAN_NAMES, TABLE_INDEXES  # noqa: E402
+from storage import CSVStorage  # noqa: E402
+
+
+def write_customers(path, n):
+    rng = random.Random(42)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CUSTOMER_HEADERS)
+        for i in range(1, n + 1):
+            name = rng.choice(INDIAN_NAMES)
+            writer.writerow([
+                f"CUST-{i:07d}", name, f"{name.lower().replace(' ', '.')}{i}@example.com",
+                f"+91 {rng.randint(70000, 99999)} {rng.randint(10000, 99999)}",
+                rng.choice(['ACTIVE', 'ACTIVE', 'ACTIVE', 'DELETED']),
+                '2026-01-01T00:00:00', '2026-01-01T00:00:00',
+            ])
+
+
+def measure(load):
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        write_customers(data_dir / 'customers.csv', args.rows)
+
+        def load_dicts():
+            with open(data_dir / 'customers.csv', newline='', encoding='utf-8') as f:
+                return list(csv.DictReader(f))
+
+        def load_compact(indexes):
+            storage = CSVStorage(data_dir, {}, indexes=indexes)
+            storage.fieldnames('customers.csv')
+            return storage
+
+        dict_bytes, rows = measure(load_dicts)
+        del rows
+        compact_bytes, storage = measure(lambda: load_compact({}))
+        del storage
+        indexed_bytes, storage = measure(lambda: load_compact(TABLE_INDEXES))
+        del storage
+
+    print(f"rows:            {args.rows}")
+    print(f"list of dicts:   {dict_bytes / args.rows:8.1f} B/row  ({dict_bytes / 2**20:.1f} MiB)")
+    print(f"compact tuples:  {compact_bytes / args.rows:8.1f} B/row  ({compact_bytes / 2**20:.1f} MiB)")
+    print(f"  + id/email idx:{indexed_bytes / args.rows:8.1f} B/row  ({indexed_bytes / 2**20:.1f} MiB)")
+    print(f"ratio (rows):    {dict_bytes / compact_bytes:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
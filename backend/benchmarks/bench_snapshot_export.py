@@ -0,0 +1,84 @@
+"""
+Size and load time of each table as CSV, gzipped CSV, Parquet and Arrow IPC snapshots.
+
+    python backend/benchmarks/bench_snapshot_export.py --customers 200000 --requests 200000 --reports 100000
+
+Load times are for reading the whole file back into memory: csv.DictReader and pyarrow's CSV
+reader for the CSV files, pyarrow for the snapshots.
+"""
+import argparse
+import csv
+import gzip
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pyarrow as pa  # noqa: E402
+import pyarrow.csv as pa_csv  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+import synthetic  # noqa: E402
+from csv_manager import CSVManager  # noqa: E402
+from snapshot_export import snapshot_name, write_snapshot  # noqa: E402
+
+TABLES = ['customers.csv', 'mail_replies.csv', 'reports_sent.csv']
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def load_dicts(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def load_dicts_gzip(path):
+    with gzip.open(path, 'rt', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--reports', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        mgr = CSVManager(tmp / 'data')
+        synthetic.generate(mgr, args.customers, args.requests, args.reports, seed=1)
+        out = tmp / 'out'
+        out.mkdir()
+
+        print(f"{'table':<18}{'format':<14}{'size MiB':>10}{'write s':>9}{'load s':>9}  loader")
+        for table in TABLES:
+            results = []
+            csv_path = out / table
+            write_s, _ = timed(lambda: csv_path.write_bytes(b''.join(mgr.iter_csv(table))))
+            results.append(('csv', csv_path, write_s, load_dicts, 'csv.DictReader'))
+            results.append(('csv', csv_path, write_s, pa_csv.read_csv, 'pyarrow.csv'))
+            gz_path = out / (table + '.gz')
+            write_s, _ = timed(lambda: gz_path.write_bytes(gzip.compress(csv_path.read_bytes(), 6)))
+            results.append(('csv.gz', gz_path, write_s, load_dicts_gzip, 'csv.DictReader'))
+            for fmt, loader, name in [
+                ('parquet', pq.read_table, 'pyarrow.parquet'),
+                ('arrow', lambda p: pa.ipc.open_file(str(p)).read_all(), 'pyarrow.ipc'),
+            ]:
+                path = out / snapshot_name(table, fmt)
+                write_s, _ = timed(lambda: write_snapshot(mgr, table, str(path), fmt))
+                results.append((fmt, path, write_s, loader, name))
+            for fmt, path, write_s, loader, name in results:
+                load_s, _ = timed(lambda: loader(path))
+                size = path.stat().st_size / 2**20
+                print(f"{table:<18}{fmt:<14}{size:>10.1f}{write_s:>9.2f}{load_s:>9.2f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,22 @@
+import asyncio
+import contextlib
 import csv
+import functools
+import io
+import json
 import os
 import re
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
 import random
 import logging
 
+import pandas as pd
+
+from storage import CSVStorage, SQLiteStorage, SQLITE_FILENAME, LOCKS_DIRNAME, file_lock
+
 logger = logging.getLogger(__name__)
 
 CUSTOMER_HEADERS = ['customer_id','name','email','phone','status','created_at','updated_at']
@@ -14,6 +24,13 @@ MAIL_REPLIES_HEADERS = ['request_id','received_at','from_email','subject','body'
 ADMIN_ACCESS_HEADERS = ['session_id','admin_email','login_time','logout_time','ip_address','device']
 REPORTS_SENT_HEADERS = ['report_id','generated_at','generated_by','report_type','incident_id','request_id','customer_id','recipient','delivery_channel','delivery_status','pdf_filename','pdf_sha256','notes']
 
+SCHEMAS = {
+    'customers.csv': CUSTOMER_HEADERS,
+    'mail_replies.csv': MAIL_REPLIES_HEADERS,
+    'admin_access.csv': ADMIN_ACCESS_HEADERS,
+    'reports_sent.csv': REPORTS_SENT_HEADERS,
+}
+
 INDIAN_NAMES = [
     "Aarav Sharma", "Priya Patel", "Vivaan Gupta", "Ananya Singh", "Aditya Kumar",
     "Ishita Reddy", "Arjun Nair", "Diya Joshi", "Rohan Mehta", "Kavya Iyer",
@@ -34,115 +51,345 @@ INDIAN_PHONES = [
     "6998765432", "6887654321", "6776543210", "6665432109", "6554321098"
 ]
 
+# Fields kept in a hash index per table, with the normaliser applied to keys
+TABLE_INDEXES = {
+    'customers.csv': {'customer_id': None, 'email': str.lower},
+}
+
+# Multi-valued secondary indexes behind search and keyed updates; kinds are defined in search_index
+SEARCH_INDEXES = {
+    'customers.csv': {'status': 'bucket', 'phone': 'phone', 'name': 'tokens'},
+    'mail_replies.csv': {'request_id': 'exact'},
+    'reports_sent.csv': {'report_id': 'exact', 'pdf_filename': 'exact', 'pdf_sha256': 'exact'},
+}
+
+# Columns whose value counts are kept current on every write, for the dashboard
+COUNTERS = {
+    'customers.csv': ['status'],
+    'mail_replies.csv': ['intent', 'action_status'],
+    'reports_sent.csv': ['report_type', 'delivery_status'],
+}
+
+# Append-only logs split into monthly partitions on this timestamp column; months before the
+# PARTITION_HOT_MONTHS most recent are sealed read-only and compressed
+PARTITIONS = {
+    'admin_access.csv': 'login_time',
+    'mail_replies.csv': 'received_at',
+    'reports_sent.csv': 'generated_at',
+}
+PARTITION_HOT_MONTHS = 2
+# Rows in these workflow states are still updated, so they stay open whatever their month.
+# received_at is the client's Date header, which can be months old.
+OPEN_STATES = {
+    'mail_replies.csv': ('action_status', {'PENDING', 'NEEDS_INFO'}),
+}
+
+# Column whose value is used as the pagination cursor for each table
+ROW_KEYS = {
+    'customers.csv': 'customer_id',
+    'mail_replies.csv': 'request_id',
+    'admin_access.csv': 'session_id',
+    'reports_sent.csv': 'report_id',
+}
+
+# ID prefixes handed out by the sequence allocator: table, ID column and zero-padding width
+ID_SEQUENCES = {
+    'CUST-': ('customers.csv', 'customer_id', 4),
+    'REP-': ('reports_sent.csv', 'report_id', 6),
+}
+SEQUENCES_FILE = '.sequences.json'
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 1000
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+# 10-digit Indian mobile number, optionally prefixed with +91 / 91 / 0
+PHONE_RE = re.compile(r'^(?:\+?91|0)?[6-9]\d{9}$')
+PHONE_SEPARATORS_RE = re.compile(r'[\s()-]')
+
+
+class Transaction:
+    """Appends and updates buffered across tables, applied together when the transaction commits."""
+
+    def __init__(self):
+        self.ops = []
+
+    def append_row(self, filename, row_dict):
+        self.ops.append(('append', filename, dict(row_dict)))
+
+    def update_row(self, filename, key_field, key_value, updates):
+        self.ops.append(('update', filename, key_field, key_value, dict(updates)))
+
 
 class CSVManager:
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, journal=False, backend='csv', multiprocess=False, hot_months=PARTITION_HOT_MONTHS):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self._lock = threading.Lock()
-        self._init_csvs()
-
-    def _init_csvs(self):
-        schemas = {
-            'customers.csv': CUSTOMER_HEADERS,
-            'mail_replies.csv': MAIL_REPLIES_HEADERS,
-            'admin_access.csv': ADMIN_ACCESS_HEADERS,
-            'reports_sent.csv': REPORTS_SENT_HEADERS,
-        }
-        for filename, headers in schemas.items():
-            filepath = self.data_dir / filename
-            if not filepath.exists():
-                with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(headers)
+        self.backend = backend
+        self.multiprocess = multiprocess
+        if multiprocess:
+            (self.data_dir / LOCKS_DIRNAME).mkdir(exist_ok=True)
+        if backend == 'csv':
+            self.storage = CSVStorage(self.data_dir, SCHEMAS, indexes=TABLE_INDEXES, journal=journal,
+                                      multiprocess=multiprocess, search_indexes=SEARCH_INDEXES, counters=COUNTERS,
+                                      partitions=PARTITIONS, hot_months=hot_months, open_states=OPEN_STATES)
+        elif backend == 'sqlite':
+            self.storage = SQLiteStorage(self.data_dir / SQLITE_FILENAME, SCHEMAS, import_dir=self.data_dir,
+                                         search_indexes=SEARCH_INDEXES, counters=COUNTERS, partitions=PARTITIONS)
+        else:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        self._seq_lock = threading.Lock()
+        self._sequences = self._recover_sequences()
 
     def read_csv(self, filename):
-        filepath = self.data_dir / filename
-        if not filepath.exists():
-            return []
-        with self._lock:
-            with open(filepath, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                return list(reader)
+        return self.storage.read(filename)
+
+    def snapshot(self, filename):
+        """Immutable point-in-time view of a table for read-only consumers; rows must not be mutated."""
+        return self.storage.snapshot(filename)
 
     def append_row(self, filename, row_dict):
-        filepath = self.data_dir / filename
-        with self._lock:
-            with open(filepath, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                fieldnames = reader.fieldnames
-            with open(filepath, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writerow(row_dict)
+        self.storage.append(filename, row_dict)
 
     def update_row(self, filename, key_field, key_value, updates):
-        filepath = self.data_dir / filename
-        with self._lock:
-            rows = []
-            fieldnames = None
-            with open(filepath, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                fieldnames = reader.fieldnames
-                rows = list(reader)
-            updated = False
-            for row in rows:
-                if row.get(key_field) == key_value:
-                    row.update(updates)
-                    updated = True
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(rows)
-            return updated
+        return self.storage.update(filename, key_field, key_value, updates)
+
+    def append_rows(self, filename, rows):
+        """Append many rows with one buffered write."""
+        self.storage.append_many(filename, rows)
 
     def write_csv(self, filename, rows, headers=None):
-        filepath = self.data_dir / filename
-        with self._lock:
-            if not headers and filepath.exists():
-                with open(filepath, 'r', newline='', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    headers = reader.fieldnames
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(rows)
+        self.storage.write(filename, rows, headers)
 
-    def get_next_id(self, filename, id_field, prefix):
-        rows = self.read_csv(filename)
-        if not rows:
-            return f"{prefix}0001"
-        ids = [r.get(id_field, '') for r in rows]
-        nums = []
-        for id_val in ids:
-            match = re.search(r'\d+', id_val.replace(prefix, ''))
+    @contextlib.contextmanager
+    def transaction(self):
+        """Buffer writes made through the yielded Transaction; commit them atomically, one rewrite per table.
+
+        Nothing is written if the block raises.
+        """
+        tx = Transaction()
+        yield tx
+        if tx.ops:
+            self.storage.commit(tx.ops)
+
+    def fieldnames(self, filename):
+        return self.storage.fieldnames(filename)
+
+    def iter_csv(self, filename):
+        """Stream a table as CSV bytes, identical to the file the CSV backend keeps on disk."""
+        return self.storage.iter_csv(filename)
+
+    def export(self, filename):
+        """Point-in-time CSVExport of a table: etag and last_modified up front, then the CSV bytes."""
+        return self.storage.export(filename)
+
+    def iter_rows(self, filename, after=None, limit=None, since=None, until=None):
+        """Iterate rows in file order after the cursor row (its ROW_KEYS value). Raises KeyError for an unknown cursor.
+
+        since/until (ISO dates, until exclusive) filter PARTITIONS tables on their timestamp
+        column and skip the sealed months outside the range; ValueError on other tables.
+        """
+        return self.storage.iter_rows(filename, ROW_KEYS.get(filename), after, limit, since, until)
+
+    def read_page(self, filename, limit, after=None, since=None, until=None):
+        return list(self.iter_rows(filename, after, limit, since, until))
+
+    def counts(self, filename):
+        """Row count plus per-value counts of the table's COUNTERS columns."""
+        return self.storage.counts(filename)
+
+    def compact(self, filename):
+        return self.storage.compact(filename)
+
+    def seal_partitions(self):
+        """Seal the PARTITIONS months that have gone cold; returns {filename: months sealed}."""
+        return self.storage.seal_all()
+
+    def start_compactor(self, interval=30):
+        self.storage.start_compactor(interval)
+
+    def stop_compactor(self):
+        self.storage.stop_compactor()
+
+    def _max_id(self, filename, id_field, prefix):
+        nums = [0]
+        for r in self.read_csv(filename):
+            match = re.search(r'\d+', r.get(id_field, '').replace(prefix, ''))
             if match:
                 nums.append(int(match.group()))
-        next_num = max(nums) + 1 if nums else 1
-        return f"{prefix}{next_num:04d}"
+        return max(nums)
+
+    def _load_sequences(self):
+        try:
+            with open(self.data_dir / SEQUENCES_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Unreadable {SEQUENCES_FILE}, recovering ID sequences from the tables")
+            return {}
+
+    def _sequences_locked(self):
+        """Cross-process guard for the read-modify-write of SEQUENCES_FILE. Caller holds _seq_lock."""
+        if not self.multiprocess:
+            return contextlib.nullcontext()
+        return file_lock(self.data_dir / LOCKS_DIRNAME / 'sequences.lock')
+
+    def _recover_sequences(self):
+        """Load persisted counters, never letting one fall behind the highest ID already in its table."""
+        with self._seq_lock, self._sequences_locked():
+            sequences = self._load_sequences()
+            for prefix, (filename, id_field, _width) in ID_SEQUENCES.items():
+                sequences[prefix] = max(sequences.get(prefix, 0), self._max_id(filename, id_field, prefix))
+            self._persist_sequences(sequences)
+            return sequences
+
+    def _persist_sequences(self, sequences):
+        path = self.data_dir / SEQUENCES_FILE
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sequences, f)
+        os.replace(tmp_path, path)
+
+    def reserve_ids(self, prefix, count=1, filename=None, id_field=None):
+        """Atomically allocate the next count IDs for prefix. Allocated IDs are never handed out again."""
+        with self._seq_lock, self._sequences_locked():
+            if self.multiprocess:
+                # Pick up blocks other workers allocated since our last call
+                for key, value in self._load_sequences().items():
+                    self._sequences[key] = max(self._sequences.get(key, 0), value)
+            if prefix not in self._sequences:
+                # Prefix outside ID_SEQUENCES: recover it from its table on first use, if it has one
+                self._sequences[prefix] = self._max_id(filename, id_field, prefix) if filename else 0
+            start = self._sequences[prefix] + 1
+            self._sequences[prefix] += count
+            self._persist_sequences(self._sequences)
+        width = ID_SEQUENCES[prefix][2] if prefix in ID_SEQUENCES else 4
+        return [f"{prefix}{n:0{width}d}" for n in range(start, start + count)]
+
+    def get_next_id(self, filename, id_field, prefix):
+        return self.reserve_ids(prefix, 1, filename, id_field)[0]
 
     def get_next_report_id(self):
-        rows = self.read_csv('reports_sent.csv')
-        if not rows:
-            return "REP-000001"
-        nums = []
-        for r in rows:
-            match = re.search(r'\d+', r.get('report_id', '').replace('REP-', ''))
-            if match:
-                nums.append(int(match.group()))
-        next_num = max(nums) + 1 if nums else 1
-        return f"REP-{next_num:06d}"
+        return self.reserve_ids('REP-')[0]
+
+    def _import_records(self, stream, fmt):
+        """Yield (line, record, error) from a binary CSV or NDJSON stream, one record at a time."""
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            yield from self._parse_records(text, fmt)
+        finally:
+            # Hand the stream back to its owner rather than closing it with the wrapper
+            text.detach()
+
+    def _parse_records(self, text, fmt):
+        if fmt == 'ndjson':
+            for line_no, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield line_no, None, 'invalid JSON'
+                    continue
+                if not isinstance(record, dict):
+                    yield line_no, None, 'expected a JSON object'
+                    continue
+                yield line_no, record, None
+        else:
+            reader = csv.DictReader(text)
+            missing = {'name', 'email', 'phone'} - set(reader.fieldnames or [])
+            if missing:
+                raise ValueError(f"CSV header is missing: {', '.join(sorted(missing))}")
+            for record in reader:
+                yield reader.line_num, record, None
+
+    def _validate_batch(self, batch, seen_emails):
+        """Split a batch of (line, record, error) into customer rows and per-line errors.
+
+        Every check runs over the whole batch as a pandas string column, so the loop at the end
+        only assembles the messages in the order name, email, phone, duplicate.
+        """
+        records = [(line, r) for line, r, error in batch if error is None]
+        errors = [{'line': line, 'error': error} for line, _, error in batch if error is not None]
+        if not records:
+            return [], errors
+        names = pd.Series([str(r.get('name') or '') for _, r in records], dtype=str).str.strip()
+        emails = pd.Series([str(r.get('email') or '') for _, r in records], dtype=str).str.strip()
+        phones = pd.Series([str(r.get('phone') or '') for _, r in records], dtype=str)
+        name_ok = names != ''
+        email_ok = emails.str.fullmatch(EMAIL_RE)
+        # The pattern string, not the compiled object, keeps the replace in the Arrow kernel
+        phone_ok = phones.str.replace(PHONE_SEPARATORS_RE.pattern, '', regex=True).str.fullmatch(PHONE_RE)
+        ok = name_ok & email_ok & phone_ok
+        keys = emails.str.lower()
+        known = pd.Series([row is not None for row in self.storage.find_many('customers.csv', 'email', emails.tolist())])
+        # Only rows that pass the other checks claim an email, as the first of the batch to use it
+        duplicate = ok & (known | keys.isin(seen_emails) | keys.where(ok).duplicated())
+        seen_emails.update(keys[ok & ~duplicate].tolist())
+        valid = []
+        # tolist() once per column: iterating a string Series goes element by element through pandas
+        for (line, record), name, email, good_name, good_email, good_phone, dup in zip(
+                records, names.tolist(), emails.tolist(), name_ok.tolist(), email_ok.tolist(), phone_ok.tolist(), duplicate.tolist()):
+            if not good_name:
+                errors.append({'line': line, 'error': 'name is required'})
+            elif not good_email:
+                errors.append({'line': line, 'error': f'invalid email: {email!r}'})
+            elif not good_phone:
+                errors.append({'line': line, 'error': f"invalid phone: {record.get('phone')!r}"})
+            elif dup:
+                errors.append({'line': line, 'error': f'duplicate email: {email}'})
+            else:
+                valid.append({'name': name, 'email': email, 'phone': str(record.get('phone')).strip()})
+        return valid, errors
+
+    def import_customers(self, stream, fmt='csv', batch_size=IMPORT_BATCH_SIZE):
+        """Bulk-load customers from a CSV (name,email,phone header) or NDJSON byte stream.
+
+        Records are validated and written batch by batch, each batch with one block of CUST- IDs
+        and one buffered append. Bad records are reported by line and skipped; they never abort
+        the import. Only the first IMPORT_MAX_ERRORS errors are listed.
+        """
+        imported, error_count, errors = 0, 0, []
+        seen_emails = set()
+        batch = []
+
+        def flush():
+            nonlocal imported, error_count
+            valid, batch_errors = self._validate_batch(batch, seen_emails)
+            batch.clear()
+            error_count += len(batch_errors)
+            errors.extend(batch_errors[:IMPORT_MAX_ERRORS - len(errors)])
+            if not valid:
+                return
+            now = datetime.now(timezone.utc).isoformat()
+            ids = self.reserve_ids('CUST-', len(valid))
+            self.append_rows('customers.csv', [
+                {'customer_id': cid, **c, 'status': 'ACTIVE', 'created_at': now, 'updated_at': now}
+                for cid, c in zip(ids, valid)
+            ])
+            imported += len(valid)
+
+        for item in self._import_records(stream, fmt):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        errors.sort(key=lambda e: e['line'])
+        return {'imported': imported, 'failed': error_count, 'errors': errors}
 
     def seed_customers(self, count=30):
-        existing = self.read_csv('customers.csv')
-        if len(existing) >= count:
+        existing = self.counts('customers.csv')['rows']
+        if existing >= count:
             return
         now = datetime.now(timezone.utc).isoformat()
-        for i in range(len(existing), count):
+        ids = self.reserve_ids('CUST-', count - existing)
+        customers = []
+        for i, cid in zip(range(existing, count), ids):
             name = INDIAN_NAMES[i % len(INDIAN_NAMES)]
             email_name = name.lower().replace(' ', '.') + f"{i}@example.com"
             phone = INDIAN_PHONES[i % len(INDIAN_PHONES)]
             customer = {
-                'customer_id': f"CUST-{i+1:04d}",
+                'customer_id': cid,
                 'name': name,
                 'email': email_name,
                 'phone': phone,
@@ -150,7 +397,8 @@ class CSVManager:
                 'created_at': now,
                 'updated_at': now,
             }
-            self.append_row('customers.csv', customer)
+            customers.append(customer)
+        self.append_rows('customers.csv', customers)
 
     def seed_sample_incident(self):
         existing = self.read_csv('reports_sent.csv')
@@ -159,10 +407,10 @@ class CSVManager:
 
     def seed_sample_incident_with_pdfs(self, pdf_svc):
         """Seed sample incident WITH actual PDFs generated"""
-        existing = self.read_csv('reports_sent.csv')
-        if existing:
+        if self.counts('reports_sent.csv')['rows']:
             return
         now = datetime.now(timezone.utc).isoformat()
+        rep1, rep2 = self.reserve_ids('REP-', 2)
         sample_incident = {
             'incident_id': 'INC-001',
             'discovery_time': now,
@@ -179,7 +427,7 @@ class CSVManager:
         try:
             pdf_bytes1, sha1, fn1 = pdf_svc.generate_dpb_notice(sample_incident)
             self.append_row('reports_sent.csv', {
-                'report_id': 'REP-000001', 'generated_at': now, 'generated_by': 'SYSTEM',
+                'report_id': rep1, 'generated_at': now, 'generated_by': 'SYSTEM',
                 'report_type': 'DPB_NOTICE', 'incident_id': 'INC-001',
                 'request_id': '', 'customer_id': '', 'recipient': 'dpb@meity.gov.in',
                 'delivery_channel': 'EMAIL', 'delivery_status': 'DELIVERED',
@@ -192,7 +440,7 @@ class CSVManager:
             timeline = [{"time": now, "event": "Breach discovered"}, {"time": now, "event": "Incident closed"}]
             pdf_bytes2, sha2, fn2 = pdf_svc.generate_audit_report(sample_incident, timeline)
             self.append_row('reports_sent.csv', {
-                'report_id': 'REP-000002', 'generated_at': now, 'generated_by': 'SYSTEM',
+                'report_id': rep2, 'generated_at': now, 'generated_by': 'SYSTEM',
                 'report_type': 'AUDIT_REPORT', 'incident_id': 'INC-001',
                 'request_id': '', 'customer_id': '', 'recipient': 'SELF_DOWNLOAD',
                 'delivery_channel': 'DOWNLOAD_ONLY', 'delivery_status': 'DOWNLOADED',
@@ -202,15 +450,105 @@ class CSVManager:
             logging.getLogger(__name__).error(f"Seed Audit PDF error: {e}")
 
     def find_customer(self, customer_id):
-        rows = self.read_csv('customers.csv')
-        for r in rows:
-            if r['customer_id'] == customer_id:
-                return r
-        return None
+        return self.storage.find('customers.csv', 'customer_id', customer_id)
 
     def find_customer_by_email(self, email):
-        rows = self.read_csv('customers.csv')
-        for r in rows:
-            if r.get('email', '').lower() == email.lower():
-                return r
-        return None
+        return self.storage.find('customers.csv', 'email', email)
+
+    def mark_report_downloaded(self, pdf_filename, pdf_sha256=None):
+        """Flag the first not-yet-downloaded report row for pdf_filename as DOWNLOADED.
+
+        pdf_sha256 narrows it to the row that recorded that version of the file. Returns False
+        without writing when there is none, so repeat downloads cost one index lookup. Reports in
+        sealed months are read-only and left as they are.
+        """
+        criteria = {'pdf_filename': pdf_filename, **({'pdf_sha256': pdf_sha256} if pdf_sha256 else {})}
+        for report in self.storage.search('reports_sent.csv', criteria, open_only=True):
+            if report.get('delivery_status') != 'DOWNLOADED':
+                # In journal mode a one-line journal entry, otherwise a rewrite like any other update
+                return self.storage.update('reports_sent.csv', 'report_id', report['report_id'],
+                                           {'delivery_status': 'DOWNLOADED'})
+        return False
+
+    def search_customers(self, criteria, limit=20):
+        """Customers matching every criterion: status (exact), email (exact, any case),
+        phone (digit prefix, with or without +91) and name (words, the last one as a prefix)."""
+        criteria = {k: v for k, v in criteria.items() if v}
+        return self.storage.search('customers.csv', criteria, limit)
+
+
+class AsyncCSVManager:
+    """Awaitable facade over CSVManager that keeps file I/O off the event loop.
+
+    Storage calls run in a small dedicated thread pool, so a long rewrite occupies one
+    of its workers instead of stalling every other request on the loop.
+    """
+
+    def __init__(self, csv_mgr, max_workers=4):
+        self.sync = csv_mgr
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='csv-io')
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def read_csv(self, filename):
+        return await self.run(self.sync.read_csv, filename)
+
+    async def append_row(self, filename, row_dict):
+        return await self.run(self.sync.append_row, filename, row_dict)
+
+    async def update_row(self, filename, key_field, key_value, updates):
+        return await self.run(self.sync.update_row, filename, key_field, key_value, updates)
+
+    async def write_csv(self, filename, rows, headers=None):
+        return await self.run(self.sync.write_csv, filename, rows, headers)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        tx = Transaction()
+        yield tx
+        if tx.ops:
+            await self.run(self.sync.storage.commit, tx.ops)
+
+    async def fieldnames(self, filename):
+        return await self.run(self.sync.fieldnames, filename)
+
+    async def iter_rows(self, filename, after=None, limit=None, since=None, until=None):
+        return await self.run(self.sync.iter_rows, filename, after, limit, since, until)
+
+    async def read_page(self, filename, limit, after=None, since=None, until=None):
+        return await self.run(self.sync.read_page, filename, limit, after, since, until)
+
+    async def counts(self, filename):
+        return await self.run(self.sync.counts, filename)
+
+    async def append_rows(self, filename, rows):
+        return await self.run(self.sync.append_rows, filename, rows)
+
+    async def import_customers(self, stream, fmt='csv'):
+        return await self.run(self.sync.import_customers, stream, fmt)
+
+    async def reserve_ids(self, prefix, count=1):
+        return await self.run(self.sync.reserve_ids, prefix, count)
+
+    async def get_next_id(self, filename, id_field, prefix):
+        return await self.run(self.sync.get_next_id, filename, id_field, prefix)
+
+    async def get_next_report_id(self):
+        return await self.run(self.sync.get_next_report_id)
+
+    async def find_customer(self, customer_id):
+        return await self.run(self.sync.find_customer, customer_id)
+
+    async def find_customer_by_email(self, email):
+        return await self.run(self.sync.find_customer_by_email, email)
+
+    async def mark_report_downloaded(self, pdf_filename, pdf_sha256=None):
+        return await self.run(self.sync.mark_report_downloaded, pdf_filename, pdf_sha256)
+
+    async def search_customers(self, criteria, limit=20):
+        return await self.run(self.sync.search_customers, criteria, limit)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,188 @@
+"""
+Personalised breach notices for every active customer of an incident, as a resumable batch job.
+
+Customers are streamed from customers.csv in file order, BATCH_SIZE at a time. Each batch is
+rendered across the PDF worker pool, stored and aliased in one pass, and recorded with one
+block of REP- IDs and one bulk append to reports_sent.csv. After every batch the job state
+(cursor, counters, status) is written to data/notice_jobs/<job_id>.json, which is also what
+progress is read from. Incident IDs are short and come round again after a reset, so a job is
+identified by the incident ID and its discovery time together (see job_id).
+
+A job interrupted by a crash or restart is resumed from its cursor. Rows of the batch that
+was in flight may already have been recorded; customers whose notice already has a row
+since the job started are skipped, and notices already stored are reused rather than
+rendered again, so a resumed job neither duplicates rows nor changes recorded hashes.
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+
+from pdf_service import DOCUMENTS, render_key
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+JOBS_DIRNAME = 'notice_jobs'
+
+
+def job_id(incident):
+    """Identity of the job for one occurrence of an incident: its ID plus its discovery time."""
+    stamp = re.sub(r'[^0-9A-Za-z]', '', str(incident.get('discovery_time') or ''))
+    return f"{incident['incident_id']}_{stamp}" if stamp else incident['incident_id']
+
+
+class BreachNoticeJobs:
+    """Starts, resumes and reports on one notice job per incident occurrence."""
+
+    def __init__(self, csv_io, pdf_io, batch_size=BATCH_SIZE):
+        self.csv_io = csv_io
+        self.pdf_io = pdf_io
+        self.batch_size = batch_size
+        self.jobs_dir = csv_io.sync.data_dir / JOBS_DIRNAME
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._tasks = {}
+
+    def _path(self, key):
+        return self.jobs_dir / f"{key}.json"
+
+    def _save(self, job):
+        job['updated_at'] = datetime.now(timezone.utc).isoformat()
+        path = self._path(job['job_id'])
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def _read(self, path):
+        """A job's persisted state, or None if there is no such job."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return None
+        # Jobs written before job_id existed are keyed by their file name
+        job.setdefault('job_id', path.stem)
+        job['running'] = job['job_id'] in self._tasks
+        return job
+
+    def status(self, incident_id):
+        """State of the most recently started job for incident_id, or None if none was started."""
+        jobs = [self._read(path) for path in self.jobs_dir.glob(f"{glob.escape(incident_id)}*.json")]
+        jobs = [job for job in jobs if job is not None and job['incident']['incident_id'] == incident_id]
+        return max(jobs, key=lambda job: job['started_at'], default=None)
+
+    async def start(self, incident, channel):
+        """Start (or pick up) the job for incident; returns its state. Idempotent per incident occurrence."""
+        key = job_id(incident)
+        job = await asyncio.to_thread(self._read, self._path(key))
+        if job is None:
+            counts = await self.csv_io.counts('customers.csv')
+            job = {
+                'job_id': key, 'incident': incident, 'channel': channel, 'status': 'RUNNING',
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'total': counts.get('status', {}).get('ACTIVE', 0),
+                'cursor': None, 'scanned': 0, 'notified': 0, 'rendered': 0, 'reused': 0, 'skipped': 0,
+                'error': None,
+            }
+            await asyncio.to_thread(self._save, job)
+        if job['status'] != 'DONE' and key not in self._tasks:
+            job.update(status='RUNNING', error=None)
+            await asyncio.to_thread(self._save, job)
+            self._spawn(job)
+        return {**job, 'running': key in self._tasks}
+
+    async def resume_all(self):
+        """Restart every job the last process left unfinished."""
+        for path in sorted(self.jobs_dir.glob('*.json')):
+            job = await asyncio.to_thread(self._read, path)
+            if job is not None and job['status'] == 'RUNNING':
+                logger.info(f"Resuming breach notices for {job['job_id']} after {job['cursor'] or 'the start'}")
+                self._spawn(job)
+
+    def _spawn(self, job):
+        key = job['job_id']
+        task = asyncio.create_task(self._run(job))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def shutdown(self):
+        """Cancel running jobs; their state stays RUNNING, so the next start resumes them."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _next_batch(self, job):
+        def read():
+            try:
+                rows = self.csv_io.sync.iter_rows('customers.csv', after=job['cursor'], limit=self.batch_size)
+            except KeyError:
+                # The cursor row is gone; rescan, already recorded customers are skipped
+                rows = self.csv_io.sync.iter_rows('customers.csv', limit=self.batch_size)
+            return list(rows)
+        return await self.csv_io.run(read)
+
+    def _recorded(self, job, filenames):
+        """Filenames that already have a reports_sent row from this job."""
+        storage = self.csv_io.sync.storage
+        return {fn for fn in filenames
+                if storage.search('reports_sent.csv', {'pdf_filename': fn}, limit=1, since=job['started_at'])}
+
+    async def _run(self, job):
+        incident = job['incident']
+        filename_for = DOCUMENTS['customer_breach_notice'][0]
+        pdf_svc = self.pdf_io.sync
+        try:
+            while True:
+                rows = await self._next_batch(job)
+                if not rows:
+                    break
+                customers = [row for row in rows if row.get('status') == 'ACTIVE']
+                filenames = [filename_for(incident, customer) for customer in customers]
+                recorded = await self.csv_io.run(self._recorded, job, filenames)
+                pending = [(customer, fn) for customer, fn in zip(customers, filenames) if fn not in recorded]
+
+                keys = [render_key('customer_breach_notice', (incident, customer)) for customer, _ in pending]
+                reused = await asyncio.to_thread(lambda: [pdf_svc.reuse(fn, key) for (_, fn), key in zip(pending, keys)])
+                to_render = [i for i, hit in enumerate(reused) if hit is None]
+                rendered = await self.pdf_io.render_many('customer_breach_notice', [(incident, pending[i][0]) for i in to_render])
+
+                def store():
+                    results = list(reused)
+                    for i, pdf_bytes in zip(to_render, rendered):
+                        results[i] = pdf_svc.save(pending[i][1], pdf_bytes, keys[i], cache=False)
+                    return results
+                results = await asyncio.to_thread(store)
+
+                if results:
+                    now = datetime.now(timezone.utc).isoformat()
+                    report_ids = await self.csv_io.reserve_ids('REP-', len(results))
+                    await self.csv_io.append_rows('reports_sent.csv', [{
+                        'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
+                        'report_type': 'CUSTOMER_BREACH_NOTICE', 'incident_id': incident['incident_id'],
+                        'request_id': '', 'customer_id': customer['customer_id'], 'recipient': customer.get('email', ''),
+                        'delivery_channel': job['channel'], 'delivery_status': 'SENT',
+                        'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': 'Personalised breach notice',
+                    } for report_id, (customer, _), (_, sha256, filename) in zip(report_ids, pending, results)])
+
+                job['cursor'] = rows[-1]['customer_id']
+                job['scanned'] += len(rows)
+                job['notified'] += len(results)
+                job['rendered'] += len(to_render)
+                job['reused'] += len(results) - len(to_render)
+                job['skipped'] += len(customers) - len(pending)
+                await asyncio.to_thread(self._save, job)
+            job['status'] = 'DONE'
+            logger.info(f"Breach notices for {incident['incident_id']}: {job['notified']} recorded, "
+                        f"{job['rendered']} rendered, {job['reused']} reused")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Breach notices for {incident['incident_id']} failed")
+            job['status'] = 'FAILED'
+            job['error'] = str(e)
+        await asyncio.to_thread(self._save, job)
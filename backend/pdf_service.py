@@ -1,11 +1,26 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, HRFlowable
 from reportlab.lib.units import inch, cm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
+from xml.sax.saxutils import escape
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import copy
+import functools
 import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 import logging
@@ -20,6 +35,20 @@ TEXT_MUTED = colors.HexColor('#9CA3AF')
 SUCCESS_GREEN = colors.HexColor('#10B981')
 DANGER_RED = colors.HexColor('#EF4444')
 WARNING_AMBER = colors.HexColor('#F59E0B')
+TEXT_GREY = colors.HexColor('#6B7280')
+RULE_GREY = colors.HexColor('#374151')
+LINE_GREY = colors.HexColor('#E5E7EB')
+
+PDF_CACHE_BYTES = 64 * 1024 * 1024
+# Bump whenever a story builder changes what it draws, so earlier renders stop being reused
+TEMPLATE_VERSION = 4
+OBJECTS_DIRNAME = 'objects'
+# Render index bounds: key -> sha256 entries kept in memory, and on disk before the least recently used are pruned
+RENDER_MEMORY_ENTRIES = 4096
+RENDER_INDEX_ENTRIES = 100000
+# Timeline rows per LongTable in an audit report, and story flowables doc.build may look ahead at
+AUDIT_TIMELINE_CHUNK = 500
+STORY_LOOKAHEAD = 8
 
 
 def get_styles():
@@ -32,10 +61,31 @@ def get_styles():
     return styles
 
 
+@functools.lru_cache(maxsize=None)
+def shared_styles():
+    """One stylesheet per process; building a story only reads it."""
+    return get_styles()
+
+
+@functools.lru_cache(maxsize=None)
+def _paragraph(text, style_name):
+    """Prototype paragraph for static text, parsed once per process; see static_paragraph."""
+    return Paragraph(text, shared_styles()[style_name])
+
+
+def static_paragraph(text, style_name):
+    """A Paragraph of fixed text that reuses the parsed markup of its prototype.
+
+    Each document gets its own shallow copy: platypus keeps layout state (wrap results, the
+    postponed flag) on the flowable instance, so instances are never shared between builds.
+    """
+    return copy.copy(_paragraph(text, style_name))
+
+
 def build_header(styles, title, subtitle=""):
     elements = []
-    elements.append(Paragraph("DPDP SHIELD", styles['DPDPSubtitle']))
-    elements.append(Paragraph(title, styles['DPDPTitle']))
+    elements.append(static_paragraph("DPDP SHIELD", 'DPDPSubtitle'))
+    elements.append(static_paragraph(title, 'DPDPTitle'))
     if subtitle:
         elements.append(Paragraph(subtitle, styles['DPDPSubtitle']))
     elements.append(HRFlowable(width="100%", thickness=1, color=BRAND_BLUE, spaceAfter=12))
@@ -43,229 +93,842 @@ def build_header(styles, title, subtitle=""):
     return elements
 
 
-def build_footer(styles):
+def format_time(generated_at):
+    return generated_at.strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+def build_footer(styles, generated_at):
     elements = []
     elements.append(Spacer(1, 24))
-    elements.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#374151'), spaceAfter=8))
-    elements.append(Paragraph(f"Generated by DPDP Shield | {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}", styles['DPDPFooter']))
-    elements.append(Paragraph("Prevent | Detect | Respond", styles['DPDPFooter']))
+    elements.append(HRFlowable(width="100%", thickness=0.5, color=RULE_GREY, spaceAfter=8))
+    elements.append(Paragraph(f"Generated by DPDP Shield | {format_time(generated_at)}", styles['DPDPFooter']))
+    elements.append(static_paragraph("Prevent | Detect | Respond", 'DPDPFooter'))
     return elements
 
 
+INFO_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('TOPPADDING', (0,0), (-1,-1), 4),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+    ('LINEBELOW', (0,0), (-1,-1), 0.5, LINE_GREY),
+])
+# Tables with a brand-coloured header row (timelines, before/after comparisons)
+GRID_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), BRAND_BLUE),
+    ('TEXTCOLOR', (0,0), (-1,0), TEXT_WHITE),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,-1), 9),
+    ('TOPPADDING', (0,0), (-1,-1), 6),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+    ('LINEBELOW', (0,0), (-1,-1), 0.5, LINE_GREY),
+])
+TIMELINE_TABLE_STYLE = TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')], parent=GRID_TABLE_STYLE)
+INFO_COL_WIDTHS = [2.5*inch, 4*inch]
+CORRECTION_COL_WIDTHS = [1.5*inch, 2.5*inch, 2.5*inch]
+
+
 def build_info_table(data_pairs, styles):
     table_data = []
     for label, value in data_pairs:
         table_data.append([Paragraph(f"<b>{label}:</b>", styles['DPDPBody']), Paragraph(str(value), styles['DPDPBody'])])
-    t = Table(table_data, colWidths=[2.5*inch, 4*inch])
-    t.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('TOPPADDING', (0,0), (-1,-1), 4),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-        ('LINEBELOW', (0,0), (-1,-1), 0.5, colors.HexColor('#E5E7EB')),
-    ]))
+    t = Table(table_data, colWidths=INFO_COL_WIDTHS)
+    t.setStyle(INFO_TABLE_STYLE)
     return t
 
 
+class PDFCache:
+    """Bounded LRU of PDF bytes and SHA-256 by filename, revalidated against the file's inode, mtime and size."""
+
+    def __init__(self, output_dir, max_bytes=PDF_CACHE_BYTES):
+        self.output_dir = Path(output_dir)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _stat(self, filename):
+        try:
+            st = os.stat(self.output_dir / filename)
+        except FileNotFoundError:
+            return None
+        # The inode changes when an alias is repointed at another stored object
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _store(self, filename, stat, pdf_bytes, sha256):
+        with self._lock:
+            old = self._entries.pop(filename, None)
+            if old is not None:
+                self._size -= len(old[1])
+            if len(pdf_bytes) > self.max_bytes:
+                return
+            self._entries[filename] = (stat, pdf_bytes, sha256)
+            self._size += len(pdf_bytes)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[1])
+
+    def put(self, filename, pdf_bytes, sha256):
+        self._store(filename, self._stat(filename), pdf_bytes, sha256)
+
+    def get(self, filename):
+        """(pdf_bytes, sha256) for filename, read from disk only if it is not cached or changed. None if missing."""
+        stat = self._stat(filename)
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry[0] == stat:
+                self._entries.move_to_end(filename)
+                return entry[1], entry[2]
+        if stat is None:
+            return None
+        with open(self.output_dir / filename, 'rb') as f:
+            pdf_bytes = f.read()
+        sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        self._store(filename, stat, pdf_bytes, sha256)
+        return pdf_bytes, sha256
+
+
+def dpb_notice_story(styles, generated_at, incident):
+    story = build_header(styles, "DATA PROTECTION BOARD NOTICE", "Under Section 8(6) of the Digital Personal Data Protection Act, 2023")
+    story.append(build_info_table([
+        ("Incident ID", incident.get('incident_id', 'N/A')),
+        ("Date of Discovery", incident.get('discovery_time', 'N/A')),
+        ("Nature of Breach", incident.get('nature', 'Unauthorized access to personal data')),
+        ("Systems Impacted", incident.get('systems', 'Customer Database')),
+        ("Data Categories", incident.get('categories', 'Name, Email, Phone')),
+        ("Estimated Affected Users", incident.get('affected_count', 'N/A')),
+        ("Containment Status", incident.get('containment_status', 'Contained')),
+        ("Remedial Actions", incident.get('remedial', 'Access revoked, passwords reset, audit initiated')),
+    ], styles))
+    story.append(Spacer(1, 16))
+    story.append(Paragraph("<b>Description of Breach:</b>", styles['DPDPBody']))
+    story.append(Paragraph(incident.get('description', 'A security breach was detected involving unauthorized access to the customer database containing personal data of registered users.'), styles['DPDPBody']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("<b>Steps Taken:</b>", styles['DPDPBody']))
+    steps = incident.get('steps', ['Identified breach vector', 'Contained the breach', 'Notified affected users', 'Initiated forensic audit'])
+    for i, step in enumerate(steps, 1):
+        story.append(Paragraph(f"{i}. {step}", styles['DPDPBody']))
+    story += build_footer(styles, generated_at)
+    return story
+
+
+def customer_breach_notice_story(styles, generated_at, incident, customer=None):
+    story = build_header(styles, "CUSTOMER BREACH NOTIFICATION", "Important Information About Your Data Security")
+    greeting = f"Dear {escape(customer.get('name') or 'Valued Customer')}," if customer else "Dear Valued Customer,"
+    story.append(Paragraph(greeting, styles['DPDPBody']))
+    story.append(Spacer(1, 8))
+    story.append(Paragraph("We are writing to inform you about a data security incident that may have affected your personal information.", styles['DPDPBody']))
+    story.append(Spacer(1, 12))
+    rows = []
+    if customer:
+        rows += [("Customer ID", customer.get('customer_id', 'N/A')), ("Registered Email", customer.get('email', 'N/A'))]
+    story.append(build_info_table(rows + [
+        ("Incident Date", incident.get('discovery_time', 'N/A')),
+        ("What Happened", incident.get('nature', 'Unauthorized access detected')),
+        ("Data Involved", incident.get('categories', 'Name, Email, Phone')),
+        ("What We Did", "Immediate containment and security review"),
+        ("What You Should Do", "Monitor accounts, change passwords, report suspicious activity"),
+    ], styles))
+    story.append(Spacer(1, 16))
+    story.append(Paragraph("<b>Your Rights Under DPDP Act 2023:</b>", styles['DPDPBody']))
+    rights = ['Right to access your personal data', 'Right to correction of inaccurate data', 'Right to erasure of personal data', 'Right to grievance redressal']
+    for r in rights:
+        story.append(Paragraph(f"  - {r}", styles['DPDPBody']))
+    story += build_footer(styles, generated_at)
+    return story
+
+
+class TimelineSpool:
+    """Breach timeline events spooled to an NDJSON file, for audit reports of any length.
+
+    The writer appends the events chunk by chunk and closes the spool; the renderer iterates
+    it, reading one line at a time. Only the path, count and digest are pickled, so a spool
+    crosses to a pool worker without the events. The digest identifies the render.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.count = 0
+        self.sha256 = None
+        self._hash = hashlib.sha256()
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def append(self, events):
+        for event in events:
+            line = json.dumps({'time': str(event.get('time', '')), 'event': str(event.get('event', ''))}, ensure_ascii=False)
+            self._hash.update(line.encode('utf-8'))
+            self._file.write(line + '\n')
+            self.count += 1
+
+    def close(self):
+        self._file.close()
+        self.sha256 = self._hash.hexdigest()
+
+    def __getstate__(self):
+        return {'path': self.path, 'count': self.count, 'sha256': self.sha256}
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def audit_report_story(styles, generated_at, incident, timeline_events=None):
+    """Yields the report's flowables. Timeline events (a list, or a TimelineSpool read as it goes)
+    are laid out AUDIT_TIMELINE_CHUNK rows per LongTable with the header row repeated on each page,
+    so no more than one chunk is held at a time and each page split only copies what is left of a
+    chunk, keeping render time linear in the number of events."""
+    yield from build_header(styles, "INCIDENT AUDIT REPORT", f"Incident: {incident.get('incident_id', 'N/A')}")
+    yield build_info_table([
+        ("Incident ID", incident.get('incident_id', 'N/A')),
+        ("Discovery Time", incident.get('discovery_time', 'N/A')),
+        ("Closure Time", incident.get('closure_time', 'N/A')),
+        ("Total Duration", incident.get('duration', 'N/A')),
+        ("Severity", incident.get('severity', 'HIGH')),
+        ("Attack Vector", incident.get('vector', 'Under Investigation')),
+        ("Affected Records", incident.get('affected_count', 'N/A')),
+    ], styles)
+    yield Spacer(1, 16)
+    yield Paragraph("<b>Timeline of Events:</b>", styles['DPDPBody'])
+    yield Spacer(1, 8)
+    events = iter(timeline_events or [
+        {"time": incident.get('discovery_time', 'N/A'), "event": "Breach discovered"},
+        {"time": "T+15min", "event": "Incident response team activated"},
+        {"time": "T+30min", "event": "Breach contained"},
+        {"time": "T+1hr", "event": "DPB notification sent"},
+        {"time": "T+2hr", "event": "Customer notifications sent"},
+        {"time": "T+24hr", "event": "Forensic audit completed"},
+    ])
+    while True:
+        chunk = list(itertools.islice(events, AUDIT_TIMELINE_CHUNK))
+        if not chunk:
+            break
+        t = LongTable([["Time", "Event"]] + [[ev['time'], ev['event']] for ev in chunk], colWidths=[2*inch, 4.5*inch], repeatRows=1)
+        t.setStyle(TIMELINE_TABLE_STYLE)
+        yield t
+    yield from build_footer(styles, generated_at)
+
+
+# Content of the fixed-layout documents, shared by the platypus stories and the canvas renderers below
+DATA_EXPORT_INTRO = "This document contains all personal data held by our organization for the requested customer, as per Section 11 of the DPDP Act, 2023."
+DELETION_INTRO = "This certifies that the personal data of the below customer has been deleted/masked from our systems as per their request under the DPDP Act, 2023."
+CORRECTION_INTRO = "This confirms that the personal data has been corrected as requested under Section 12 of the DPDP Act, 2023."
+
+
+def data_export_fields(customer):
+    return [
+        ("Customer ID", customer.get('customer_id', 'N/A')),
+        ("Full Name", customer.get('name', 'N/A')),
+        ("Email Address", customer.get('email', 'N/A')),
+        ("Phone Number", customer.get('phone', 'N/A')),
+        ("Account Status", customer.get('status', 'N/A')),
+        ("Created At", customer.get('created_at', 'N/A')),
+        ("Last Updated", customer.get('updated_at', 'N/A')),
+    ]
+
+
+def deletion_fields(generated_at, customer_id, deleted_fields):
+    return [
+        ("Customer ID", customer_id),
+        ("Deletion Date", format_time(generated_at)),
+        ("Fields Deleted/Masked", ', '.join(deleted_fields)),
+        ("Retention", "Customer ID retained for audit purposes"),
+        ("Status", "COMPLETED"),
+    ]
+
+
+def correction_rows(before, after):
+    """[header, (field, before, after) for each changed field], or a "No changes" row."""
+    tdata = [["Field", "Before", "After"]]
+    for field in before:
+        if before.get(field) != after.get(field):
+            tdata.append([field.title(), str(before.get(field, '')), str(after.get(field, ''))])
+    if len(tdata) == 1:
+        tdata.append(["No changes", "-", "-"])
+    return tdata
+
+
+def data_export_story(styles, generated_at, customer):
+    cid = customer.get('customer_id', 'unknown')
+    story = build_header(styles, "PERSONAL DATA EXPORT", f"Customer: {cid}")
+    story.append(Paragraph(DATA_EXPORT_INTRO, styles['DPDPBody']))
+    story.append(Spacer(1, 12))
+    story.append(build_info_table(data_export_fields(customer), styles))
+    story += build_footer(styles, generated_at)
+    return story
+
+
+def deletion_certificate_story(styles, generated_at, customer_id, deleted_fields):
+    story = build_header(styles, "DATA DELETION CERTIFICATE", f"Customer: {customer_id}")
+    story.append(Paragraph(DELETION_INTRO, styles['DPDPBody']))
+    story.append(Spacer(1, 12))
+    story.append(build_info_table(deletion_fields(generated_at, customer_id, deleted_fields), styles))
+    story += build_footer(styles, generated_at)
+    return story
+
+
+def correction_confirmation_story(styles, generated_at, customer_id, before, after):
+    story = build_header(styles, "DATA CORRECTION CONFIRMATION", f"Customer: {customer_id}")
+    story.append(Paragraph(CORRECTION_INTRO, styles['DPDPBody']))
+    story.append(Spacer(1, 12))
+    t = Table(correction_rows(before, after), colWidths=CORRECTION_COL_WIDTHS)
+    t.setStyle(GRID_TABLE_STYLE)
+    story.append(t)
+    story += build_footer(styles, generated_at)
+    return story
+
+
+def vector_analysis_story(styles, generated_at, analysis):
+    story = build_header(styles, "ATTACK VECTOR ANALYSIS REPORT", "Security Assessment")
+    story.append(build_info_table([
+        ("Analysis Date", format_time(generated_at)),
+        ("Likely Source", analysis.get('likely_source', 'Unknown')),
+        ("Confidence", analysis.get('confidence', 'N/A')),
+        ("API Status", analysis.get('api_status', 'N/A')),
+        ("Email Status", analysis.get('email_status', 'N/A')),
+    ], styles))
+    story.append(Spacer(1, 16))
+    story.append(Paragraph("<b>API Security Signals:</b>", styles['DPDPBody']))
+    for s in analysis.get('api_signals', []):
+        icon = "PASS" if s.get('ok') else "FAIL"
+        story.append(Paragraph(f"  [{icon}] {s.get('label', '')}", styles['DPDPBody']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("<b>Email Security Signals:</b>", styles['DPDPBody']))
+    for s in analysis.get('email_signals', []):
+        icon = "PASS" if s.get('ok') else "FAIL"
+        story.append(Paragraph(f"  [{icon}] {s.get('label', '')}", styles['DPDPBody']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph("<b>Key Findings:</b>", styles['DPDPBody']))
+    for f in analysis.get('findings', ['No anomalies detected']):
+        story.append(Paragraph(f"  - {f}", styles['DPDPBody']))
+    story += build_footer(styles, generated_at)
+    return story
+
+
+class CanvasDocument:
+    """Draws the fixed-layout documents straight onto a canvas, without platypus layout.
+
+    Follows the platypus page: the same frame, fonts, colours and spacing as build_header,
+    build_info_table and build_footer. Text is wrapped with simpleSplit and drawn verbatim
+    (no paragraph markup), and a block that does not fit starts a new page.
+    """
+
+    LEFT = 2*cm + 6
+    WIDTH = A4[0] - 4*cm - 12
+    TOP = A4[1] - 1*cm - 6
+    BOTTOM = 1*cm + 6
+
+    def __init__(self, buffer):
+        self.canvas = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+        self.y = self.TOP
+
+    def space(self, height):
+        self.y -= height
+
+    def _fit(self, height):
+        if self.y - height < self.BOTTOM and self.y < self.TOP:
+            self.canvas.showPage()
+            self.y = self.TOP
+
+    def text(self, text, font='Helvetica', size=10, leading=14, color=colors.black, space_after=6, centred=False):
+        lines = simpleSplit(str(text), font, size, self.WIDTH)
+        self._fit(len(lines) * leading)
+        self.canvas.setFont(font, size)
+        self.canvas.setFillColor(color)
+        for line in lines:
+            self.y -= leading
+            baseline = self.y + leading - size
+            if centred:
+                self.canvas.drawCentredString(self.LEFT + self.WIDTH / 2, baseline, line)
+            else:
+                self.canvas.drawString(self.LEFT, baseline, line)
+        self.y -= space_after
+
+    def rule(self, thickness, color, space_after):
+        self.y -= 1 + thickness
+        self.canvas.setStrokeColor(color)
+        self.canvas.setLineWidth(thickness)
+        self.canvas.line(self.LEFT, self.y, self.LEFT + self.WIDTH, self.y)
+        self.y -= space_after
+
+    def header(self, title, subtitle=""):
+        self.text("DPDP SHIELD", size=12, leading=12, color=TEXT_GREY, space_after=8)
+        self.text(title, font='Helvetica-Bold', size=20, leading=24, color=BRAND_BLUE, space_after=12)
+        if subtitle:
+            self.text(subtitle, size=12, leading=12, color=TEXT_GREY, space_after=8)
+        self.rule(1, BRAND_BLUE, 12)
+        self.space(12)
+
+    def footer(self, generated_at):
+        self.space(24)
+        self._fit(44)
+        self.rule(0.5, RULE_GREY, 8)
+        self.text(f"Generated by DPDP Shield | {format_time(generated_at)}", size=8, leading=12, color=TEXT_MUTED, space_after=0, centred=True)
+        self.text("Prevent | Detect | Respond", size=8, leading=12, color=TEXT_MUTED, space_after=0, centred=True)
+
+    def _row(self, cells, col_widths, fonts, size, leading, padding, fill=None, color=colors.black):
+        x0 = self.LEFT + (self.WIDTH - sum(col_widths)) / 2
+        wrapped = [simpleSplit(str(cell), font, size, width - 12) or [''] for cell, font, width in zip(cells, fonts, col_widths)]
+        height = max(len(lines) for lines in wrapped) * leading + 2 * padding
+        self._fit(height)
+        if fill is not None:
+            self.canvas.setFillColor(fill)
+            self.canvas.rect(x0, self.y - height, sum(col_widths), height, stroke=0, fill=1)
+        self.canvas.setFillColor(color)
+        x = x0
+        for lines, font, width in zip(wrapped, fonts, col_widths):
+            self.canvas.setFont(font, size)
+            baseline = self.y - padding - size
+            for line in lines:
+                self.canvas.drawString(x + 6, baseline, line)
+                baseline -= leading
+            x += width
+        self.y -= height
+        self.canvas.setStrokeColor(LINE_GREY)
+        self.canvas.setLineWidth(0.5)
+        self.canvas.line(x0, self.y, x0 + sum(col_widths), self.y)
+
+    def info_table(self, data_pairs):
+        for label, value in data_pairs:
+            self._row([f"{label}:", value], INFO_COL_WIDTHS, ['Helvetica-Bold', 'Helvetica'], 10, 14, 4)
+
+    def grid_table(self, rows, col_widths):
+        header, *body = rows
+        self._row(header, col_widths, ['Helvetica-Bold'] * len(header), 9, 11, 6, fill=BRAND_BLUE, color=TEXT_WHITE)
+        for row in body:
+            self._row(row, col_widths, ['Helvetica'] * len(row), 9, 11, 6)
+
+    def finish(self):
+        self.canvas.save()
+
+
+def data_export_canvas(doc, generated_at, customer):
+    doc.header("PERSONAL DATA EXPORT", f"Customer: {customer.get('customer_id', 'unknown')}")
+    doc.text(DATA_EXPORT_INTRO)
+    doc.space(12)
+    doc.info_table(data_export_fields(customer))
+    doc.footer(generated_at)
+
+
+def deletion_certificate_canvas(doc, generated_at, customer_id, deleted_fields):
+    doc.header("DATA DELETION CERTIFICATE", f"Customer: {customer_id}")
+    doc.text(DELETION_INTRO)
+    doc.space(12)
+    doc.info_table(deletion_fields(generated_at, customer_id, deleted_fields))
+    doc.footer(generated_at)
+
+
+def correction_confirmation_canvas(doc, generated_at, customer_id, before, after):
+    doc.header("DATA CORRECTION CONFIRMATION", f"Customer: {customer_id}")
+    doc.text(CORRECTION_INTRO)
+    doc.space(12)
+    doc.grid_table(correction_rows(before, after), CORRECTION_COL_WIDTHS)
+    doc.footer(generated_at)
+
+
+# kind -> (filename for the arguments, story builder taking styles then the same arguments)
+DOCUMENTS = {
+    'dpb_notice': (lambda incident: f"dpb_notice_{incident.get('incident_id','')}.pdf", dpb_notice_story),
+    'customer_breach_notice': (lambda incident, customer=None: f"customer_breach_notice_{incident.get('incident_id','')}"
+                               + (f"_{customer.get('customer_id', '')}" if customer else "") + ".pdf",
+                               customer_breach_notice_story),
+    'audit_report': (lambda incident, timeline_events=None: f"audit_report_{incident.get('incident_id','')}.pdf", audit_report_story),
+    'data_export': (lambda customer: f"data_export_{customer.get('customer_id', 'unknown')}.pdf", data_export_story),
+    'deletion_certificate': (lambda customer_id, deleted_fields: f"deletion_cert_{customer_id}.pdf", deletion_certificate_story),
+    'correction_confirmation': (lambda customer_id, before, after: f"correction_confirm_{customer_id}.pdf",
+                                correction_confirmation_story),
+    'vector_analysis': (lambda analysis: f"vector_analysis_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.pdf",
+                        vector_analysis_story),
+}
+
+
+# Fixed-layout kinds with a canvas renderer, taking a CanvasDocument then the same arguments as the story
+CANVAS_DOCUMENTS = {
+    'data_export': data_export_canvas,
+    'deletion_certificate': deletion_certificate_canvas,
+    'correction_confirmation': correction_confirmation_canvas,
+}
+
+
+# kind -> identity of the arguments, for documents whose record carries its own version. A customer
+# row gets a new updated_at on every change, so (customer_id, updated_at) stands for the whole row.
+RENDER_IDENTITIES = {
+    'data_export': lambda customer: (customer.get('customer_id'), customer.get('updated_at')) if customer.get('updated_at') else None,
+    # A spooled timeline is identified by its digest, not its file
+    'audit_report': lambda incident, timeline_events=None: (
+        (incident, timeline_events.count, timeline_events.sha256) if isinstance(timeline_events, TimelineSpool) else None),
+}
+
+
+# Kinds whose body states the render time as a fact (the deletion date, the analysis date), so an
+# earlier render of the same arguments is a different document: they are never reused
+DATED_KINDS = {'deletion_certificate', 'vector_analysis'}
+
+
+def render_key(kind, args):
+    """Digest of everything a render depends on except the time it is stamped with; None for DATED_KINDS."""
+    if kind in DATED_KINDS:
+        return None
+    identity = RENDER_IDENTITIES[kind](*args) if kind in RENDER_IDENTITIES else None
+    payload = json.dumps([TEMPLATE_VERSION, kind, list(args) if identity is None else list(identity)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _FlowableStream:
+    """The list operations doc.build performs on its story, over an iterator of flowables.
+
+    doc.build consumes the story from the front and may look a few flowables ahead (for
+    keepWithNext), so a story builder can be a generator and its flowables are created only
+    as the layout reaches them.
+    """
+
+    def __init__(self, flowables):
+        self._source = iter(flowables)
+        self._buffer = []
+
+    def _fill(self, n):
+        while len(self._buffer) < n and self._source is not None:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill(STORY_LOOKAHEAD)
+        return len(self._buffer)
+
+    def _fill_for(self, key):
+        end = key.stop if isinstance(key, slice) else key + 1
+        # Open-ended or from-the-end access needs the rest of the story
+        self._fill(float('inf') if end is None or end <= 0 else end)
+
+    def __getitem__(self, key):
+        self._fill_for(key)
+        return self._buffer[key]
+
+    def __setitem__(self, key, value):
+        self._buffer[key] = value
+
+    def __delitem__(self, key):
+        self._fill_for(key)
+        del self._buffer[key]
+
+    def insert(self, index, value):
+        self._buffer.insert(index, value)
+
+
+def render_story(kind, generated_at, *args):
+    """PDF bytes of a DOCUMENTS kind laid out by platypus.
+
+    Invariant mode drops ReportLab's own creation date and random document ID, so the bytes
+    depend only on the arguments and generated_at. Page streams are compressed, which keeps
+    long reports small while they are assembled in memory.
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*cm, bottomMargin=1*cm, leftMargin=2*cm, rightMargin=2*cm,
+                            invariant=1, pageCompression=1)
+    doc.build(_FlowableStream(DOCUMENTS[kind][1](shared_styles(), generated_at, *args)))
+    return buffer.getvalue()
+
+
+def render_canvas(kind, generated_at, *args):
+    """PDF bytes of a CANVAS_DOCUMENTS kind drawn directly on the canvas."""
+    buffer = BytesIO()
+    doc = CanvasDocument(buffer)
+    CANVAS_DOCUMENTS[kind](doc, generated_at, *args)
+    doc.finish()
+    return buffer.getvalue()
+
+
+def render_document(kind, generated_at, *args):
+    """PDF bytes of one DOCUMENTS kind. A module-level function of picklable arguments, so pool workers can run it.
+
+    Fixed-layout kinds take the canvas fast path; the rest go through platypus.
+    """
+    if kind in CANVAS_DOCUMENTS:
+        return render_canvas(kind, generated_at, *args)
+    return render_story(kind, generated_at, *args)
+
+
+def render_documents(kind, generated_at, args_list):
+    """render_document over a list of argument tuples, so one pool task carries a whole chunk of a batch."""
+    return [render_document(kind, generated_at, *args) for args in args_list]
+
+
+class PDFStore:
+    """Content-addressed PDF store under output_dir/objects.
+
+    Each distinct PDF is kept once, read-only, as objects/<sha256[:2]>/<sha256>.pdf, so every
+    pdf_sha256 recorded in reports_sent.csv keeps resolving to its exact bytes. The human
+    filename in output_dir is an alias: a hard link to the latest object stored under that
+    name (a copy where the filesystem has no hard links). objects/renders/ maps render_key
+    digests to the object they produced, so an identical render is served from the store.
+
+    The render index is an LRU: the most recent entries are also held in memory, and the
+    least recently used entries on disk are pruned past index_entries. Pruning only costs a
+    re-render; the objects themselves stay, since reports_sent.csv references them.
+    """
+
+    def __init__(self, output_dir, memory_entries=RENDER_MEMORY_ENTRIES, index_entries=RENDER_INDEX_ENTRIES):
+        self.output_dir = Path(output_dir)
+        self.objects_dir = self.output_dir / OBJECTS_DIRNAME
+        self.renders_dir = self.objects_dir / 'renders'
+        self.renders_dir.mkdir(parents=True, exist_ok=True)
+        self.memory_entries = memory_entries
+        self.index_entries = index_entries
+        self._renders = OrderedDict()
+        self._lock = threading.Lock()
+        self._indexed = sum(1 for _ in self.renders_dir.glob('*/*'))
+
+    def object_name(self, sha256):
+        """Path of the object relative to output_dir, as PDFCache takes it."""
+        return f"{OBJECTS_DIRNAME}/{sha256[:2]}/{sha256}.pdf"
+
+    def has(self, sha256):
+        return (self.output_dir / self.object_name(sha256)).exists()
+
+    def _write_atomic(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def put(self, pdf_bytes, sha256):
+        path = self.output_dir / self.object_name(sha256)
+        if not path.exists():
+            self._write_atomic(path, pdf_bytes)
+            os.chmod(path, 0o444)
+
+    def alias(self, filename, sha256):
+        """Point output_dir/filename at the stored object, atomically replacing any earlier version."""
+        target = self.output_dir / filename
+        tmp = self.output_dir / f".{filename}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(self.output_dir / self.object_name(sha256), tmp)
+        except OSError:
+            shutil.copyfile(self.output_dir / self.object_name(sha256), tmp)
+        os.replace(tmp, target)
+
+    def adopt(self):
+        """Store the PDFs in output_dir that predate the store (a lone link), keeping the files in place."""
+        adopted = 0
+        for path in self.output_dir.glob('*.pdf'):
+            if path.stat().st_nlink > 1:
+                continue
+            pdf_bytes = path.read_bytes()
+            sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+            if not self.has(sha256):
+                self.put(pdf_bytes, sha256)
+                adopted += 1
+            # Relink the name to the object, so it is not hashed again on the next start
+            self.alias(path.name, sha256)
+        if adopted:
+            logger.info(f"Adopted {adopted} existing PDFs into the content-addressed store")
+
+    def _render_path(self, key):
+        return self.renders_dir / key[:2] / key
+
+    def _remember(self, key, sha256):
+        with self._lock:
+            self._renders[key] = sha256
+            self._renders.move_to_end(key)
+            while len(self._renders) > self.memory_entries:
+                self._renders.popitem(last=False)
+
+    def lookup_render(self, key):
+        """sha256 of the object an identical render produced, if that object is still stored."""
+        with self._lock:
+            sha256 = self._renders.get(key)
+            if sha256 is not None:
+                self._renders.move_to_end(key)
+        try:
+            if sha256 is None:
+                sha256 = self._render_path(key).read_text().strip()
+                self._remember(key, sha256)
+            # The mtime is the on-disk recency pruning goes by
+            os.utime(self._render_path(key))
+        except FileNotFoundError:
+            with self._lock:
+                self._renders.pop(key, None)
+            return None
+        return sha256 if self.has(sha256) else None
+
+    def record_render(self, key, sha256):
+        path = self._render_path(key)
+        existed = path.exists()
+        self._write_atomic(path, sha256.encode('ascii'))
+        self._remember(key, sha256)
+        if not existed:
+            with self._lock:
+                self._indexed += 1
+                prune = self._indexed > self.index_entries
+            if prune:
+                self.prune_renders()
+
+    def prune_renders(self):
+        """Drop the least recently used on-disk index entries, down to 90% of index_entries."""
+        with self._lock:
+            entries = []
+            for path in self.renders_dir.glob('*/*'):
+                try:
+                    entries.append((path.stat().st_mtime_ns, path))
+                except FileNotFoundError:
+                    pass
+            entries.sort()
+            excess = len(entries) - self.index_entries * 9 // 10
+            for _, path in entries[:max(excess, 0)]:
+                path.unlink(missing_ok=True)
+                self._renders.pop(path.name, None)
+            self._indexed = len(entries) - max(excess, 0)
+        if excess > 0:
+            logger.info(f"Pruned {excess} least recently used PDF render index entries")
+
+    def aliased(self, filename, sha256):
+        """Whether output_dir/filename already is the stored object."""
+        try:
+            return os.path.samefile(self.output_dir / filename, self.output_dir / self.object_name(sha256))
+        except FileNotFoundError:
+            return False
+
+
 class PDFService:
     def __init__(self, output_dir):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.styles = get_styles()
-
-    def _generate(self, filename, build_func):
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*cm, bottomMargin=1*cm, leftMargin=2*cm, rightMargin=2*cm)
-        story = build_func(self.styles)
-        doc.build(story)
-        pdf_bytes = buffer.getvalue()
+        self.cache = PDFCache(self.output_dir)
+        self.store = PDFStore(self.output_dir)
+        self.store.adopt()
+
+    def save(self, filename, pdf_bytes, key=None, cache=True):
+        """Store rendered bytes, alias filename to them and cache them; returns (pdf_bytes, sha256, filename).
+
+        Bulk writers pass cache=False, so a batch does not push the recently downloaded PDFs out of memory.
+        """
         sha256 = hashlib.sha256(pdf_bytes).hexdigest()
-        filepath = self.output_dir / filename
-        with open(filepath, 'wb') as f:
-            f.write(pdf_bytes)
+        self.store.put(pdf_bytes, sha256)
+        if key is not None:
+            self.store.record_render(key, sha256)
+        self.store.alias(filename, sha256)
+        if cache:
+            self.cache.put(filename, pdf_bytes, sha256)
         return pdf_bytes, sha256, filename
 
+    def reuse(self, filename, key):
+        """(pdf_bytes, sha256, filename) of an identical earlier render, aliased to filename; None on a miss."""
+        if key is None:
+            return None
+        sha256 = self.store.lookup_render(key)
+        if sha256 is None:
+            return None
+        cached = self.get_version(sha256)
+        if cached is None:
+            return None
+        if not self.store.aliased(filename, sha256):
+            self.store.alias(filename, sha256)
+        return cached[0], sha256, filename
+
+    def get_version(self, sha256):
+        """(pdf_bytes, sha256) of the stored object with that hash, or None."""
+        if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+            return None
+        return self.cache.get(self.store.object_name(sha256))
+
+    def generate(self, kind, *args):
+        """Render a DOCUMENTS kind on the calling thread and save it, unless an identical render is stored."""
+        filename = DOCUMENTS[kind][0](*args)
+        key = render_key(kind, args)
+        reused = self.reuse(filename, key)
+        if reused is not None:
+            return reused
+        return self.save(filename, render_document(kind, datetime.now(timezone.utc), *args), key)
+
     def generate_dpb_notice(self, incident):
-        filename = f"dpb_notice_{incident.get('incident_id','')}.pdf"
-        def build(styles):
-            story = build_header(styles, "DATA PROTECTION BOARD NOTICE", "Under Section 8(6) of the Digital Personal Data Protection Act, 2023")
-            story.append(build_info_table([
-                ("Incident ID", incident.get('incident_id', 'N/A')),
-                ("Date of Discovery", incident.get('discovery_time', 'N/A')),
-                ("Nature of Breach", incident.get('nature', 'Unauthorized access to personal data')),
-                ("Systems Impacted", incident.get('systems', 'Customer Database')),
-                ("Data Categories", incident.get('categories', 'Name, Email, Phone')),
-                ("Estimated Affected Users", incident.get('affected_count', 'N/A')),
-                ("Containment Status", incident.get('containment_status', 'Contained')),
-                ("Remedial Actions", incident.get('remedial', 'Access revoked, passwords reset, audit initiated')),
-            ], styles))
-            story.append(Spacer(1, 16))
-            story.append(Paragraph("<b>Description of Breach:</b>", styles['DPDPBody']))
-            story.append(Paragraph(incident.get('description', 'A security breach was detected involving unauthorized access to the customer database containing personal data of registered users.'), styles['DPDPBody']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("<b>Steps Taken:</b>", styles['DPDPBody']))
-            steps = incident.get('steps', ['Identified breach vector', 'Contained the breach', 'Notified affected users', 'Initiated forensic audit'])
-            for i, step in enumerate(steps, 1):
-                story.append(Paragraph(f"{i}. {step}", styles['DPDPBody']))
-            story += build_footer(styles)
-            return story
-        return self._generate(filename, build)
+        return self.generate('dpb_notice', incident)
 
     def generate_customer_breach_notice(self, incident, customer=None):
-        filename = f"customer_breach_notice_{incident.get('incident_id','')}.pdf"
-        def build(styles):
-            story = build_header(styles, "CUSTOMER BREACH NOTIFICATION", "Important Information About Your Data Security")
-            story.append(Paragraph("Dear Valued Customer,", styles['DPDPBody']))
-            story.append(Spacer(1, 8))
-            story.append(Paragraph("We are writing to inform you about a data security incident that may have affected your personal information.", styles['DPDPBody']))
-            story.append(Spacer(1, 12))
-            story.append(build_info_table([
-                ("Incident Date", incident.get('discovery_time', 'N/A')),
-                ("What Happened", incident.get('nature', 'Unauthorized access detected')),
-                ("Data Involved", incident.get('categories', 'Name, Email, Phone')),
-                ("What We Did", "Immediate containment and security review"),
-                ("What You Should Do", "Monitor accounts, change passwords, report suspicious activity"),
-            ], styles))
-            story.append(Spacer(1, 16))
-            story.append(Paragraph("<b>Your Rights Under DPDP Act 2023:</b>", styles['DPDPBody']))
-            rights = ['Right to access your personal data', 'Right to correction of inaccurate data', 'Right to erasure of personal data', 'Right to grievance redressal']
-            for r in rights:
-                story.append(Paragraph(f"  - {r}", styles['DPDPBody']))
-            story += build_footer(styles)
-            return story
-        return self._generate(filename, build)
+        return self.generate('customer_breach_notice', incident, customer)
 
     def generate_audit_report(self, incident, timeline_events=None):
-        filename = f"audit_report_{incident.get('incident_id','')}.pdf"
-        def build(styles):
-            story = build_header(styles, "INCIDENT AUDIT REPORT", f"Incident: {incident.get('incident_id', 'N/A')}")
-            story.append(build_info_table([
-                ("Incident ID", incident.get('incident_id', 'N/A')),
-                ("Discovery Time", incident.get('discovery_time', 'N/A')),
-                ("Closure Time", incident.get('closure_time', 'N/A')),
-                ("Total Duration", incident.get('duration', 'N/A')),
-                ("Severity", incident.get('severity', 'HIGH')),
-                ("Attack Vector", incident.get('vector', 'Under Investigation')),
-                ("Affected Records", incident.get('affected_count', 'N/A')),
-            ], styles))
-            story.append(Spacer(1, 16))
-            story.append(Paragraph("<b>Timeline of Events:</b>", styles['DPDPBody']))
-            story.append(Spacer(1, 8))
-            events = timeline_events or [
-                {"time": incident.get('discovery_time', 'N/A'), "event": "Breach discovered"},
-                {"time": "T+15min", "event": "Incident response team activated"},
-                {"time": "T+30min", "event": "Breach contained"},
-                {"time": "T+1hr", "event": "DPB notification sent"},
-                {"time": "T+2hr", "event": "Customer notifications sent"},
-                {"time": "T+24hr", "event": "Forensic audit completed"},
-            ]
-            tdata = [["Time", "Event"]]
-            for ev in events:
-                tdata.append([ev['time'], ev['event']])
-            t = Table(tdata, colWidths=[2*inch, 4.5*inch])
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), BRAND_BLUE),
-                ('TEXTCOLOR', (0,0), (-1,0), TEXT_WHITE),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0,0), (-1,-1), 9),
-                ('TOPPADDING', (0,0), (-1,-1), 6),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-                ('LINEBELOW', (0,0), (-1,-1), 0.5, colors.HexColor('#E5E7EB')),
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ]))
-            story.append(t)
-            story += build_footer(styles)
-            return story
-        return self._generate(filename, build)
+        return self.generate('audit_report', incident, timeline_events)
 
     def generate_data_export(self, customer):
-        cid = customer.get('customer_id', 'unknown')
-        filename = f"data_export_{cid}.pdf"
-        def build(styles):
-            story = build_header(styles, "PERSONAL DATA EXPORT", f"Customer: {cid}")
-            story.append(Paragraph("This document contains all personal data held by our organization for the requested customer, as per Section 11 of the DPDP Act, 2023.", styles['DPDPBody']))
-            story.append(Spacer(1, 12))
-            story.append(build_info_table([
-                ("Customer ID", customer.get('customer_id', 'N/A')),
-                ("Full Name", customer.get('name', 'N/A')),
-                ("Email Address", customer.get('email', 'N/A')),
-                ("Phone Number", customer.get('phone', 'N/A')),
-                ("Account Status", customer.get('status', 'N/A')),
-                ("Created At", customer.get('created_at', 'N/A')),
-                ("Last Updated", customer.get('updated_at', 'N/A')),
-            ], styles))
-            story += build_footer(styles)
-            return story
-        return self._generate(filename, build)
+        return self.generate('data_export', customer)
 
     def generate_deletion_certificate(self, customer_id, deleted_fields):
-        filename = f"deletion_cert_{customer_id}.pdf"
-        def build(styles):
-            story = build_header(styles, "DATA DELETION CERTIFICATE", f"Customer: {customer_id}")
-            story.append(Paragraph("This certifies that the personal data of the below customer has been deleted/masked from our systems as per their request under the DPDP Act, 2023.", styles['DPDPBody']))
-            story.append(Spacer(1, 12))
-            story.append(build_info_table([
-                ("Customer ID", customer_id),
-                ("Deletion Date", datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')),
-                ("Fields Deleted/Masked", ', '.join(deleted_fields)),
-                ("Retention", "Customer ID retained for audit purposes"),
-                ("Status", "COMPLETED"),
-            ], styles))
-            story += build_footer(styles)
-            return story
-        return self._generate(filename, build)
+        return self.generate('deletion_certificate', customer_id, deleted_fields)
 
     def generate_correction_confirmation(self, customer_id, before, after):
-        filename = f"correction_confirm_{customer_id}.pdf"
-        def build(styles):
-            story = build_header(styles, "DATA CORRECTION CONFIRMATION", f"Customer: {customer_id}")
-            story.append(Paragraph("This confirms that the personal data has been corrected as requested under Section 12 of the DPDP Act, 2023.", styles['DPDPBody']))
-            story.append(Spacer(1, 12))
-            tdata = [["Field", "Before", "After"]]
-            for field in before:
-                if before.get(field) != after.get(field):
-                    tdata.append([field.title(), str(before.get(field, '')), str(after.get(field, ''))])
-            if len(tdata) == 1:
-                tdata.append(["No changes", "-", "-"])
-            t = Table(tdata, colWidths=[1.5*inch, 2.5*inch, 2.5*inch])
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), BRAND_BLUE),
-                ('TEXTCOLOR', (0,0), (-1,0), TEXT_WHITE),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0,0), (-1,-1), 9),
-                ('TOPPADDING', (0,0), (-1,-1), 6),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-                ('LINEBELOW', (0,0), (-1,-1), 0.5, colors.HexColor('#E5E7EB')),
-            ]))
-            story.append(t)
-            story += build_footer(styles)
-            return story
-        return self._generate(filename, build)
+        return self.generate('correction_confirmation', customer_id, before, after)
 
     def generate_vector_analysis(self, analysis):
-        filename = f"vector_analysis_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.pdf"
-        def build(styles):
-            story = build_header(styles, "ATTACK VECTOR ANALYSIS REPORT", "Security Assessment")
-            story.append(build_info_table([
-                ("Analysis Date", datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')),
-                ("Likely Source", analysis.get('likely_source', 'Unknown')),
-                ("Confidence", analysis.get('confidence', 'N/A')),
-                ("API Status", analysis.get('api_status', 'N/A')),
-                ("Email Status", analysis.get('email_status', 'N/A')),
-            ], styles))
-            story.append(Spacer(1, 16))
-            story.append(Paragraph("<b>API Security Signals:</b>", styles['DPDPBody']))
-            for s in analysis.get('api_signals', []):
-                icon = "PASS" if s.get('ok') else "FAIL"
-                story.append(Paragraph(f"  [{icon}] {s.get('label', '')}", styles['DPDPBody']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("<b>Email Security Signals:</b>", styles['DPDPBody']))
-            for s in analysis.get('email_signals', []):
-                icon = "PASS" if s.get('ok') else "FAIL"
-                story.append(Paragraph(f"  [{icon}] {s.get('label', '')}", styles['DPDPBody']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("<b>Key Findings:</b>", styles['DPDPBody']))
-            for f in analysis.get('findings', ['No anomalies detected']):
-                story.append(Paragraph(f"  - {f}", styles['DPDPBody']))
-            story += build_footer(styles)
-            return story
-        return self._generate(filename, build)
+        return self.generate('vector_analysis', analysis)
+
+
+class AsyncPDFService:
+    """Awaitable facade over PDFService that renders in a pool of worker processes.
+
+    ReportLab is pure Python and CPU bound, so a render on a thread would still hold the GIL
+    against the event loop; worker processes render in parallel, up to one per core. The
+    file write and the cache update happen back in this process, off the loop.
+    workers=0 renders on a single thread instead, without extra processes.
+    """
+
+    def __init__(self, pdf_svc, workers=None):
+        self.sync = pdf_svc
+        self.workers = workers or os.cpu_count() or 1
+        if workers == 0:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-render')
+        else:
+            # spawn, not fork: the server process has running threads and open sockets
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+
+    async def generate(self, kind, *args):
+        filename = DOCUMENTS[kind][0](*args)
+        key = render_key(kind, args)
+        reused = await asyncio.to_thread(self.sync.reuse, filename, key)
+        if reused is not None:
+            return reused
+        loop = asyncio.get_running_loop()
+        pdf_bytes = await loop.run_in_executor(self._executor, render_document, kind, datetime.now(timezone.utc), *args)
+        return await asyncio.to_thread(self.sync.save, filename, pdf_bytes, key)
+
+    async def render_many(self, kind, args_list, generated_at=None):
+        """PDF bytes for each argument tuple, in order, split into one chunk per worker. Nothing is saved."""
+        if not args_list:
+            return []
+        generated_at = generated_at or datetime.now(timezone.utc)
+        size = -(-len(args_list) // self.workers)
+        loop = asyncio.get_running_loop()
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, render_documents, kind, generated_at, args_list[i:i + size])
+            for i in range(0, len(args_list), size)
+        ])
+        return [pdf_bytes for chunk in chunks for pdf_bytes in chunk]
+
+    async def generate_dpb_notice(self, incident):
+        return await self.generate('dpb_notice', incident)
+
+    async def generate_customer_breach_notice(self, incident, customer=None):
+        return await self.generate('customer_breach_notice', incident, customer)
+
+    async def generate_audit_report(self, incident, timeline_events=None):
+        return await self.generate('audit_report', incident, timeline_events)
+
+    async def generate_data_export(self, customer):
+        return await self.generate('data_export', customer)
+
+    async def generate_deletion_certificate(self, customer_id, deleted_fields):
+        return await self.generate('deletion_certificate', customer_id, deleted_fields)
+
+    async def generate_correction_confirmation(self, customer_id, before, after):
+        return await self.generate('correction_confirmation', customer_id, before, after)
+
+    async def generate_vector_analysis(self, analysis):
+        return await self.generate('vector_analysis', analysis)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,270 @@
+import bisect
+import re
+import threading
+
+_WORD = re.compile(r'\w+')
+
+
+def _digits(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def _tokens(value):
+    return _WORD.findall((value or '').lower())
+
+
+class BucketIndex:
+    """Exact, case-insensitive value -> row positions. Meant for low-cardinality columns like status."""
+
+    def __init__(self):
+        self.postings = {}
+
+    def add(self, value, position):
+        self.postings.setdefault((value or '').lower(), set()).add(position)
+
+    def remove(self, value, position):
+        bucket = self.postings.get((value or '').lower())
+        if bucket is not None:
+            bucket.discard(position)
+
+    def extend(self, values, start):
+        for position, value in enumerate(values, start):
+            self.add(value, position)
+
+    def match(self, term):
+        return self.postings.get(term.lower(), set())
+
+    @staticmethod
+    def accepts(value, term):
+        return (value or '').lower() == term.lower()
+
+    @staticmethod
+    def keys(value):
+        """Keys a value is stored under in an external (SQLite) index; see terms()."""
+        return {(value or '').lower()}
+
+    @staticmethod
+    def terms(term):
+        """(key, is_prefix) pairs a row's keys must all match for accepts(); empty when nothing can."""
+        return [(term.lower(), False)]
+
+
+class ExactIndex(BucketIndex):
+    """Exact, case-sensitive value -> row positions, for keys that may repeat (report_id, pdf_filename)."""
+
+    def add(self, value, position):
+        self.postings.setdefault(value or '', set()).add(position)
+
+    def remove(self, value, position):
+        bucket = self.postings.get(value or '')
+        if bucket is not None:
+            bucket.discard(position)
+
+    def match(self, term):
+        return self.postings.get(term, set())
+
+    @staticmethod
+    def accepts(value, term):
+        return (value or '') == term
+
+    @staticmethod
+    def keys(value):
+        return {value or ''}
+
+    @staticmethod
+    def terms(term):
+        return [(term, False)]
+
+
+class PhoneIndex:
+    """Digit-prefix lookups over phone numbers, with or without the +91 country code.
+
+    Keys live in one sorted array of (digits, position) pairs searched with bisect, which
+    answers the same prefix queries as a digit trie without a dict per node.
+    """
+
+    def __init__(self):
+        self.keys = []
+
+    @staticmethod
+    def variants(value):
+        digits = _digits(value)
+        if not digits:
+            return set()
+        # Findable both as "98765..." and "+91 98765..." whichever way the number was stored
+        national = digits[-10:]
+        return {digits, national, '91' + national}
+
+    def extend(self, values, start):
+        self.keys.extend((key, position) for position, value in enumerate(values, start) for key in self.variants(value))
+        # Timsort merges the already sorted run with the new one
+        self.keys.sort()
+
+    def add(self, value, position):
+        for key in self.variants(value):
+            bisect.insort(self.keys, (key, position))
+
+    def remove(self, value, position):
+        for key in self.variants(value):
+            i = bisect.bisect_left(self.keys, (key, position))
+            if i < len(self.keys) and self.keys[i] == (key, position):
+                del self.keys[i]
+
+    def match(self, term):
+        prefix = _digits(term)
+        found = set()
+        i = bisect.bisect_left(self.keys, (prefix,))
+        while i < len(self.keys) and self.keys[i][0].startswith(prefix):
+            found.add(self.keys[i][1])
+            i += 1
+        return found
+
+    @classmethod
+    def accepts(cls, value, term):
+        prefix = _digits(term)
+        return any(key.startswith(prefix) for key in cls.variants(value))
+
+    @classmethod
+    def keys(cls, value):
+        return cls.variants(value)
+
+    @staticmethod
+    def terms(term):
+        return [(_digits(term), True)]
+
+
+class TokenIndex:
+    """Inverted index of lowercased words. The last query word matches as a prefix, for typeahead."""
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+
+    def add(self, value, position):
+        for token in set(_tokens(value)):
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = set()
+                bisect.insort(self.vocabulary, token)
+            postings.add(position)
+
+    def extend(self, values, start):
+        new_tokens = []
+        for position, value in enumerate(values, start):
+            for token in _tokens(value):
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = set()
+                    new_tokens.append(token)
+                postings.add(position)
+        if new_tokens:
+            # Two sorted runs: timsort merges them in linear time
+            self.vocabulary.extend(sorted(new_tokens))
+            self.vocabulary.sort()
+
+    def remove(self, value, position):
+        for token in set(_tokens(value)):
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(position)
+            if not postings:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def _prefixed(self, prefix):
+        found = set()
+        i = bisect.bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            found |= self.postings[self.vocabulary[i]]
+            i += 1
+        return found
+
+    def match(self, term):
+        tokens = _tokens(term)
+        if not tokens:
+            return set()
+        sets = [self.postings.get(t, set()) for t in tokens[:-1]]
+        sets.append(self._prefixed(tokens[-1]))
+        sets.sort(key=len)
+        return set.intersection(*sets) if len(sets) > 1 else set(sets[0])
+
+    @staticmethod
+    def accepts(value, term):
+        words = _tokens(value)
+        tokens = _tokens(term)
+        if not tokens:
+            return False
+        return all(t in words for t in tokens[:-1]) and any(w.startswith(tokens[-1]) for w in words)
+
+    @staticmethod
+    def keys(value):
+        return set(_tokens(value))
+
+    @staticmethod
+    def terms(term):
+        tokens = _tokens(term)
+        if not tokens:
+            return []
+        return [(t, False) for t in tokens[:-1]] + [(tokens[-1], True)]
+
+
+INDEX_KINDS = {
+    'bucket': BucketIndex,
+    'exact': ExactIndex,
+    'phone': PhoneIndex,
+    'tokens': TokenIndex,
+}
+
+
+class SearchIndex:
+    """The secondary indexes of one resident table, keyed by column.
+
+    Published tables are read without the storage lock, so the posting sets are only touched
+    under self.lock; callers re-check candidates with accepts() since a row may change between
+    the index lookup and reading it.
+    """
+
+    def __init__(self, specs, columns, rows):
+        self.columns = columns
+        self.indexes = {field: INDEX_KINDS[kind]() for field, kind in specs.items() if field in columns}
+        self.lock = threading.Lock()
+        self.extend(rows, 0)
+
+    def extend(self, rows, start):
+        """Index rows[start:], which were appended at positions start onwards."""
+        with self.lock:
+            for field, index in self.indexes.items():
+                column = self.columns[field]
+                index.extend((rows[i][column] for i in range(start, len(rows))), start)
+
+    def replace(self, old, new, position):
+        with self.lock:
+            for field, index in self.indexes.items():
+                column = self.columns[field]
+                if old[column] != new[column]:
+                    index.remove(old[column], position)
+                    index.add(new[column], position)
+
+    def candidates(self, criteria, limit_scan):
+        """Positions matching every indexed criterion, or None when a plain scan is cheaper.
+
+        None is returned when no criterion is indexed or the most selective one still matches
+        more than limit_scan rows, e.g. a status filter on its own.
+        """
+        with self.lock:
+            sets = sorted((self.indexes[field].match(term) for field, term in criteria.items() if field in self.indexes), key=len)
+            if not sets or len(sets[0]) > limit_scan:
+                return None
+            return {p for p in sets[0] if all(p in s for s in sets[1:])}
+
+    def accepts(self, field, value, term):
+        return self.indexes[field].accepts(value, term)
+
+    def exact(self, field):
+        return isinstance(self.indexes.get(field), ExactIndex)
+
+    def positions(self, field, term):
+        """Sorted positions of an exact-indexed field's value."""
+        with self.lock:
+            return sorted(self.indexes[field].match(term))
@@ -1,6 +1,7 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, UploadFile, File
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from dotenv import load_dotenv
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
@@ -10,17 +11,29 @@ import hashlib
 import json
 import re
 import random
+import tempfile
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, timezone, timedelta
 from io import BytesIO
+from email.utils import format_datetime, parsedate_to_datetime
+import zlib
 import jwt
 import asyncio
 
-from csv_manager import CSVManager
+try:
+    import zstandard
+except ImportError:  # optional: exports fall back to gzip
+    zstandard = None
+
+from csv_manager import CSVManager, AsyncCSVManager, ROW_KEYS
+from analytics import Analytics
+import snapshot_export
+import synthetic
 from gmail_service import GmailService
-from pdf_service import PDFService
+from pdf_service import PDFService, AsyncPDFService, TimelineSpool
+from notice_batch import BreachNoticeJobs
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,16 +44,31 @@ client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
 # Services
-csv_mgr = CSVManager(ROOT_DIR / 'data')
+csv_mgr = CSVManager(
+    ROOT_DIR / 'data',
+    journal=os.environ.get('CSV_JOURNAL_MODE', 'false').lower() == 'true',
+    backend=os.environ.get('CSV_STORAGE_BACKEND', 'csv'),
+    multiprocess=os.environ.get('CSV_MULTIPROCESS', 'false').lower() == 'true',
+    hot_months=int(os.environ.get('CSV_PARTITION_HOT_MONTHS', '2')),
+)
+csv_io = AsyncCSVManager(csv_mgr, max_workers=int(os.environ.get('CSV_IO_WORKERS', '4')))
+analytics = Analytics(csv_mgr)
 gmail_svc = GmailService(
     email_addr=os.environ.get('GMAIL_EMAIL', ''),
     password=os.environ.get('GMAIL_PASSWORD', '')
 )
 pdf_svc = PDFService(ROOT_DIR / 'pdfs')
+# Worker processes for ReportLab; unset uses one per core, 0 renders on a thread
+pdf_io = AsyncPDFService(pdf_svc, workers=int(os.environ['PDF_RENDER_WORKERS']) if os.environ.get('PDF_RENDER_WORKERS') else None)
+notices = BreachNoticeJobs(csv_io, pdf_io)
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'dpdp-shield-secret')
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', '')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', '')
+MAX_PAGE_SIZE = 1000
+NDJSON_CHUNK_SIZE = 64 * 1024
+# Breach timeline events read from MongoDB per round trip when spooling an audit report
+TIMELINE_CHUNK = 1000
 
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -51,8 +79,11 @@ logger = logging.getLogger(__name__)
 # ── Startup ──
 @app.on_event("startup")
 async def startup():
-    csv_mgr.seed_customers(30)
-    csv_mgr.seed_sample_incident_with_pdfs(pdf_svc)
+    await csv_io.run(csv_mgr.seed_customers, 30)
+    await csv_io.run(csv_mgr.seed_sample_incident_with_pdfs, pdf_svc)
+    await csv_io.run(csv_mgr.seal_partitions)
+    csv_mgr.start_compactor(int(os.environ.get('CSV_COMPACT_INTERVAL', '30')))
+    await notices.resume_all()
     # Store breach state in MongoDB
     existing = await db.breach_state.find_one({"_id": "current"})
     if not existing:
@@ -93,6 +124,10 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
+    await notices.shutdown()
+    csv_mgr.stop_compactor()
+    csv_io.shutdown()
+    pdf_io.shutdown()
     client.close()
 
 
@@ -134,6 +169,16 @@ class BroadcastRequest(BaseModel):
     channel: str = "EMAIL"
     message: str = ""
 
+class AnalyticsQuery(BaseModel):
+    table: str
+    filters: Dict[str, Union[str, List[str]]] = {}
+    since: Optional[str] = None
+    until: Optional[str] = None
+    group_by: List[str] = []
+    bucket: Optional[str] = None
+    order: str = "key"
+    limit: int = 1000
+
 class CorrectionData(BaseModel):
     request_id: str
     customer_id: str
@@ -141,6 +186,12 @@ class CorrectionData(BaseModel):
     new_email: Optional[str] = None
     new_phone: Optional[str] = None
 
+class SyntheticDataRequest(BaseModel):
+    customers: int = Field(0, ge=0, le=5_000_000)
+    requests: int = Field(0, ge=0, le=5_000_000)
+    reports: int = Field(0, ge=0, le=5_000_000)
+    seed: int = 42
+
 
 # ── Auth Helpers ──
 def create_token(email):
@@ -163,6 +214,118 @@ async def get_admin(request: Request):
     return payload["email"]
 
 
+# ── List Helpers ──
+def ndjson_chunks(rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+async def list_rows(filename, limit=None, after=None, format=None, since=None, until=None):
+    """Full JSON array by default; ?limit=&after= pages by row key, ?format=ndjson streams one row per line.
+
+    ?since=&until= (ISO dates, until exclusive) narrow the partitioned logs to a time range.
+    """
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if format not in (None, 'json', 'ndjson'):
+        raise HTTPException(400, "format must be json or ndjson")
+    try:
+        if format == 'ndjson':
+            rows = await csv_io.iter_rows(filename, after, limit, since, until)
+            return StreamingResponse(ndjson_chunks(rows), media_type='application/x-ndjson')
+        if limit is None and after is None and since is None and until is None:
+            return await csv_io.read_csv(filename)
+        rows = await csv_io.read_page(filename, limit, after, since, until)
+    except KeyError:
+        raise HTTPException(400, "Unknown cursor")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    headers = {}
+    if limit is not None and len(rows) == limit:
+        headers['X-Next-Cursor'] = rows[-1][ROW_KEYS[filename]]
+    return JSONResponse(rows, headers=headers)
+
+
+# ── HTTP Caching Helpers ──
+def etag_matches(header, etag):
+    """If-None-Match / If-Range comparison (weak, as RFC 9110 asks for If-None-Match)."""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(t.strip().removeprefix('W/') == opaque for t in header.split(','))
+
+def not_modified(request, etag, last_modified):
+    """Conditional GET check: If-None-Match wins over If-Modified-Since when both are sent."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    since = request.headers.get('if-modified-since')
+    if not since:
+        return False
+    try:
+        return last_modified.replace(microsecond=0) <= parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+
+def negotiate_encoding(header):
+    """Pick zstd (when installed), gzip or identity from an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    for coding in (['zstd'] if zstandard else []) + ['gzip']:
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+def compress_chunks(chunks, encoding):
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+def parse_byte_range(header, size):
+    """(start, end) inclusive for a single 'bytes=' range, None to serve the whole body."""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        # Multipart ranges are optional for servers; the full body is a valid answer
+        return None
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if start:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(size - int(end), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(416, "Requested range not satisfiable", headers={'Content-Range': f'bytes */{size}'})
+    return start, end
+
+
 # ══════════════════════════════════════
 # AUTH ROUTES
 # ══════════════════════════════════════
@@ -174,7 +337,7 @@ async def login(req: LoginRequest, request: Request):
     session_id = str(uuid.uuid4())
     ua = request.headers.get("User-Agent", "unknown")
     ip = request.client.host if request.client else "unknown"
-    csv_mgr.append_row('admin_access.csv', {
+    await csv_io.append_row('admin_access.csv', {
         'session_id': session_id,
         'admin_email': req.email,
         'login_time': datetime.now(timezone.utc).isoformat(),
@@ -189,7 +352,7 @@ async def logout(request: Request):
     body = await request.json()
     session_id = body.get("session_id", "")
     if session_id:
-        csv_mgr.update_row('admin_access.csv', 'session_id', session_id, {
+        await csv_io.update_row('admin_access.csv', 'session_id', session_id, {
             'logout_time': datetime.now(timezone.utc).isoformat()
         })
     return {"ok": True}
@@ -199,44 +362,76 @@ async def logout(request: Request):
 # CUSTOMER ROUTES
 # ══════════════════════════════════════
 @api_router.get("/customers")
-async def get_customers():
-    return csv_mgr.read_csv('customers.csv')
+async def get_customers(limit: Optional[int] = None, after: Optional[str] = None, format: Optional[str] = None):
+    return await list_rows('customers.csv', limit, after, format)
+
+@api_router.get("/customers/search")
+async def search_customers(q: Optional[str] = None, status: Optional[str] = None, email: Optional[str] = None,
+                           phone: Optional[str] = None, name: Optional[str] = None, limit: int = 20):
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    criteria = {'status': status, 'email': email, 'phone': phone, 'name': name}
+    if q:
+        # Free-text typeahead: route the query to the index its shape suggests
+        q = q.strip()
+        if '@' in q:
+            criteria['email'] = q
+        elif re.fullmatch(r'[\d\s+()-]+', q):
+            criteria['phone'] = q
+        else:
+            criteria['name'] = q
+    return await csv_io.search_customers(criteria, limit)
 
 @api_router.post("/customers")
 async def create_customer(c: CustomerCreate):
-    cid = csv_mgr.get_next_id('customers.csv', 'customer_id', 'CUST-')
-    if not re.match(r'^CUST-\d{4}$', cid):
+    cid = await csv_io.get_next_id('customers.csv', 'customer_id', 'CUST-')
+    if not re.match(r'^CUST-\d{4,}$', cid):
         raise HTTPException(400, "Invalid customer ID format")
     now = datetime.now(timezone.utc).isoformat()
     row = {'customer_id': cid, 'name': c.name, 'email': c.email, 'phone': c.phone, 'status': 'ACTIVE', 'created_at': now, 'updated_at': now}
-    csv_mgr.append_row('customers.csv', row)
+    await csv_io.append_row('customers.csv', row)
     return row
 
+@api_router.post("/customers/import")
+async def import_customers(file: UploadFile = File(...), format: Optional[str] = None):
+    """Multipart upload of a customers CSV (name,email,phone) or NDJSON file; see CSVManager.import_customers."""
+    if format is None:
+        ndjson = (file.filename or '').endswith(('.ndjson', '.jsonl')) or file.content_type in ('application/x-ndjson', 'application/jsonl')
+        format = 'ndjson' if ndjson else 'csv'
+    if format not in ('csv', 'ndjson'):
+        raise HTTPException(400, "format must be csv or ndjson")
+    try:
+        # The upload is spooled to disk by the multipart parser and read back in batches
+        return await csv_io.import_customers(file.file, format)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    finally:
+        await file.close()
+
 @api_router.put("/customers/{customer_id}")
 async def update_customer(customer_id: str, c: CustomerUpdate):
-    existing = csv_mgr.find_customer(customer_id)
+    existing = await csv_io.find_customer(customer_id)
     if not existing:
         raise HTTPException(404, "Customer not found")
     updates = {k: v for k, v in c.model_dump().items() if v is not None}
     updates['updated_at'] = datetime.now(timezone.utc).isoformat()
-    csv_mgr.update_row('customers.csv', 'customer_id', customer_id, updates)
+    await csv_io.update_row('customers.csv', 'customer_id', customer_id, updates)
     return {**existing, **updates}
 
 @api_router.delete("/customers/{customer_id}")
 async def delete_customer(customer_id: str):
-    existing = csv_mgr.find_customer(customer_id)
+    existing = await csv_io.find_customer(customer_id)
     if not existing:
         raise HTTPException(404, "Customer not found")
-    csv_mgr.update_row('customers.csv', 'customer_id', customer_id, {
+    await csv_io.update_row('customers.csv', 'customer_id', customer_id, {
         'status': 'DELETED', 'name': 'REDACTED', 'email': 'REDACTED', 'phone': 'REDACTED',
         'updated_at': datetime.now(timezone.utc).isoformat()
     })
     return {"ok": True, "customer_id": customer_id}
 
 @api_router.get("/customers/export")
-async def export_customers():
-    filepath = csv_mgr.data_dir / 'customers.csv'
-    return FileResponse(filepath, media_type='text/csv', filename='customers.csv')
+async def export_customers(request: Request):
+    return await csv_download_response(request, 'customers.csv')
 
 
 # ══════════════════════════════════════
@@ -292,10 +487,10 @@ async def generate_dpb_notice():
     if not state or not state.get("active"):
         raise HTTPException(400, "No active breach")
     incident = {k: state.get(k) for k in ['incident_id','discovery_time','nature','systems','categories','affected_count','description']}
-    pdf_bytes, sha256, filename = pdf_svc.generate_dpb_notice(incident)
+    pdf_bytes, sha256, filename = await pdf_io.generate_dpb_notice(incident)
     now = datetime.now(timezone.utc).isoformat()
-    report_id = csv_mgr.get_next_report_id()
-    csv_mgr.append_row('reports_sent.csv', {
+    report_id = await csv_io.get_next_report_id()
+    await csv_io.append_row('reports_sent.csv', {
         'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
         'report_type': 'DPB_NOTICE', 'incident_id': state.get('incident_id',''),
         'request_id': '', 'customer_id': '', 'recipient': 'dpb@meity.gov.in',
@@ -310,28 +505,20 @@ async def generate_dpb_notice():
 
 @api_router.post("/breach/notify-users")
 async def notify_users(b: BroadcastRequest):
+    """Start the personalised notice job for every active customer; see notice_batch."""
     state = await db.breach_state.find_one({"_id": "current"})
     if not state or not state.get("active"):
         raise HTTPException(400, "No active breach")
-    customers = csv_mgr.read_csv('customers.csv')
-    active_customers = [c for c in customers if c.get('status') == 'ACTIVE']
-    count = len(active_customers)
     incident = {k: state.get(k) for k in ['incident_id','discovery_time','nature','systems','categories','affected_count','description']}
-    pdf_bytes, sha256, filename = pdf_svc.generate_customer_breach_notice(incident)
+    job = await notices.start(incident, b.channel)
+    count = job['total']
     now = datetime.now(timezone.utc).isoformat()
-    report_id = csv_mgr.get_next_report_id()
-    csv_mgr.append_row('reports_sent.csv', {
-        'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
-        'report_type': 'CUSTOMER_BREACH_NOTICE', 'incident_id': state.get('incident_id',''),
-        'request_id': '', 'customer_id': '', 'recipient': f'BULK({count})',
-        'delivery_channel': b.channel, 'delivery_status': 'SENT',
-        'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': f'Broadcast to {count} users',
-    })
-    # Send at least one real email if possible
+    # Send at least one real email if possible; the job reuses this render for the same customer
     sent_real = False
-    if b.channel == "EMAIL" and gmail_svc.email and active_customers:
+    first = await csv_io.search_customers({'status': 'ACTIVE'}, limit=1)
+    if b.channel == "EMAIL" and gmail_svc.email and first:
         try:
-            first_cust = active_customers[0]
+            pdf_bytes, sha256, filename = await pdf_io.generate_customer_breach_notice(incident, first[0])
             gmail_svc.send_email(
                 to=gmail_svc.email,
                 subject=f"DPDP Shield - Data Breach Notification - {state.get('incident_id','')}",
@@ -345,11 +532,37 @@ async def notify_users(b: BroadcastRequest):
         "$set": {"users_notified": True, "step": 4},
         "$push": {"timeline": {"time": now, "event": f"Customer notifications sent to {count} users via {b.channel}", "type": "notify"}}
     })
-    return {"ok": True, "count": count, "report_id": report_id, "real_email_sent": sent_real}
+    return {"ok": True, "count": count, "job": job, "real_email_sent": sent_real}
+
+@api_router.get("/breach/notify-users/{incident_id}")
+async def notify_users_progress(incident_id: str):
+    """Progress of an incident's notice job: customers scanned, notices recorded (notified, plus skipped
+    when a resumed batch had already recorded them) against the active total, status and error."""
+    job = await asyncio.to_thread(notices.status, incident_id)
+    if job is None:
+        raise HTTPException(404, "No notification job for this incident")
+    return job
+
+async def spool_timeline():
+    """Copy the breach timeline into a TimelineSpool, TIMELINE_CHUNK events per read, so neither
+    this process nor the renderer ever holds the whole array. The caller unlinks spool.path."""
+    fd, path = tempfile.mkstemp(prefix='timeline-', suffix='.ndjson')
+    os.close(fd)
+    spool = TimelineSpool(path)
+    skip = 0
+    while True:
+        doc = await db.breach_state.find_one({"_id": "current"}, {"timeline": {"$slice": [skip, TIMELINE_CHUNK]}, "_id": 1})
+        events = (doc or {}).get('timeline') or []
+        await asyncio.to_thread(spool.append, events)
+        if len(events) < TIMELINE_CHUNK:
+            break
+        skip += TIMELINE_CHUNK
+    spool.close()
+    return spool
 
 @api_router.post("/breach/close")
 async def close_breach():
-    state = await db.breach_state.find_one({"_id": "current"})
+    state = await db.breach_state.find_one({"_id": "current"}, {"timeline": 0})
     if not state or not state.get("active"):
         raise HTTPException(400, "No active breach")
     now = datetime.now(timezone.utc).isoformat()
@@ -357,9 +570,13 @@ async def close_breach():
     incident['closure_time'] = now
     incident['severity'] = 'HIGH'
     incident['vector'] = 'Under Investigation'
-    pdf_bytes, sha256, filename = pdf_svc.generate_audit_report(incident, state.get('timeline', []))
-    report_id = csv_mgr.get_next_report_id()
-    csv_mgr.append_row('reports_sent.csv', {
+    spool = await spool_timeline()
+    try:
+        pdf_bytes, sha256, filename = await pdf_io.generate_audit_report(incident, spool)
+    finally:
+        os.unlink(spool.path)
+    report_id = await csv_io.get_next_report_id()
+    await csv_io.append_row('reports_sent.csv', {
         'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
         'report_type': 'AUDIT_REPORT', 'incident_id': state.get('incident_id',''),
         'request_id': '', 'customer_id': '', 'recipient': 'SELF_DOWNLOAD',
@@ -407,8 +624,9 @@ async def email_connection_status():
     }
 
 @api_router.get("/mail-replies")
-async def get_mail_replies():
-    return csv_mgr.read_csv('mail_replies.csv')
+async def get_mail_replies(limit: Optional[int] = None, after: Optional[str] = None, format: Optional[str] = None,
+                           since: Optional[str] = None, until: Optional[str] = None):
+    return await list_rows('mail_replies.csv', limit, after, format, since, until)
 
 def detect_intent(subject, body):
     text = (subject + " " + body).lower()
@@ -424,7 +642,7 @@ def detect_intent(subject, body):
     return 'UNKNOWN'
 
 def extract_customer_id(text):
-    match = re.search(r'CUST-\d{4}', text, re.IGNORECASE)
+    match = re.search(r'CUST-\d{4,}', text, re.IGNORECASE)
     return match.group().upper() if match else None
 
 @api_router.post("/emails/process")
@@ -440,7 +658,7 @@ async def process_email(e: EmailProcess):
         if gmail_svc.email:
             gmail_svc.send_reply(e.from_email, e.subject,
                 "<p>Thank you for contacting DPDP Shield.</p><p>We could not find a valid Customer ID in your request. Please include your Customer ID (format: CUST-0007) and resend.</p><p>DPDP Shield Team</p>")
-        csv_mgr.append_row('mail_replies.csv', {
+        await csv_io.append_row('mail_replies.csv', {
             'request_id': request_id, 'received_at': e.received_at or now,
             'from_email': e.from_email, 'subject': e.subject, 'body': e.body[:500],
             'customer_id': '', 'intent': intent, 'otp_status': 'NOT_SENT',
@@ -449,9 +667,9 @@ async def process_email(e: EmailProcess):
         })
         return {"request_id": request_id, "status": "NEEDS_INFO", "message": "Customer ID not found. Reply sent."}
 
-    customer = csv_mgr.find_customer(customer_id)
+    customer = await csv_io.find_customer(customer_id)
     if not customer:
-        csv_mgr.append_row('mail_replies.csv', {
+        await csv_io.append_row('mail_replies.csv', {
             'request_id': request_id, 'received_at': e.received_at or now,
             'from_email': e.from_email, 'subject': e.subject, 'body': e.body[:500],
             'customer_id': customer_id, 'intent': intent, 'otp_status': 'NOT_SENT',
@@ -483,7 +701,7 @@ async def process_email(e: EmailProcess):
         otp_sent = gmail_svc.send_otp_email(registered_email, otp, customer_id)
 
     otp_status = 'OTP_SENT' if otp_sent else 'FAILED'
-    csv_mgr.append_row('mail_replies.csv', {
+    await csv_io.append_row('mail_replies.csv', {
         'request_id': request_id, 'received_at': e.received_at or now,
         'from_email': e.from_email, 'subject': e.subject, 'body': e.body[:500],
         'customer_id': customer_id, 'intent': intent, 'otp_status': otp_status,
@@ -513,10 +731,10 @@ async def verify_otp(v: OTPVerify):
     if not otp_doc:
         raise HTTPException(404, "OTP request not found or already verified")
     if otp_doc.get("attempts", 0) >= 3:
-        csv_mgr.update_row('mail_replies.csv', 'request_id', v.request_id, {'otp_status': 'FAILED', 'action_status': 'FAILED', 'notes': 'Max OTP attempts exceeded'})
+        await csv_io.update_row('mail_replies.csv', 'request_id', v.request_id, {'otp_status': 'FAILED', 'action_status': 'FAILED', 'notes': 'Max OTP attempts exceeded'})
         raise HTTPException(400, "Maximum OTP attempts exceeded")
     if datetime.now(timezone.utc) > otp_doc["expires_at"].replace(tzinfo=timezone.utc) if otp_doc["expires_at"].tzinfo is None else otp_doc["expires_at"]:
-        csv_mgr.update_row('mail_replies.csv', 'request_id', v.request_id, {'otp_status': 'OTP_EXPIRED', 'action_status': 'FAILED'})
+        await csv_io.update_row('mail_replies.csv', 'request_id', v.request_id, {'otp_status': 'OTP_EXPIRED', 'action_status': 'FAILED'})
         raise HTTPException(400, "OTP expired")
     if v.otp != otp_doc["otp"]:
         await db.otps.update_one({"request_id": v.request_id}, {"$inc": {"attempts": 1}})
@@ -526,69 +744,70 @@ async def verify_otp(v: OTPVerify):
     # OTP verified
     now = datetime.now(timezone.utc).isoformat()
     await db.otps.update_one({"request_id": v.request_id}, {"$set": {"verified": True}})
-    csv_mgr.update_row('mail_replies.csv', 'request_id', v.request_id, {
+    await csv_io.update_row('mail_replies.csv', 'request_id', v.request_id, {
         'otp_status': 'OTP_VERIFIED', 'otp_verified_at': now,
     })
 
     intent = otp_doc.get("intent", "UNKNOWN")
     customer_id = otp_doc.get("customer_id", "")
-    customer = csv_mgr.find_customer(customer_id)
+    customer = await csv_io.find_customer(customer_id)
     result = {"verified": True, "intent": intent, "customer_id": customer_id}
 
+    # Render and mail first; the transaction then records only the CSV writes, in one commit
     if intent == "SHOW" and customer:
-        pdf_bytes, sha256, filename = pdf_svc.generate_data_export(customer)
-        report_id = csv_mgr.get_next_report_id()
-        csv_mgr.append_row('reports_sent.csv', {
-            'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
-            'report_type': 'DATA_EXPORT', 'incident_id': '', 'request_id': v.request_id,
-            'customer_id': customer_id, 'recipient': customer.get('email',''),
-            'delivery_channel': 'EMAIL', 'delivery_status': 'GENERATED',
-            'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': 'Data export for SHOW request',
-        })
+        pdf_bytes, sha256, filename = await pdf_io.generate_data_export(customer)
+        report_id = await csv_io.get_next_report_id()
+        sent = False
         if gmail_svc.email:
             sent = gmail_svc.send_email(customer.get('email',''), f"DPDP Shield - Your Personal Data Export ({customer_id})",
                 "<p>Please find your personal data export attached.</p><p>DPDP Shield Team</p>",
                 [(filename, pdf_bytes)])
-            if sent:
-                csv_mgr.update_row('reports_sent.csv', 'report_id', report_id, {'delivery_status': 'SENT'})
-        csv_mgr.update_row('mail_replies.csv', 'request_id', v.request_id, {
-            'action_taken': 'Data export generated and sent', 'action_status': 'COMPLETED',
-            'pdf_files': filename,
-        })
+        async with csv_io.transaction() as tx:
+            tx.append_row('reports_sent.csv', {
+                'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
+                'report_type': 'DATA_EXPORT', 'incident_id': '', 'request_id': v.request_id,
+                'customer_id': customer_id, 'recipient': customer.get('email',''),
+                'delivery_channel': 'EMAIL', 'delivery_status': 'SENT' if sent else 'GENERATED',
+                'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': 'Data export for SHOW request',
+            })
+            tx.update_row('mail_replies.csv', 'request_id', v.request_id, {
+                'action_taken': 'Data export generated and sent', 'action_status': 'COMPLETED',
+                'pdf_files': filename,
+            })
         result["action"] = "Data export sent"
         result["filename"] = filename
 
     elif intent == "DELETE" and customer:
         deleted_fields = ['name', 'email', 'phone']
-        pdf_bytes, sha256, filename = pdf_svc.generate_deletion_certificate(customer_id, deleted_fields)
-        report_id = csv_mgr.get_next_report_id()
+        pdf_bytes, sha256, filename = await pdf_io.generate_deletion_certificate(customer_id, deleted_fields)
+        report_id = await csv_io.get_next_report_id()
         reg_email = customer.get('email', '')
-        csv_mgr.append_row('reports_sent.csv', {
-            'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
-            'report_type': 'DELETION_CERTIFICATE', 'incident_id': '', 'request_id': v.request_id,
-            'customer_id': customer_id, 'recipient': reg_email,
-            'delivery_channel': 'EMAIL', 'delivery_status': 'GENERATED',
-            'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': 'Deletion certificate',
-        })
+        sent = False
         if gmail_svc.email and reg_email and reg_email != 'REDACTED':
             sent = gmail_svc.send_email(reg_email, f"DPDP Shield - Data Deletion Certificate ({customer_id})",
                 "<p>Your data has been deleted. Please find the deletion certificate attached.</p><p>DPDP Shield Team</p>",
                 [(filename, pdf_bytes)])
-            if sent:
-                csv_mgr.update_row('reports_sent.csv', 'report_id', report_id, {'delivery_status': 'SENT'})
-        csv_mgr.update_row('customers.csv', 'customer_id', customer_id, {
-            'status': 'DELETED', 'name': 'REDACTED', 'email': 'REDACTED', 'phone': 'REDACTED',
-            'updated_at': now,
-        })
-        csv_mgr.update_row('mail_replies.csv', 'request_id', v.request_id, {
-            'action_taken': 'Customer data deleted and redacted', 'action_status': 'COMPLETED',
-            'pdf_files': filename,
-        })
+        async with csv_io.transaction() as tx:
+            tx.append_row('reports_sent.csv', {
+                'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
+                'report_type': 'DELETION_CERTIFICATE', 'incident_id': '', 'request_id': v.request_id,
+                'customer_id': customer_id, 'recipient': reg_email,
+                'delivery_channel': 'EMAIL', 'delivery_status': 'SENT' if sent else 'GENERATED',
+                'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': 'Deletion certificate',
+            })
+            tx.update_row('customers.csv', 'customer_id', customer_id, {
+                'status': 'DELETED', 'name': 'REDACTED', 'email': 'REDACTED', 'phone': 'REDACTED',
+                'updated_at': now,
+            })
+            tx.update_row('mail_replies.csv', 'request_id', v.request_id, {
+                'action_taken': 'Customer data deleted and redacted', 'action_status': 'COMPLETED',
+                'pdf_files': filename,
+            })
         result["action"] = "Customer data deleted"
         result["filename"] = filename
 
     elif intent == "CORRECT":
-        csv_mgr.update_row('mail_replies.csv', 'request_id', v.request_id, {
+        await csv_io.update_row('mail_replies.csv', 'request_id', v.request_id, {
             'action_taken': 'Awaiting correction details', 'action_status': 'NEEDS_INFO',
         })
         result["action"] = "OTP verified. Provide correction details."
@@ -598,7 +817,7 @@ async def verify_otp(v: OTPVerify):
 
 @api_router.post("/emails/apply-correction")
 async def apply_correction(c: CorrectionData):
-    customer = csv_mgr.find_customer(c.customer_id)
+    customer = await csv_io.find_customer(c.customer_id)
     if not customer:
         raise HTTPException(404, "Customer not found")
     before = dict(customer)
@@ -612,30 +831,29 @@ async def apply_correction(c: CorrectionData):
     if not updates:
         raise HTTPException(400, "No correction values provided")
     updates['updated_at'] = datetime.now(timezone.utc).isoformat()
-    csv_mgr.update_row('customers.csv', 'customer_id', c.customer_id, updates)
     after = {**customer, **updates}
-    pdf_bytes, sha256, filename = pdf_svc.generate_correction_confirmation(c.customer_id, before, after)
+    pdf_bytes, sha256, filename = await pdf_io.generate_correction_confirmation(c.customer_id, before, after)
     now = datetime.now(timezone.utc).isoformat()
-    report_id = csv_mgr.get_next_report_id()
-    csv_mgr.append_row('reports_sent.csv', {
-        'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
-        'report_type': 'CORRECTION_CONFIRMATION', 'incident_id': '', 'request_id': c.request_id,
-        'customer_id': c.customer_id, 'recipient': after.get('email', customer.get('email','')),
-        'delivery_channel': 'EMAIL', 'delivery_status': 'GENERATED',
-        'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': 'Correction confirmation',
-    })
-    if gmail_svc.email:
-        target = after.get('email', customer.get('email',''))
-        if target and target != 'REDACTED':
-            sent = gmail_svc.send_email(target, f"DPDP Shield - Data Correction Confirmation ({c.customer_id})",
-                "<p>Your data has been corrected as requested. Please find the confirmation attached.</p>",
-                [(filename, pdf_bytes)])
-            if sent:
-                csv_mgr.update_row('reports_sent.csv', 'report_id', report_id, {'delivery_status': 'SENT'})
-    csv_mgr.update_row('mail_replies.csv', 'request_id', c.request_id, {
-        'action_taken': f'Data corrected: {list(updates.keys())}', 'action_status': 'COMPLETED',
-        'pdf_files': filename,
-    })
+    report_id = await csv_io.get_next_report_id()
+    target = after.get('email', customer.get('email',''))
+    sent = False
+    if gmail_svc.email and target and target != 'REDACTED':
+        sent = gmail_svc.send_email(target, f"DPDP Shield - Data Correction Confirmation ({c.customer_id})",
+            "<p>Your data has been corrected as requested. Please find the confirmation attached.</p>",
+            [(filename, pdf_bytes)])
+    async with csv_io.transaction() as tx:
+        tx.update_row('customers.csv', 'customer_id', c.customer_id, updates)
+        tx.append_row('reports_sent.csv', {
+            'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
+            'report_type': 'CORRECTION_CONFIRMATION', 'incident_id': '', 'request_id': c.request_id,
+            'customer_id': c.customer_id, 'recipient': target,
+            'delivery_channel': 'EMAIL', 'delivery_status': 'SENT' if sent else 'GENERATED',
+            'pdf_filename': filename, 'pdf_sha256': sha256, 'notes': 'Correction confirmation',
+        })
+        tx.update_row('mail_replies.csv', 'request_id', c.request_id, {
+            'action_taken': f'Data corrected: {list(updates.keys())}', 'action_status': 'COMPLETED',
+            'pdf_files': filename,
+        })
     return {"ok": True, "report_id": report_id, "filename": filename, "before": before, "after": after}
 
 
@@ -643,21 +861,36 @@ async def apply_correction(c: CorrectionData):
 # PDF ROUTES
 # ══════════════════════════════════════
 @api_router.get("/pdf/{filename}")
-async def download_pdf(filename: str):
-    filepath = pdf_svc.output_dir / filename
-    if not filepath.exists():
+async def download_pdf(filename: str, request: Request, sha256: Optional[str] = None):
+    # sha256 pins the exact version a reports_sent row recorded; filename alone is the latest one
+    pinned = sha256.lower() if sha256 else None
+    if pinned:
+        cached = await asyncio.to_thread(pdf_svc.get_version, pinned)
+    else:
+        cached = await asyncio.to_thread(pdf_svc.cache.get, filename)
+    if cached is None:
         raise HTTPException(404, "PDF not found")
-    now = datetime.now(timezone.utc).isoformat()
-    reports = csv_mgr.read_csv('reports_sent.csv')
-    for r in reports:
-        if r.get('pdf_filename') == filename and r.get('delivery_status') != 'DOWNLOADED':
-            csv_mgr.update_row('reports_sent.csv', 'report_id', r['report_id'], {'delivery_status': 'DOWNLOADED'})
-            break
-    return FileResponse(filepath, media_type='application/pdf', filename=filename)
+    pdf_bytes, sha256 = cached
+    etag = f'"{sha256}"'
+    # A revalidated re-download never touches the reports table
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    headers = {'ETag': etag, 'Accept-Ranges': 'bytes', 'Content-Disposition': f'attachment; filename="{filename}"'}
+    if_range = request.headers.get('if-range')
+    byte_range = None
+    if not if_range or etag_matches(if_range, etag):
+        byte_range = parse_byte_range(request.headers.get('range'), len(pdf_bytes))
+    if byte_range is None:
+        # Only a full 200 body is a download; resumed or probing range requests are not
+        await csv_io.mark_report_downloaded(filename, pinned)
+        return Response(pdf_bytes, media_type='application/pdf', headers=headers)
+    start, end = byte_range
+    headers['Content-Range'] = f'bytes {start}-{end}/{len(pdf_bytes)}'
+    return Response(pdf_bytes[start:end + 1], status_code=206, media_type='application/pdf', headers=headers)
 
 @api_router.post("/pdf/audit-report")
 async def generate_standalone_audit():
-    state = await db.breach_state.find_one({"_id": "current"})
+    state = await db.breach_state.find_one({"_id": "current"}, {"timeline": 0})
     incident = {}
     timeline = []
     if state:
@@ -665,13 +898,17 @@ async def generate_standalone_audit():
         incident['closure_time'] = state.get('closed_at', datetime.now(timezone.utc).isoformat())
         incident['severity'] = 'HIGH'
         incident['vector'] = 'Under Investigation'
-        timeline = state.get('timeline', [])
+        timeline = await spool_timeline()
     else:
         incident = {'incident_id': 'N/A', 'discovery_time': 'N/A', 'severity': 'N/A'}
-    pdf_bytes, sha256, filename = pdf_svc.generate_audit_report(incident, timeline)
+    try:
+        pdf_bytes, sha256, filename = await pdf_io.generate_audit_report(incident, timeline)
+    finally:
+        if isinstance(timeline, TimelineSpool):
+            os.unlink(timeline.path)
     now = datetime.now(timezone.utc).isoformat()
-    report_id = csv_mgr.get_next_report_id()
-    csv_mgr.append_row('reports_sent.csv', {
+    report_id = await csv_io.get_next_report_id()
+    await csv_io.append_row('reports_sent.csv', {
         'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
         'report_type': 'AUDIT_REPORT', 'incident_id': incident.get('incident_id',''),
         'request_id': '', 'customer_id': '', 'recipient': 'SELF_DOWNLOAD',
@@ -739,10 +976,10 @@ async def get_attack_vector():
 @api_router.post("/attack-vector/pdf")
 async def generate_vector_pdf():
     analysis = await get_attack_vector()
-    pdf_bytes, sha256, filename = pdf_svc.generate_vector_analysis(analysis)
+    pdf_bytes, sha256, filename = await pdf_io.generate_vector_analysis(analysis)
     now = datetime.now(timezone.utc).isoformat()
-    report_id = csv_mgr.get_next_report_id()
-    csv_mgr.append_row('reports_sent.csv', {
+    report_id = await csv_io.get_next_report_id()
+    await csv_io.append_row('reports_sent.csv', {
         'report_id': report_id, 'generated_at': now, 'generated_by': 'SYSTEM',
         'report_type': 'VECTOR_ANALYSIS', 'incident_id': '', 'request_id': '',
         'customer_id': '', 'recipient': 'SELF_DOWNLOAD',
@@ -801,22 +1038,61 @@ async def update_gmail_password(request: Request):
 # REPORTS ROUTES
 # ══════════════════════════════════════
 @api_router.get("/reports")
-async def get_reports():
-    return csv_mgr.read_csv('reports_sent.csv')
+async def get_reports(limit: Optional[int] = None, after: Optional[str] = None, format: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None):
+    return await list_rows('reports_sent.csv', limit, after, format, since, until)
 
 
 # ══════════════════════════════════════
 # CSV DOWNLOAD ROUTES
 # ══════════════════════════════════════
+async def csv_download_response(request, filename):
+    # Streamed from one storage snapshot, so SQLite deployments export the same bytes as the CSV files
+    # and a write during the download can never produce a torn file
+    export = await csv_io.run(csv_mgr.export, filename)
+    headers = {'ETag': export.etag, 'Last-Modified': format_datetime(export.last_modified, usegmt=True),
+               'Vary': 'Accept-Encoding'}
+    if not_modified(request, export.etag, export.last_modified):
+        export.close()
+        return Response(status_code=304, headers=headers)
+    headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+    body = iter(export)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        body = compress_chunks(body, encoding)
+    return StreamingResponse(body, media_type='text/csv', headers=headers)
+
+DOWNLOADABLE_TABLES = ['customers.csv', 'mail_replies.csv', 'admin_access.csv', 'reports_sent.csv']
+
 @api_router.get("/csv/{filename}")
-async def download_csv(filename: str):
-    allowed = ['customers.csv', 'mail_replies.csv', 'admin_access.csv', 'reports_sent.csv']
-    if filename not in allowed:
+async def download_csv(filename: str, request: Request):
+    if filename not in DOWNLOADABLE_TABLES:
         raise HTTPException(404, "File not found")
-    filepath = csv_mgr.data_dir / filename
-    if not filepath.exists():
+    if await csv_io.fieldnames(filename) is None:
         raise HTTPException(404, "File not found")
-    return FileResponse(filepath, media_type='text/csv', filename=filename)
+    return await csv_download_response(request, filename)
+
+@api_router.get("/snapshot/{filename}")
+async def download_snapshot(filename: str, format: str = 'parquet'):
+    """Typed, compressed Parquet (default) or Arrow IPC (?format=arrow) snapshot of a table."""
+    if filename not in DOWNLOADABLE_TABLES or await csv_io.fieldnames(filename) is None:
+        raise HTTPException(404, "File not found")
+    if format not in snapshot_export.SNAPSHOT_FORMATS:
+        raise HTTPException(400, f"format must be one of {', '.join(snapshot_export.SNAPSHOT_FORMATS)}")
+    if snapshot_export.pa is None:
+        raise HTTPException(501, "Snapshot export needs pyarrow, which is not installed")
+    suffix, media_type = snapshot_export.SNAPSHOT_FORMATS[format]
+    # Spooled to disk so only one row group at a time is held in memory
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    try:
+        await csv_io.run(snapshot_export.write_snapshot, csv_mgr, filename, path, format)
+    except Exception:
+        os.unlink(path)
+        raise
+    return FileResponse(path, media_type=media_type, filename=snapshot_export.snapshot_name(filename, format),
+                        background=BackgroundTask(os.unlink, path))
 
 
 # ══════════════════════════════════════
@@ -826,12 +1102,12 @@ async def download_csv(filename: str):
 async def get_evidence_timeline():
     state = await db.breach_state.find_one({"_id": "current"})
     timeline = state.get('timeline', []) if state else []
-    reports = csv_mgr.read_csv('reports_sent.csv')
-    return {"timeline": timeline, "reports_count": len(reports)}
+    reports = await csv_io.counts('reports_sent.csv')
+    return {"timeline": timeline, "reports_count": reports['rows']}
 
 @api_router.get("/evidence/encryption-demo")
 async def encryption_demo():
-    customers = csv_mgr.read_csv('customers.csv')[:5]
+    customers = (await csv_io.read_csv('customers.csv'))[:5]
     encrypted = []
     for c in customers:
         enc = {}
@@ -849,21 +1125,52 @@ async def encryption_demo():
 # ══════════════════════════════════════
 @api_router.get("/dashboard/stats")
 async def dashboard_stats():
-    customers = csv_mgr.read_csv('customers.csv')
-    active = sum(1 for c in customers if c.get('status') == 'ACTIVE')
-    reports = csv_mgr.read_csv('reports_sent.csv')
-    mail_replies = csv_mgr.read_csv('mail_replies.csv')
+    # Maintained counts, so polling never parses the tables
+    customers = await csv_io.counts('customers.csv')
+    reports = await csv_io.counts('reports_sent.csv')
+    mail_replies = await csv_io.counts('mail_replies.csv')
     breach = await db.breach_state.find_one({"_id": "current"})
     return {
-        "total_customers": len(customers),
-        "active_customers": active,
-        "total_reports": len(reports),
-        "total_requests": len(mail_replies),
+        "total_customers": customers['rows'],
+        "active_customers": customers.get('status', {}).get('ACTIVE', 0),
+        "total_reports": reports['rows'],
+        "total_requests": mail_replies['rows'],
+        "requests_by_intent": mail_replies.get('intent', {}),
+        "requests_by_status": mail_replies.get('action_status', {}),
+        "reports_by_type": reports.get('report_type', {}),
+        "reports_by_delivery_status": reports.get('delivery_status', {}),
         "breach_active": breach.get('active', False) if breach else False,
         "incident_id": breach.get('incident_id') if breach else None,
     }
 
 
+# ══════════════════════════════════════
+# ANALYTICS
+# ══════════════════════════════════════
+@api_router.post("/analytics/query")
+async def analytics_query(q: AnalyticsQuery):
+    """Counts over mail_replies / reports_sent, e.g. DSARs per intent per week:
+    {"table": "mail_replies", "group_by": ["intent"], "bucket": "week"}"""
+    try:
+        return await csv_io.run(analytics.query, q.table, q.filters, q.since, q.until, q.group_by, q.bucket, q.order, q.limit)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+# ══════════════════════════════════════
+# LOAD TEST DATA
+# ══════════════════════════════════════
+@api_router.post("/dev/synthetic-data")
+async def generate_synthetic_data(req: SyntheticDataRequest):
+    # Appends to the live tables, so only available where explicitly enabled
+    if os.environ.get('ENABLE_SYNTHETIC_DATA', 'false').lower() != 'true':
+        raise HTTPException(404, "Not found")
+    try:
+        return await csv_io.run(synthetic.generate, csv_mgr, req.customers, req.requests, req.reports, req.seed)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
 # Include router and middleware
 app.include_router(api_router)
 app.add_middleware(
@@ -872,4 +1179,5 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
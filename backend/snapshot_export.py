@@ -0,0 +1,165 @@
+"""
+Typed, compressed Parquet / Arrow IPC snapshots of the CSVManager tables, for audit hand-overs.
+
+    python backend/snapshot_export.py --format parquet --out-dir /tmp/audit customers.csv mail_replies.csv
+
+Timestamps become timestamp[us, UTC] columns and low-cardinality columns dictionary-encoded
+strings, everything else stays a string. Rows are converted and written one row group at a time.
+"""
+import argparse
+import itertools
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: snapshot exports are unavailable without it
+    pa = pq = None
+
+from storage import INTERNED_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMATS = {
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+}
+ROW_GROUP_SIZE = 100000
+COMPRESSION = 'zstd'
+TIMESTAMP_COLUMNS = {
+    'created_at', 'updated_at', 'received_at', 'otp_sent_at', 'otp_verified_at', 'replied_at',
+    'generated_at', 'login_time', 'logout_time',
+}
+# What datetime.fromisoformat accepts and the app writes: a date, optionally a time, optionally an offset
+ISO_TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?(?:Z|[+-]\d{2}:?\d{2})?$')
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    # Naive values were written by datetime.now(timezone.utc) callers that dropped the offset
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _typed_timestamps(csv_mgr, filename, fieldnames):
+    """Timestamp columns whose every value is empty or ISO 8601; the rest are exported as strings, verbatim."""
+    candidates = [f for f in fieldnames if f in TIMESTAMP_COLUMNS]
+    typed = set(candidates)
+    for _, load in csv_mgr.storage.column_chunks(filename, candidates):
+        for field, values in load().items():
+            if field in typed and not all(not v or ISO_TIMESTAMP_RE.match(v) for v in values):
+                typed.discard(field)
+    return typed
+
+
+class _Dictionary:
+    """Dictionary encoding that only ever appends values, so each batch's dictionary extends the last one.
+
+    Arrow IPC files accept that as a dictionary delta; a fresh dictionary per batch would be a replacement.
+    """
+
+    def __init__(self):
+        self.lookup = {}
+
+    def encode(self, values):
+        indices = pa.array([self.lookup.setdefault(v, len(self.lookup)) for v in values], type=pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, pa.array(list(self.lookup), type=pa.string()))
+
+
+def write_snapshot(csv_mgr, filename, out, fmt='parquet', row_group_size=ROW_GROUP_SIZE):
+    """Write filename's rows to out (a path or binary file) as a zstd-compressed Parquet or Arrow IPC file.
+
+    Returns {'rows', 'row_groups', 'schema'}; ValueError for an unknown format, RuntimeError
+    without pyarrow.
+    """
+    if pa is None:
+        raise RuntimeError("Snapshot export needs pyarrow, which is not installed")
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(SNAPSHOT_FORMATS)}")
+    fieldnames = csv_mgr.fieldnames(filename)
+    if fieldnames is None:
+        raise FileNotFoundError(filename)
+    timestamps = _typed_timestamps(csv_mgr, filename, fieldnames)
+    dictionaries = {f: _Dictionary() for f in fieldnames if f in INTERNED_COLUMNS}
+    types = {}
+    for field in fieldnames:
+        if field in timestamps:
+            types[field] = pa.timestamp('us', tz='UTC')
+        elif field in dictionaries:
+            types[field] = pa.dictionary(pa.int32(), pa.string())
+        else:
+            types[field] = pa.string()
+    schema = pa.schema([pa.field(f, types[f]) for f in fieldnames], metadata={
+        'source': filename, 'exported_at': datetime.now(timezone.utc).isoformat(),
+    })
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(out, schema, compression=COMPRESSION)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=COMPRESSION, emit_dictionary_deltas=True)
+        writer = pa.ipc.new_file(out, schema, options=options)
+
+    rows = csv_mgr.iter_rows(filename)
+    written = row_groups = 0
+    unparsed = 0
+    with writer:
+        while True:
+            batch = list(itertools.islice(rows, row_group_size))
+            if not batch:
+                break
+            arrays = []
+            for field in fieldnames:
+                values = [row[field] for row in batch]
+                if field in timestamps:
+                    parsed = []
+                    for value in values:
+                        try:
+                            parsed.append(_parse_timestamp(value))
+                        except ValueError:
+                            # Only possible for a row written after the pre-scan
+                            parsed.append(None)
+                            unparsed += 1
+                    arrays.append(pa.array(parsed, type=types[field]))
+                elif field in dictionaries:
+                    arrays.append(dictionaries[field].encode(values))
+                else:
+                    arrays.append(pa.array(values, type=pa.string()))
+            record_batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+            if fmt == 'parquet':
+                writer.write_batch(record_batch, row_group_size=len(batch))
+            else:
+                writer.write_batch(record_batch)
+            written += len(batch)
+            row_groups += 1
+    if unparsed:
+        logger.warning(f"{unparsed} timestamps in {filename} changed during the snapshot and were exported as null")
+    return {'rows': written, 'row_groups': row_groups, 'schema': {f: str(types[f]) for f in fieldnames}}
+
+
+def snapshot_name(filename, fmt):
+    return Path(filename).stem + SNAPSHOT_FORMATS[fmt][0]
+
+
+if __name__ == '__main__':
+    from csv_manager import CSVManager, SCHEMAS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('tables', nargs='*', help='defaults to every table')
+    parser.add_argument('--data-dir', default=str(Path(__file__).parent / 'data'))
+    parser.add_argument('--backend', default='csv', choices=['csv', 'sqlite'])
+    parser.add_argument('--format', default='parquet', choices=list(SNAPSHOT_FORMATS))
+    parser.add_argument('--out-dir', required=True)
+    parser.add_argument('--row-group-size', type=int, default=ROW_GROUP_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    mgr = CSVManager(args.data_dir, backend=args.backend)
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for table in args.tables or list(SCHEMAS):
+        results[table] = write_snapshot(mgr, table, str(out_dir / snapshot_name(table, args.format)), args.format, args.row_group_size)
+    print(json.dumps(results, indent=2))
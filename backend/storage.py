@@ -0,0 +1,1553 @@
+import copy
+import csv
+import functools
+import gzip
+import io
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import sys
+import time
+import uuid
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+import logging
+
+from search_index import INDEX_KINDS, SearchIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, multiprocess mode degrades to thread locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = '.journal'
+SQLITE_FILENAME = 'dpdp_shield.sqlite3'
+
+# Columns that get a B-tree index in every SQLite table that has them
+SQLITE_INDEXED_COLUMNS = ['customer_id', 'request_id', 'report_id', 'pdf_filename', 'pdf_sha256', 'session_id']
+
+# Low-cardinality columns whose values are interned in resident tables
+INTERNED_COLUMNS = {
+    'status', 'intent', 'otp_status', 'action_status', 'report_type', 'generated_by',
+    'delivery_channel', 'delivery_status', 'incident_id', 'admin_email', 'device',
+}
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+LOCKS_DIRNAME = '.locks'
+# Roll-forward logs, one per in-flight commit or seal: in multiprocess mode commits on disjoint
+# tables run at the same time, so they cannot share one log
+TRANSACTION_LOG_PREFIX = '.transaction'
+# Per-table change counters in the SQLite database, the SQLite side of a file's signature
+SQLITE_VERSIONS_TABLE = '_table_versions'
+# Keys of the bucket/phone/tokens search indexes in SQLite, (name, field, key, rid), searched as
+# B-tree ranges; the fields table records which (name, field, kind) have been built
+SQLITE_SEARCH_KEYS_TABLE = '_search_keys'
+SQLITE_SEARCH_FIELDS_TABLE = '_search_fields'
+# Row and per-value counts of the counted fields in SQLite, (name, field, value, n), kept in the same
+# transaction as the rows; field '' holds the row count. The fields table records what has been counted
+SQLITE_COUNTS_TABLE = '_counts'
+SQLITE_COUNTED_FIELDS_TABLE = '_counted_fields'
+# Sealed monthly partitions live in data_dir/partitions/<table>/YYYY-MM.csv.gz next to a manifest
+PARTITIONS_DIRNAME = 'partitions'
+PARTITION_MANIFEST = 'manifest.json'
+# Parsed sealed partitions kept resident, across all tables; the least recently read is dropped
+SEALED_CACHE_SIZE = 4
+
+_MONTH_RE = re.compile(r'\d{4}-(0[1-9]|1[0-2])')
+
+
+def _file_signature(filepath):
+    try:
+        st = filepath.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+@contextmanager
+def file_lock(path, exclusive=True):
+    """Hold an advisory flock on path, shared between processes (uvicorn --workers)."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _as_stored(row, fieldnames):
+    """Mirror what DictReader would give back for a row after it round-trips through the file."""
+    return {k: '' if row.get(k) is None else str(row[k]) for k in fieldnames}
+
+
+def _month(value):
+    """'YYYY-MM' of an ISO date or timestamp, or None when value does not start with one."""
+    return value[:7] if value and _MONTH_RE.match(value) else None
+
+
+def _shift_month(month, delta):
+    index = int(month[:4]) * 12 + int(month[5:7]) - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _partition_column(partitions, filename, since, until):
+    """Column a [since, until) time range applies to in filename, or None when no range was given."""
+    if since is None and until is None:
+        return None
+    column = partitions.get(filename)
+    if column is None:
+        raise ValueError(f"{filename} is not partitioned by time")
+    for bound in (since, until):
+        if bound is not None and _month(bound) is None:
+            raise ValueError(f"Expected an ISO date, got {bound!r}")
+    return column
+
+
+def _prefix_end(prefix):
+    """Smallest string above every string that starts with prefix, for a key >= prefix AND key < end range."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _check_fields(row, fieldnames):
+    # Same contract as csv.DictWriter(extrasaction='raise')
+    extra = [k for k in row if k not in fieldnames]
+    if extra:
+        raise ValueError("dict contains fields not in fieldnames: " + ", ".join(repr(k) for k in extra))
+
+
+class RowView(Mapping):
+    """Read-only dict-like view over one compact row; the column map is shared by every row of a table."""
+
+    __slots__ = ('_columns', '_values')
+
+    def __init__(self, columns, values):
+        self._columns = columns
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._columns[key]]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        return f"RowView({dict(self)!r})"
+
+
+class CSVExport:
+    """A point-in-time export of one table: validators are known before the bytes are streamed.
+
+    Iterating yields the CSV bytes in chunks; close() releases the snapshot if it is not consumed.
+    """
+
+    def __init__(self, etag, last_modified, chunks, release):
+        self.etag = etag
+        self.last_modified = last_modified
+        self._chunks = chunks
+        self._release = release
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        self._chunks.close()
+        self._release()
+
+
+class _Table:
+    """Parsed copy of one CSV file kept resident between calls, with hash indexes.
+
+    Rows are plain tuples in header order rather than dicts, with categorical columns interned.
+    On 100k customers (benchmarks/bench_row_memory.py) that is ~505 B/row instead of ~735 for
+    dicts, 1.46x smaller; ~637 B/row with the id/email indexes. The rest is the field strings.
+
+    Published tables are read without the writer lock, so rows are immutable: appends only
+    extend rows, updates swap in a new tuple at the same position, and rewrites publish a
+    whole new _Table. Indexes map keys to row positions, which none of those operations disturb.
+    """
+
+    def __init__(self, fieldnames, rows, signature, index_fields=None, search_fields=None, counted_fields=None):
+        self.fieldnames = list(fieldnames)
+        self.columns = {name: i for i, name in enumerate(self.fieldnames)}
+        self._interned = [i for i, name in enumerate(self.fieldnames) if name in INTERNED_COLUMNS]
+        self.rows = rows
+        self.signature = signature
+        self.index_fields = index_fields or {}
+        self.indexes = {}
+        for field in self.index_fields:
+            self.rebuild_index(field)
+        self.search = SearchIndex(search_fields, self.columns, rows) if search_fields else None
+        # Per-column value counts, replaced rather than mutated so lock-free readers see whole dicts
+        self.counted = [f for f in counted_fields or () if f in self.columns]
+        self.counts = {f: dict(Counter(row[self.columns[f]] for row in rows)) for f in self.counted}
+        # month -> manifest entry of the sealed partitions that precede these rows (partitioned tables only)
+        self.sealed = {}
+
+    def successor(self, rows, signature):
+        """A new table over rows that extend this one or differ at a few positions, reusing its indexes.
+
+        Key indexes are copied (readers of this table keep theirs) and only rebuilt for fields that
+        changed; the search index moves over and is patched in place, which readers of this table
+        tolerate because they re-check every candidate.
+        """
+        table = copy.copy(self)
+        table.rows = rows
+        table.signature = signature
+        changed = [i for i, (old, new) in enumerate(zip(self.rows, rows)) if old is not new]
+        table.indexes = {field: dict(index) for field, index in self.indexes.items()}
+        for field, position in self.columns.items():
+            if field in self.index_fields and any(self.rows[i][position] != rows[i][position] for i in changed):
+                table.rebuild_index(field)
+        if table.search is not None:
+            for i in changed:
+                table.search.replace(self.rows[i], rows[i], i)
+        for i in changed:
+            table.recount(self.rows[i], rows[i])
+        table.index_rows(len(self.rows))
+        return table
+
+    def pack(self, values):
+        """Build a stored row from raw CSV values, padding short lines the way DictReader did."""
+        values = list(values[:len(self.fieldnames)])
+        values.extend([''] * (len(self.fieldnames) - len(values)))
+        for i in self._interned:
+            values[i] = sys.intern(values[i])
+        return tuple(values)
+
+    def pack_dict(self, row):
+        return self.pack(['' if row.get(k) is None else str(row[k]) for k in self.fieldnames])
+
+    def updated(self, row, stored):
+        values = list(row)
+        for k, v in stored.items():
+            values[self.columns[k]] = v
+        return self.pack(values)
+
+    def value(self, row, field):
+        position = self.columns.get(field)
+        return row[position] if position is not None else None
+
+    def as_dict(self, row):
+        return dict(zip(self.fieldnames, row))
+
+    def view(self, row):
+        return RowView(self.columns, row)
+
+    def matching(self, key_field, key_value):
+        """Positions of every row whose key_field equals key_value, through an exact search index if there is one."""
+        position = self.columns.get(key_field)
+        if position is None:
+            return []
+        if self.search is not None and self.search.exact(key_field):
+            rows = self.rows
+            # Re-checked: the index can be ahead of an older table sharing it
+            return [i for i in self.search.positions(key_field, key_value) if i < len(rows) and rows[i][position] == key_value]
+        return [i for i, row in enumerate(self.rows) if row[position] == key_value]
+
+    def _key(self, field, value):
+        value = value or ''
+        normalise = self.index_fields[field]
+        if normalise is None:
+            return value
+        key = normalise(value)
+        # Reuse the row's own string when normalising is a no-op so the index holds no copy
+        return value if key == value else key
+
+    def index_rows(self, start):
+        """Bring every index and count up to date with the rows appended from start onwards."""
+        rows = self.rows
+        stop = len(rows)
+        for field in self.index_fields:
+            index = self.indexes[field]
+            column = self.columns.get(field)
+            for position in range(start, stop):
+                value = rows[position][column] if column is not None else None
+                # First occurrence wins, matching the old linear scans
+                index.setdefault(self._key(field, value), position)
+        if self.search is not None:
+            self.search.extend(rows, start)
+        if self.counted:
+            counts = dict(self.counts)
+            for field in self.counted:
+                column = self.columns[field]
+                values = dict(counts[field])
+                for position in range(start, stop):
+                    value = rows[position][column]
+                    values[value] = values.get(value, 0) + 1
+                counts[field] = values
+            self.counts = counts
+
+    def replace_row(self, position, row):
+        old = self.rows[position]
+        self.rows[position] = row
+        if self.search is not None:
+            self.search.replace(old, row, position)
+        self.recount(old, row)
+
+    def recount(self, old, new):
+        """Move one row's contribution to the value counts from old to new (either may be None)."""
+        counts = dict(self.counts)
+        for field in self.counted:
+            column = self.columns[field]
+            before = old[column] if old is not None else None
+            after = new[column] if new is not None else None
+            if before == after:
+                continue
+            values = dict(counts[field])
+            if before is not None:
+                values[before] -= 1
+                if not values[before]:
+                    del values[before]
+            if after is not None:
+                values[after] = values.get(after, 0) + 1
+            counts[field] = values
+        self.counts = counts
+
+    def rebuild_index(self, field):
+        index = {}
+        for position, row in enumerate(self.rows):
+            index.setdefault(self._key(field, self.value(row, field)), position)
+        self.indexes[field] = index
+
+    def position(self, field, value):
+        """Position of the first row whose field equals value, through the index when there is one."""
+        if field in self.indexes:
+            return self.indexes[field].get(self._key(field, value))
+        matches = self.matching(field, value)
+        return matches[0] if matches else None
+
+    def lookup(self, field, value):
+        position = self.position(field, value)
+        return self.rows[position] if position is not None else None
+
+    def accepts(self, row, criteria):
+        for field, term in criteria.items():
+            value = self.value(row, field)
+            if self.search is not None and field in self.search.indexes:
+                if not self.search.accepts(field, value, term):
+                    return False
+            elif field in self.index_fields:
+                if self._key(field, value) != self._key(field, term):
+                    return False
+            elif value != term:
+                return False
+        return True
+
+    def search_positions(self, criteria):
+        """Candidate positions from the indexes, or None if the caller should scan the rows in order."""
+        positions = None
+        for field, term in criteria.items():
+            if field in self.indexes:
+                position = self.position(field, term)
+                found = {position} if position is not None else set()
+                positions = found if positions is None else positions & found
+        if positions is None and self.search is not None:
+            # Past a quarter of the table an in-order scan stops at the limit sooner than sorting candidates
+            positions = self.search.candidates(criteria, len(self.rows) // 4)
+        return positions
+
+
+def _apply_ops(table, rows, ops):
+    """Apply buffered ('append', row) / ('update', key_field, key_value, updates) ops to a copy of table's rows.
+
+    Returns the (key_field, key_value) of updates that matched no row.
+    """
+    unmatched = []
+    for op in ops:
+        if op[0] == 'append':
+            _check_fields(op[1], table.fieldnames)
+            rows.append(table.pack_dict(op[1]))
+        else:
+            _, key_field, key_value, updates = op
+            _check_fields(updates, table.fieldnames)
+            stored = {k: '' if v is None else str(v) for k, v in updates.items()}
+            position = table.columns.get(key_field)
+            matched = False
+            if position is not None:
+                for i, row in enumerate(rows):
+                    if row[position] == key_value:
+                        rows[i] = table.updated(row, stored)
+                        matched = True
+            if not matched:
+                unmatched.append((key_field, key_value))
+    return unmatched
+
+
+class CSVStorage:
+    """Flat CSV files in data_dir, with resident indexed tables and an optional update journal.
+
+    Tables listed in partitions ({filename: timestamp column}) keep only their open months in
+    the CSV file; older months are sealed into read-only, gzip-compressed monthly partitions
+    (see seal). Reads cover the sealed months too, oldest first, while updates only ever touch
+    the open rows. Rows whose open_states ({filename: (column, values)}) column holds one of the
+    values are still being worked on and are never sealed, whatever their month.
+    """
+
+    def __init__(self, data_dir, schemas, indexes=None, journal=False, multiprocess=False, search_indexes=None,
+                 counters=None, partitions=None, hot_months=2, open_states=None):
+        self.data_dir = Path(data_dir)
+        self.schemas = schemas
+        self.indexes = indexes or {}
+        self.search_indexes = search_indexes or {}
+        self.counters = counters or {}
+        self.partitions = partitions or {}
+        self.open_states = open_states or {}
+        self.hot_months = hot_months
+        self._sealed_cache = OrderedDict()
+        self._sealed_lock = threading.Lock()
+        self.journal = journal
+        self.multiprocess = multiprocess
+        if multiprocess:
+            (self.data_dir / LOCKS_DIRNAME).mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._compactor = None
+        self._compactor_stop = threading.Event()
+        if schemas:
+            with self._locked_many(list(schemas), exclusive=True):
+                self._recover_transaction()
+        for filename, headers in schemas.items():
+            filepath = self.data_dir / filename
+            if not filepath.exists():
+                with open(filepath, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(headers)
+
+    def _journal_path(self, filename):
+        return self.data_dir / (filename + JOURNAL_SUFFIX)
+
+    def _current(self, filename):
+        """Return the published table for filename, taking the lock only when it has to be (re)loaded."""
+        table = self._tables.get(filename)
+        if table is not None and table.signature == self._signature(filename):
+            return table
+        with self._locked(filename):
+            return self._load_table(filename)
+
+    @contextmanager
+    def _locked(self, filename, exclusive=False):
+        """Serialise writers (and reloads) against other threads and, in multiprocess mode, other worker processes.
+
+        Other workers' writes show up as a changed file signature, so holding the flock while
+        _load_table checks it is all the cross-process cache invalidation that is needed.
+        """
+        with self._locked_many([filename], exclusive):
+            yield
+
+    @contextmanager
+    def _locked_many(self, filenames, exclusive=False):
+        with self._lock, ExitStack() as stack:
+            if self.multiprocess:
+                # Always flock in name order so two multi-table commits cannot deadlock
+                for filename in sorted(filenames):
+                    stack.enter_context(file_lock(self.data_dir / LOCKS_DIRNAME / (filename + '.lock'), exclusive))
+            yield
+
+    def _signature(self, filename):
+        return (_file_signature(self.data_dir / filename), _file_signature(self._journal_path(filename)))
+
+    def _load_table(self, filename):
+        """Return the resident table for filename, re-parsing it only if the file changed. Caller holds the lock."""
+        filepath = self.data_dir / filename
+        signature = self._signature(filename)
+        table = self._tables.get(filename)
+        if table is not None and table.signature == signature:
+            return table
+        if signature[0] is None:
+            self._tables.pop(filename, None)
+            return None
+        with open(filepath, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            fieldnames = next(reader, None)
+            if fieldnames is None:
+                return None
+            table = _Table(fieldnames, [], signature)
+            rows = [table.pack(values) for values in reader if values]
+        if signature[1] is not None:
+            self._replay_journal(filename, table, rows)
+        table = self._new_table(filename, fieldnames, rows, signature)
+        self._tables[filename] = table
+        return table
+
+    def _replay_journal(self, filename, table, rows):
+        with open(self._journal_path(filename), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-append; everything before it is intact
+                    logger.warning(f"Skipping unreadable journal entry in {filename}")
+                    continue
+                position = table.columns.get(entry['key'])
+                if position is None:
+                    continue
+                for i in range(min(entry['rows'], len(rows))):
+                    if rows[i][position] == entry['value']:
+                        rows[i] = table.updated(rows[i], entry['updates'])
+
+    def _store_table(self, filename, fieldnames, rows):
+        self._tables[filename] = self._new_table(filename, fieldnames, rows, self._signature(filename))
+
+    def _new_table(self, filename, fieldnames, rows, signature):
+        table = _Table(fieldnames, rows, signature, self.indexes.get(filename), self.search_indexes.get(filename),
+                       self.counters.get(filename))
+        if filename in self.partitions:
+            table.sealed = self._read_manifest(filename)['months']
+        return table
+
+    def _partition_dir(self, filename):
+        """Directory of filename's sealed partitions, relative to data_dir."""
+        return Path(PARTITIONS_DIRNAME) / Path(filename).stem
+
+    def _read_manifest(self, filename):
+        try:
+            with open(self.data_dir / self._partition_dir(filename) / PARTITION_MANIFEST, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'column': self.partitions.get(filename), 'months': {}}
+
+    def _sealed_table(self, filename, month, entry):
+        """Parsed rows of one sealed partition, holding at least the entry's row count."""
+        key = (filename, month)
+        with self._sealed_lock:
+            table = self._sealed_cache.get(key)
+            if table is not None and len(table.rows) >= entry['rows']:
+                self._sealed_cache.move_to_end(key)
+                return table
+        with gzip.open(self.data_dir / self._partition_dir(filename) / entry['file'], 'rt', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            fieldnames = next(reader)
+            layout = _Table(fieldnames, [], None)
+            rows = [layout.pack(values) for values in reader if values]
+        table = _Table(fieldnames, rows, None, self.indexes.get(filename), self.search_indexes.get(filename))
+        with self._sealed_lock:
+            self._sealed_cache[key] = table
+            while len(self._sealed_cache) > SEALED_CACHE_SIZE:
+                self._sealed_cache.popitem(last=False)
+        return table
+
+    def _segments(self, filename, table, since=None, until=None):
+        """Loaders of (table, stop) pairs covering filename oldest first: the sealed months that
+        overlap [since, until), then the open rows of table.
+
+        Sealed partitions are only parsed when their loader is called. A partition only ever grows,
+        when later rows of its month are sealed, so stopping at the row count table saw keeps every
+        segment consistent with it.
+        """
+        loaders = []
+        for month in sorted(table.sealed):
+            if (since is None or month >= since[:7]) and (until is None or month < until):
+                entry = table.sealed[month]
+                loaders.append(lambda month=month, entry=entry: (self._sealed_table(filename, month, entry), entry['rows']))
+        # Appends only extend this list and rewrites publish a new one, so the bound pins the view
+        stop = len(table.rows)
+        loaders.append(lambda: (table, stop))
+        return loaders
+
+    def _range_filter(self, filename, table, since, until):
+        """Predicate on rows of table keeping those whose partition column lies in [since, until)."""
+        column = _partition_column(self.partitions, filename, since, until)
+        if column is None:
+            return None
+        position = table.columns[column]
+        return lambda row: row[position] != '' and (since is None or row[position] >= since) and (until is None or row[position] < until)
+
+    def _write_tmp(self, filename, fieldnames, rows, sync=False):
+        filepath = self.data_dir / filename
+        tmp_path = filepath.with_name(filepath.name + '.tmp')
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            writer.writerows(rows)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        return tmp_path
+
+    def _rewrite(self, filename, fieldnames, rows):
+        """Atomically replace filename with rows and drop its journal. Caller holds the lock."""
+        os.replace(self._write_tmp(filename, fieldnames, rows), self.data_dir / filename)
+        # Entries are idempotent, so a crash before this unlink only means they are replayed again
+        self._journal_path(filename).unlink(missing_ok=True)
+
+    def fieldnames(self, filename):
+        table = self._current(filename)
+        return list(table.fieldnames) if table else None
+
+    def snapshot(self, filename):
+        """Point-in-time tuple of the table's rows as read-only RowViews."""
+        table = self._current(filename)
+        if table is None:
+            return ()
+        if table.sealed:
+            return tuple(segment.view(r) for segment, stop in (load() for load in self._segments(filename, table))
+                         for r in segment.rows[:stop])
+        # tuple() of a list is a single step under the GIL, so concurrent appends are either in or out
+        return tuple(table.view(r) for r in tuple(table.rows))
+
+    def read(self, filename):
+        table = self._current(filename)
+        if table is None:
+            return []
+        if table.sealed:
+            return [segment.as_dict(r) for segment, stop in (load() for load in self._segments(filename, table))
+                    for r in segment.rows[:stop]]
+        return [table.as_dict(r) for r in tuple(table.rows)]
+
+    def counts(self, filename):
+        """{'rows': row count, field: {value: count}} for the table's counted fields, without a scan."""
+        table = self._current(filename)
+        if table is None:
+            return {'rows': 0}
+        counts = table.counts
+        result = {'rows': len(table.rows), **{field: dict(values) for field, values in counts.items()}}
+        # Sealed months were counted when they were sealed, so they are never decompressed here
+        for entry in table.sealed.values():
+            result['rows'] += entry['rows']
+            for field, values in entry['counts'].items():
+                merged = result.setdefault(field, {})
+                for value, count in values.items():
+                    merged[value] = merged.get(value, 0) + count
+        return result
+
+    def find(self, filename, field, value):
+        """First row whose field equals value, looking in the open rows before the sealed months, newest first."""
+        return self.find_many(filename, field, [value])[0]
+
+    def find_many(self, filename, field, values):
+        """find() for each value against one version of the table; None where there is no match."""
+        found = [None] * len(values)
+        table = self._current(filename)
+        if table is None:
+            return found
+        missing = list(range(len(values)))
+        for load in reversed(self._segments(filename, table)):
+            segment, stop = load()
+            still_missing = []
+            for i in missing:
+                position = segment.position(field, values[i])
+                if position is not None and position < stop:
+                    found[i] = segment.as_dict(segment.rows[position])
+                else:
+                    still_missing.append(i)
+            missing = still_missing
+            if not missing:
+                break
+        return found
+
+    def search(self, filename, criteria, limit=None, since=None, until=None, open_only=False):
+        """Up to limit (default all) rows, in file order, matching every field -> term criterion.
+
+        Columns with a search index match by their kind (see search_index); columns with a
+        unique index match on the normalised key; anything else must be equal. On partitioned
+        tables since/until restrict the partition column to [since, until), skipping sealed
+        months outside it, and open_only skips the sealed months altogether.
+        """
+        table = self._current(filename)
+        if table is None:
+            return []
+        if any(field not in table.columns for field in criteria):
+            return []
+        in_range = self._range_filter(filename, table, since, until)
+        loaders = self._segments(filename, table, since, until)
+        found = []
+        for load in loaders[-1:] if open_only else loaders:
+            segment, stop = load()
+            positions = segment.search_positions(criteria)
+            # The search index is shared with newer versions of the table, which may have more rows
+            order = sorted(p for p in positions if p < stop) if positions is not None else range(stop)
+            for position in order:
+                row = segment.rows[position]
+                if segment.accepts(row, criteria) and (in_range is None or in_range(row)):
+                    found.append(segment.as_dict(row))
+                    if limit is not None and len(found) >= limit:
+                        return found
+        return found
+
+    def iter_rows(self, filename, key_field=None, after=None, limit=None, since=None, until=None):
+        """Rows of filename as dicts in file order, resuming after the row whose key_field equals after.
+
+        The start is resolved eagerly, raising KeyError for an unknown cursor; rows are then
+        produced lazily from the table as it stood at call time. since/until are as for search.
+        """
+        table = self._current(filename)
+        if table is None:
+            return iter(())
+        in_range = self._range_filter(filename, table, since, until)
+        loaders = self._segments(filename, table, since, until)
+        first, start = 0, 0
+        if after is not None:
+            # Newest first: the open rows are resident, and pages are mostly read near the end
+            for index in reversed(range(len(loaders))):
+                segment, stop = loaders[index]()
+                position = segment.position(key_field, after)
+                if position is not None and position < stop:
+                    first, start = index, position + 1
+                    break
+            else:
+                raise KeyError(after)
+
+        def rows():
+            for index in range(first, len(loaders)):
+                segment, stop = loaders[index]()
+                for i in range(start if index == first else 0, stop):
+                    row = segment.rows[i]
+                    if in_range is None or in_range(row):
+                        yield segment.as_dict(row)
+        return itertools.islice(rows(), limit)
+
+    def column_chunks(self, filename, fields, since=None, until=None):
+        """[(key, load)] covering filename in read order, where load() returns {field: [values]} for one chunk.
+
+        Each sealed month is a chunk, and so are the open rows. A key is (filename, month or None
+        for the open rows, *version): its first two items name the chunk and the rest change
+        whenever its rows do (sealed months only change when more rows are sealed into them), so
+        callers can cache whatever they derive from a chunk under its key and drop older versions.
+        since/until prune sealed months like search does, without filtering rows.
+        """
+        table = self._current(filename)
+        if table is None:
+            return []
+        _partition_column(self.partitions, filename, since, until)
+        keys = [(filename, month, entry['rows']) for month, entry in sorted(table.sealed.items())
+                if (since is None or month >= since[:7]) and (until is None or month < until)]
+        keys.append((filename, None, table.signature, len(table.rows)))
+
+        def columns(load):
+            segment, stop = load()
+            rows = segment.rows[:stop]
+            return {f: [row[segment.columns[f]] for row in rows] if f in segment.columns else [''] * len(rows)
+                    for f in fields}
+        return [(key, functools.partial(columns, load)) for key, load in zip(keys, self._segments(filename, table, since, until))]
+
+    def append(self, filename, row_dict):
+        filepath = self.data_dir / filename
+        with self._locked(filename, exclusive=True):
+            table = self._load_table(filename)
+            _check_fields(row_dict, table.fieldnames)
+            row = table.pack_dict(row_dict)
+            with open(filepath, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(row)
+            table.rows.append(row)
+            table.index_rows(len(table.rows) - 1)
+            table.signature = self._signature(filename)
+
+    def append_many(self, filename, rows):
+        """Append rows with one buffered write and one index pass."""
+        filepath = self.data_dir / filename
+        with self._locked(filename, exclusive=True):
+            table = self._load_table(filename)
+            for row in rows:
+                _check_fields(row, table.fieldnames)
+            packed = [table.pack_dict(r) for r in rows]
+            with open(filepath, 'a', newline='', encoding='utf-8', buffering=EXPORT_CHUNK_SIZE) as f:
+                csv.writer(f).writerows(packed)
+            start = len(table.rows)
+            table.rows.extend(packed)
+            table.index_rows(start)
+            table.signature = self._signature(filename)
+
+    def update(self, filename, key_field, key_value, updates):
+        """Update matching rows: a journal entry in journal mode, otherwise a rewrite of the file."""
+        with self._locked(filename, exclusive=True):
+            table = self._load_table(filename)
+            if self.journal:
+                updated = self._journal_update(filename, table, key_field, key_value, updates)
+            else:
+                _check_fields(updates, table.fieldnames)
+                rows = list(table.rows)
+                matches = table.matching(key_field, key_value)
+                stored = {k: '' if v is None else str(v) for k, v in updates.items()}
+                for position in matches:
+                    rows[position] = table.updated(rows[position], stored)
+                self._rewrite(filename, table.fieldnames, rows)
+                self._tables[filename] = table.successor(rows, self._signature(filename))
+                updated = bool(matches)
+            if not updated:
+                self._warn_sealed(filename, table, key_field, key_value)
+            return updated
+
+    def _warn_sealed(self, filename, table, key_field, key_value):
+        """Log an update that matched no open row because its row was sealed. Caller holds the lock."""
+        for month, entry in sorted(table.sealed.items()):
+            segment = self._sealed_table(filename, month, entry)
+            position = segment.position(key_field, key_value)
+            if position is not None and position < entry['rows']:
+                logger.warning(f"Update of {filename} {key_field}={key_value} not applied: the row is sealed in {month}")
+                return
+
+    def _journal_update(self, filename, table, key_field, key_value, updates):
+        """Record an update as one journal line instead of rewriting the file. Caller holds the lock."""
+        _check_fields(updates, table.fieldnames)
+        matches = table.matching(key_field, key_value)
+        if not matches:
+            return False
+        stored = {k: '' if v is None else str(v) for k, v in updates.items()}
+        # 'rows' pins the update to rows that existed at this point, so later appends with the same key are untouched
+        entry = {'key': key_field, 'value': key_value, 'updates': stored, 'rows': len(table.rows)}
+        with open(self._journal_path(filename), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        for position in matches:
+            table.replace_row(position, table.updated(table.rows[position], stored))
+        for field in table.index_fields:
+            if field in stored:
+                table.rebuild_index(field)
+        table.signature = self._signature(filename)
+        return True
+
+    def write(self, filename, rows, headers=None):
+        """Replace the table's rows; on a partitioned table only the open rows, sealed months stay as they are."""
+        with self._locked(filename, exclusive=True):
+            if not headers:
+                table = self._load_table(filename)
+                headers = table.fieldnames if table else None
+            layout = _Table(headers, [], None)
+            for row in rows:
+                _check_fields(row, layout.fieldnames)
+            packed = [layout.pack_dict(r) for r in rows]
+            self._rewrite(filename, layout.fieldnames, packed)
+            self._store_table(filename, layout.fieldnames, packed)
+
+    def commit(self, ops):
+        """Apply (op, filename, ...) tuples from a Transaction with one atomic rewrite per touched table.
+
+        Every new file is staged and fsynced first, then a roll-forward log naming the renames is
+        written; a crash after that point is completed by _recover_transaction on next start.
+        """
+        by_file = {}
+        for op in ops:
+            by_file.setdefault(op[1], []).append((op[0],) + tuple(op[2:]))
+        with self._locked_many(list(by_file), exclusive=True):
+            staged = {}
+            for filename, file_ops in by_file.items():
+                table = self._load_table(filename)
+                if table is None:
+                    raise FileNotFoundError(filename)
+                rows = list(table.rows)
+                for key_field, key_value in _apply_ops(table, rows, file_ops):
+                    self._warn_sealed(filename, table, key_field, key_value)
+                staged[filename] = (table, rows)
+            # Only stage files once every op has validated, so a bad row leaves nothing behind
+            for filename, (table, rows) in staged.items():
+                self._write_tmp(filename, table.fieldnames, rows, sync=True)
+            log_path = self._log_transaction(list(staged))
+            self._finish_transaction(list(staged), log_path)
+            for filename, (table, rows) in staged.items():
+                self._tables[filename] = table.successor(rows, self._signature(filename))
+
+    def _log_transaction(self, filenames):
+        """Durably record that every filename's .tmp is staged; from here on recovery rolls them forward.
+
+        Returns the path of this commit's own log, for _finish_transaction.
+        """
+        log_path = self.data_dir / f'{TRANSACTION_LOG_PREFIX}-{os.getpid()}-{uuid.uuid4().hex}.json'
+        with open(log_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': filenames}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        return log_path
+
+    def _finish_transaction(self, filenames, log_path):
+        for filename in filenames:
+            filepath = self.data_dir / filename
+            tmp_path = filepath.with_name(filepath.name + '.tmp')
+            if tmp_path.exists():
+                os.replace(tmp_path, filepath)
+                self._journal_path(filename).unlink(missing_ok=True)
+        log_path.unlink(missing_ok=True)
+
+    def _recover_transaction(self):
+        """Roll forward every commit whose log outlived it. Caller holds every table's lock, so no
+        live commit has a log at this point: each one left is from a process that died mid-commit."""
+        # The glob also matches the single .transaction.json older versions wrote
+        for log_path in sorted(self.data_dir.glob(TRANSACTION_LOG_PREFIX + '*.json')):
+            try:
+                with open(log_path, 'r', encoding='utf-8') as f:
+                    filenames = json.load(f)['files']
+            except ValueError:
+                # The log itself was torn, so no rename had started: the old files are still consistent
+                log_path.unlink()
+                continue
+            logger.warning(f"Completing interrupted CSV transaction on {filenames}")
+            self._finish_transaction(filenames, log_path)
+
+    def export(self, filename):
+        """CSVExport of the canonical file as it stands now, journal folded in first.
+
+        Sealed months of a partitioned table are streamed decompressed ahead of the open rows,
+        in the order reads return them.
+        """
+        self.compact(filename)
+        with self._locked(filename):
+            f = open(self.data_dir / filename, 'rb')
+            # Rewrites replace the file by rename and appends only extend it, so stopping at
+            # the size seen under the lock never yields a torn row
+            st = os.fstat(f.fileno())
+            table = self._load_table(filename) if filename in self.partitions else None
+            if table is not None and table.sealed:
+                directory = self.data_dir / self._partition_dir(filename)
+                # Sealing swaps partitions in by rename too, so these handles stay on this version
+                parts = [open(directory / table.sealed[month]['file'], 'rb') for month in sorted(table.sealed)]
+                manifest = os.stat(directory / PARTITION_MANIFEST)
+        etag = f'W/"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+        last_modified = datetime.fromtimestamp(st.st_mtime, timezone.utc)
+        if table is None or not table.sealed:
+            return CSVExport(etag, last_modified, self._read_chunks(f, st.st_size), f.close)
+        etag = f'{etag[:-1]}-{manifest.st_mtime_ns:x}"'
+        last_modified = max(last_modified, datetime.fromtimestamp(manifest.st_mtime, timezone.utc))
+        handles = ExitStack()
+        for handle in [f] + parts:
+            handles.enter_context(handle)
+        return CSVExport(etag, last_modified, self._read_partitioned_chunks(f, st.st_size, parts, handles), handles.close)
+
+    def _read_partitioned_chunks(self, f, size, parts, handles):
+        with handles:
+            header = f.readline()
+            yield header
+            for part in parts:
+                with gzip.GzipFile(fileobj=part, mode='rb') as gz:
+                    gz.readline()
+                    while True:
+                        chunk = gz.read(EXPORT_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        yield chunk
+            yield from self._read_chunks(f, size - len(header))
+
+    def _read_chunks(self, f, remaining):
+        with f:
+            while remaining > 0:
+                chunk = f.read(min(EXPORT_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def iter_csv(self, filename):
+        """Yield the canonical CSV bytes of filename in chunks."""
+        return iter(self.export(filename))
+
+    def compact(self, filename):
+        """Fold filename's journal back into the canonical CSV. Returns True if there was anything to fold."""
+        with self._locked(filename, exclusive=True):
+            if not self._journal_path(filename).exists():
+                return False
+            table = self._load_table(filename)
+            self._rewrite(filename, table.fieldnames, table.rows)
+            table.signature = self._signature(filename)
+            return True
+
+    def seal(self, filename, before):
+        """Move the open rows of months before `before` ('YYYY-MM') into sealed monthly partitions.
+
+        Each month becomes a read-only gzip CSV listed in the partition manifest with its row
+        and value counts; a month sealed before is rewritten with the new rows after its old ones.
+        Rows without a parseable timestamp, or in one of the table's open_states, stay open. The partitions, manifest and trimmed CSV are
+        swapped in through the transaction log. Returns the months that were sealed.
+        """
+        column = self.partitions.get(filename)
+        if column is None:
+            return []
+        with self._locked(filename, exclusive=True):
+            table = self._load_table(filename)
+            if table is None or column not in table.columns:
+                return []
+            position = table.columns[column]
+            state_column, states = self.open_states.get(filename, (None, ()))
+            state = table.columns.get(state_column)
+            moving, staying = {}, []
+            for row in table.rows:
+                month = _month(row[position])
+                if month is not None and month < before and (state is None or row[state] not in states):
+                    moving.setdefault(month, []).append(row)
+                else:
+                    staying.append(row)
+            if not moving:
+                return []
+            directory = self._partition_dir(filename)
+            (self.data_dir / directory).mkdir(parents=True, exist_ok=True)
+            sealed = dict(table.sealed)
+            staged = []
+            for month, rows in sorted(moving.items()):
+                entry = sealed.get(month)
+                if entry is not None:
+                    rows = self._sealed_table(filename, month, entry).rows[:entry['rows']] + rows
+                name = f'{month}.csv.gz'
+                self._write_sealed(directory / name, table.fieldnames, rows)
+                counts = {f: dict(Counter(row[table.columns[f]] for row in rows)) for f in table.counted}
+                sealed[month] = {'file': name, 'rows': len(rows), 'counts': counts}
+                staged.append(str(directory / name))
+            manifest = str(directory / PARTITION_MANIFEST)
+            with open(self.data_dir / (manifest + '.tmp'), 'w', encoding='utf-8') as f:
+                json.dump({'column': column, 'months': sealed}, f, indent=2, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_tmp(filename, table.fieldnames, staying, sync=True)
+            staged += [manifest, filename]
+            log_path = self._log_transaction(staged)
+            self._finish_transaction(staged, log_path)
+            with self._sealed_lock:
+                for month in moving:
+                    self._sealed_cache.pop((filename, month), None)
+            self._store_table(filename, table.fieldnames, staying)
+            logger.info(f"Sealed {sum(len(rows) for rows in moving.values())} rows of {filename} into {sorted(moving)}")
+            return sorted(moving)
+
+    def _write_sealed(self, path, fieldnames, rows):
+        """Stage a read-only gzip CSV at data_dir/path + '.tmp'."""
+        tmp_path = self.data_dir / path.with_name(path.name + '.tmp')
+        # A leftover from an interrupted seal is read-only, so it cannot just be opened for writing
+        tmp_path.unlink(missing_ok=True)
+        with open(tmp_path, 'wb') as raw:
+            # mtime=0 keeps the bytes a function of the rows alone
+            with gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as gz:
+                text = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+                writer = csv.writer(text)
+                writer.writerow(fieldnames)
+                writer.writerows(rows)
+                text.flush()
+                text.detach()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.chmod(tmp_path, 0o444)
+
+    def seal_cutoff(self, now=None):
+        """First month that stays open: the current month and the hot_months - 1 before it."""
+        month = (now or datetime.now(timezone.utc)).strftime('%Y-%m')
+        return _shift_month(month, 1 - self.hot_months)
+
+    def seal_all(self, before=None):
+        """Seal every partitioned table up to before (default seal_cutoff()). Returns {filename: months}."""
+        before = before or self.seal_cutoff()
+        sealed = {}
+        for filename in self.partitions:
+            try:
+                months = self.seal(filename, before)
+            except Exception as e:
+                logger.error(f"Sealing partitions failed for {filename}: {e}")
+                continue
+            if months:
+                sealed[filename] = months
+        return sealed
+
+    def compact_all(self):
+        for filename in list(self.schemas):
+            try:
+                if self.compact(filename):
+                    logger.info(f"Compacted journal for {filename}")
+            except Exception as e:
+                logger.error(f"Journal compaction failed for {filename}: {e}")
+
+    def start_compactor(self, interval=30):
+        """Fold journals every interval seconds and, on partitioned tables, seal months as they go cold."""
+        if not (self.journal or self.partitions) or self._compactor is not None:
+            return
+        self._compactor_stop.clear()
+
+        def run():
+            # Sealing scans the open rows, so it only runs again once the month turns
+            sealed_before = None
+            while not self._compactor_stop.wait(interval):
+                self.compact_all()
+                before = self.seal_cutoff()
+                if self.partitions and before != sealed_before:
+                    self.seal_all(before)
+                    sealed_before = before
+
+        self._compactor = threading.Thread(target=run, name='csv-compactor', daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        if self._compactor is None:
+            return
+        self._compactor_stop.set()
+        self._compactor.join()
+        self._compactor = None
+        self.compact_all()
+
+
+def _table_name(filename):
+    return Path(filename).stem
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SQLiteStorage:
+    """The same tables in one embedded SQLite database (WAL mode), one TEXT column per CSV header.
+
+    partitions only name the time column of since/until ranges: keyed updates go through B-tree
+    indexes here, so a long history does not make them slower and nothing is sealed.
+
+    Search-indexed columns other than 'exact' ones keep their index keys (lowercased value,
+    phone digit variants, name words) in SQLITE_SEARCH_KEYS_TABLE, written in the same
+    transaction as the rows, so search() is B-tree lookups and prefix ranges, not a scan.
+    Row and counter-field counts are kept the same way in SQLITE_COUNTS_TABLE for counts().
+    """
+
+    def __init__(self, db_path, schemas, import_dir=None, search_indexes=None, counters=None, partitions=None):
+        self.db_path = Path(db_path)
+        self.schemas = schemas
+        self.search_indexes = search_indexes or {}
+        self.counters = counters or {}
+        self.partitions = partitions or {}
+        fresh = not self.db_path.exists()
+        self._lock = threading.Lock()
+        # The timeout lets concurrent worker processes queue on SQLite's own write lock
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._fieldnames = {}
+        self._local = threading.local()
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_VERSIONS_TABLE} (name TEXT PRIMARY KEY, version INTEGER NOT NULL, modified REAL NOT NULL)")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_SEARCH_KEYS_TABLE} (name TEXT NOT NULL, field TEXT NOT NULL, "
+                           "key TEXT NOT NULL, rid INTEGER NOT NULL, PRIMARY KEY (name, field, key, rid)) WITHOUT ROWID")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_SEARCH_FIELDS_TABLE} (name TEXT NOT NULL, field TEXT NOT NULL, "
+                           "kind TEXT NOT NULL, PRIMARY KEY (name, field))")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_COUNTS_TABLE} (name TEXT NOT NULL, field TEXT NOT NULL, "
+                           "value TEXT NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (name, field, value)) WITHOUT ROWID")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {SQLITE_COUNTED_FIELDS_TABLE} (name TEXT NOT NULL, field TEXT NOT NULL, "
+                           "PRIMARY KEY (name, field))")
+        if fresh and import_dir is not None:
+            # First start on SQLite: carry the existing CSV tables over
+            migrate_csv_to_sqlite(import_dir, self, schemas, self.partitions)
+        for filename, headers in schemas.items():
+            self.create_table(filename, headers)
+
+    def create_table(self, filename, headers):
+        with self._lock:
+            table = _table_name(filename)
+            columns = ', '.join(f"{_quote(h)} TEXT NOT NULL DEFAULT ''" for h in headers)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} (_rowid INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+            existing = [r[1] for r in self._conn.execute(f"PRAGMA table_info({_quote(table)})")][1:]
+            for column in existing:
+                if column in SQLITE_INDEXED_COLUMNS:
+                    self._conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{column}')} ON {_quote(table)} ({_quote(column)})")
+            if 'email' in existing:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_email_lower')} ON {_quote(table)} (lower(email))")
+            self._fieldnames[filename] = existing
+            with self._conn:
+                self._build_search_keys(filename)
+                self._build_counts(filename)
+
+    def _search_fields(self, filename):
+        """{field: index kind class} of the columns whose keys live in SQLITE_SEARCH_KEYS_TABLE."""
+        columns = self._fieldnames.get(filename, ())
+        return {field: INDEX_KINDS[kind] for field, kind in self.search_indexes.get(filename, {}).items()
+                if kind != 'exact' and field in columns}
+
+    def _build_search_keys(self, filename):
+        """Backfill the keys of search fields not built yet, e.g. in a database from before they existed. Caller holds the lock."""
+        built = dict(self._conn.execute(f"SELECT field, kind FROM {SQLITE_SEARCH_FIELDS_TABLE} WHERE name = ?", (filename,)))
+        for field, kind in self.search_indexes.get(filename, {}).items():
+            if field not in self._search_fields(filename) or built.get(field) == kind:
+                continue
+            self._conn.execute(f"DELETE FROM {SQLITE_SEARCH_KEYS_TABLE} WHERE name = ? AND field = ?", (filename, field))
+            rows = self._conn.execute(f"SELECT _rowid, {_quote(field)} FROM {_quote(_table_name(filename))}").fetchall()
+            self._add_search_keys(filename, field, rows)
+            self._conn.execute(f"INSERT OR REPLACE INTO {SQLITE_SEARCH_FIELDS_TABLE} (name, field, kind) VALUES (?, ?, ?)",
+                               (filename, field, kind))
+
+    def _add_search_keys(self, filename, field, rows):
+        """Index (rid, value) rows of one search field. Caller holds the lock."""
+        index = INDEX_KINDS[self.search_indexes[filename][field]]
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO {SQLITE_SEARCH_KEYS_TABLE} (name, field, key, rid) VALUES (?, ?, ?, ?)",
+            [(filename, field, key, rid) for rid, value in rows for key in index.keys(value)])
+
+    def _remove_search_keys(self, filename, field, rows):
+        index = INDEX_KINDS[self.search_indexes[filename][field]]
+        self._conn.executemany(
+            f"DELETE FROM {SQLITE_SEARCH_KEYS_TABLE} WHERE name = ? AND field = ? AND key = ? AND rid = ?",
+            [(filename, field, key, rid) for rid, value in rows for key in index.keys(value)])
+
+    def _counted_fields(self, filename):
+        """The table's counter fields that exist as columns, '' (the row count) first."""
+        columns = self._fieldnames.get(filename, ())
+        return ['', *(field for field in self.counters.get(filename, ()) if field in columns)]
+
+    def _build_counts(self, filename):
+        """Recount the table once if its counted fields changed, e.g. in a database from before they were kept. Caller holds the lock."""
+        fields = self._counted_fields(filename)
+        built = [r[0] for r in self._conn.execute(f"SELECT field FROM {SQLITE_COUNTED_FIELDS_TABLE} WHERE name = ?", (filename,))]
+        if sorted(built) == sorted(fields):
+            return
+        table = _quote(_table_name(filename))
+        self._conn.execute(f"DELETE FROM {SQLITE_COUNTS_TABLE} WHERE name = ?", (filename,))
+        self._conn.execute(f"DELETE FROM {SQLITE_COUNTED_FIELDS_TABLE} WHERE name = ?", (filename,))
+        for field in fields:
+            column = _quote(field) if field else "''"
+            self._conn.execute(
+                f"INSERT INTO {SQLITE_COUNTS_TABLE} (name, field, value, n) "
+                f"SELECT ?, ?, {column}, COUNT(*) FROM {table} GROUP BY {column}", (filename, field))
+            self._conn.execute(f"INSERT INTO {SQLITE_COUNTED_FIELDS_TABLE} (name, field) VALUES (?, ?)", (filename, field))
+
+    def _add_counts(self, filename, deltas):
+        """Add {(field, value): delta} to the stored counts. Caller holds the lock."""
+        self._conn.executemany(
+            f"INSERT INTO {SQLITE_COUNTS_TABLE} (name, field, value, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name, field, value) DO UPDATE SET n = n + excluded.n",
+            [(filename, field, value, delta) for (field, value), delta in deltas.items() if delta])
+
+    def _reader(self):
+        """Per-thread read connection: in WAL mode readers see a committed snapshot and never wait on the writer."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _columns(self, filename):
+        if filename not in self._fieldnames:
+            raise FileNotFoundError(filename)
+        return self._fieldnames[filename]
+
+    def fieldnames(self, filename):
+        return list(self._fieldnames.get(filename) or []) or None
+
+    def _select(self, filename):
+        columns = self._columns(filename)
+        return columns, f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(_table_name(filename))}"
+
+    def read(self, filename):
+        if filename not in self._fieldnames:
+            return []
+        columns, select = self._select(filename)
+        rows = self._reader().execute(select + ' ORDER BY _rowid').fetchall()
+        return [dict(zip(columns, r)) for r in rows]
+
+    def snapshot(self, filename):
+        return tuple(self.read(filename))
+
+    def find(self, filename, field, value):
+        columns, select = self._select(filename)
+        if field not in columns:
+            return None
+        if field == 'email':
+            where, value = 'lower(email) = ?', value.lower()
+        else:
+            where = f"{_quote(field)} = ?"
+        row = self._reader().execute(f"{select} WHERE {where} ORDER BY _rowid LIMIT 1", (value,)).fetchone()
+        return dict(zip(columns, row)) if row else None
+
+    def counts(self, filename):
+        """Same shape as CSVStorage.counts, read from SQLITE_COUNTS_TABLE without touching the rows."""
+        if filename not in self._fieldnames:
+            return {'rows': 0}
+        counts = {'rows': 0, **{field: {} for field in self._counted_fields(filename)[1:]}}
+        for field, value, n in self._reader().execute(
+                f"SELECT field, value, n FROM {SQLITE_COUNTS_TABLE} WHERE name = ? AND n > 0", (filename,)):
+            if not field:
+                counts['rows'] = n
+            elif field in counts:
+                counts[field][value] = n
+        return counts
+
+    def _range_clauses(self, filename, since, until):
+        """WHERE clauses and parameters for a [since, until) range on the partition column."""
+        column = _partition_column(self.partitions, filename, since, until)
+        if column is None:
+            return [], []
+        clauses, params = [f"{_quote(column)} != ''"], []
+        if since is not None:
+            clauses.append(f"{_quote(column)} >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append(f"{_quote(column)} < ?")
+            params.append(until)
+        return clauses, params
+
+    def search(self, filename, criteria, limit=None, since=None, until=None, open_only=False):
+        """Same matching rules as CSVStorage.search; search-indexed columns are looked up in
+        SQLITE_SEARCH_KEYS_TABLE, one rid subquery per exact key or prefix range.
+
+        Every row is open to updates here, so open_only changes nothing.
+        """
+        columns, select = self._select(filename)
+        if any(field not in columns for field in criteria):
+            return []
+        kinds = self.search_indexes.get(filename, {})
+        clauses, params = self._range_clauses(filename, since, until)
+        for field, term in criteria.items():
+            if kinds.get(field) == 'exact':
+                clauses.append(f"{_quote(field)} = ?")
+                params.append(term)
+            elif field in kinds:
+                terms = INDEX_KINDS[kinds[field]].terms(term)
+                if not terms:
+                    clauses.append('0')
+                for key, prefix in terms:
+                    lookup = f"_rowid IN (SELECT rid FROM {SQLITE_SEARCH_KEYS_TABLE} WHERE name = ? AND field = ?"
+                    params += [filename, field]
+                    if not prefix:
+                        lookup += " AND key = ?"
+                        params.append(key)
+                    elif key:
+                        lookup += " AND key >= ? AND key < ?"
+                        params += [key, _prefix_end(key)]
+                    clauses.append(lookup + ')')
+            elif field == 'email':
+                clauses.append('lower(email) = ?')
+                params.append(term.lower())
+            else:
+                clauses.append(f"{_quote(field)} = ?")
+                params.append(term)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._reader().execute(f"{select}{where} ORDER BY _rowid LIMIT ?", [*params, -1 if limit is None else limit]).fetchall()
+        return [dict(zip(columns, r)) for r in rows]
+
+    def iter_rows(self, filename, key_field=None, after=None, limit=None, since=None, until=None):
+        """Rows as dicts in insertion order after the row whose key_field equals after; KeyError for an unknown cursor."""
+        columns, select = self._select(filename)
+        clauses, range_params = self._range_clauses(filename, since, until)
+        # Own connection: the rows are consumed lazily, possibly from another thread, as one WAL read snapshot
+        conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        start = 0
+        if after is not None:
+            found = None
+            if key_field in columns:
+                found = conn.execute(
+                    f"SELECT _rowid FROM {_quote(_table_name(filename))} WHERE {_quote(key_field)} = ? ORDER BY _rowid LIMIT 1",
+                    (after,)).fetchone()
+            if found is None:
+                conn.close()
+                raise KeyError(after)
+            start = found[0]
+        sql = select + ' WHERE ' + ' AND '.join(['_rowid > ?'] + clauses) + ' ORDER BY _rowid'
+        params = [start, *range_params]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        def rows():
+            try:
+                for row in conn.execute(sql, params):
+                    yield dict(zip(columns, row))
+            finally:
+                conn.close()
+        return rows()
+
+    def find_many(self, filename, field, values):
+        return [self.find(filename, field, value) for value in values]
+
+    def column_chunks(self, filename, fields, since=None, until=None):
+        """Same contract as CSVStorage.column_chunks: the whole table is one chunk, keyed by its change counter."""
+        columns = self._columns(filename)
+        _partition_column(self.partitions, filename, since, until)
+        conn = self._reader()
+        found = conn.execute(f"SELECT version FROM {SQLITE_VERSIONS_TABLE} WHERE name = ?", (filename,)).fetchone()
+
+        def load():
+            selected = ', '.join(_quote(f) if f in columns else "''" for f in fields)
+            reader = sqlite3.connect(str(self.db_path), timeout=30)
+            try:
+                rows = reader.execute(f"SELECT {selected} FROM {_quote(_table_name(filename))} ORDER BY _rowid").fetchall()
+            finally:
+                reader.close()
+            return {f: [row[i] for row in rows] for i, f in enumerate(fields)}
+        return [((filename, None, found[0] if found else 0), load)]
+
+    def append(self, filename, row_dict):
+        self.append_many(filename, [row_dict])
+
+    def _insert(self, filename, rows):
+        """Insert rows inside the caller's transaction. Caller holds the lock."""
+        columns = self._columns(filename)
+        table = _quote(_table_name(filename))
+        sql = f"INSERT INTO {table} ({', '.join(_quote(c) for c in columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        values = []
+        for row in rows:
+            _check_fields(row, columns)
+            stored = _as_stored(row, columns)
+            values.append([stored[c] for c in columns])
+        if not values:
+            return
+        search_fields = self._search_fields(filename)
+        if search_fields:
+            # AUTOINCREMENT rowids only grow, so the new rows are the ones above the current maximum
+            first = self._conn.execute(f"SELECT COALESCE(MAX(_rowid), 0) FROM {table}").fetchone()[0]
+        self._conn.executemany(sql, values)
+        self._add_counts(filename, Counter(
+            (field, v[columns.index(field)] if field else '') for field in self._counted_fields(filename) for v in values))
+        for field in search_fields:
+            self._add_search_keys(filename, field, self._conn.execute(
+                f"SELECT _rowid, {_quote(field)} FROM {table} WHERE _rowid > ?", (first,)).fetchall())
+        self._bump_version(filename)
+
+    def _bump_version(self, filename):
+        """Advance the table's change counter inside the caller's transaction. Caller holds the lock."""
+        self._conn.execute(
+            f"INSERT INTO {SQLITE_VERSIONS_TABLE} (name, version, modified) VALUES (?, 1, ?) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1, modified = excluded.modified",
+            (filename, time.time()))
+
+    def append_many(self, filename, rows):
+        with self._lock:
+            with self._conn:
+                self._insert(filename, rows)
+
+    def update(self, filename, key_field, key_value, updates):
+        with self._lock:
+            with self._conn:
+                return self._update(filename, key_field, key_value, updates)
+
+    def _update(self, filename, key_field, key_value, updates):
+        """Run one UPDATE inside the caller's transaction. Caller holds the lock."""
+        columns = self._columns(filename)
+        _check_fields(updates, columns)
+        if key_field not in columns:
+            return False
+        stored = {k: '' if v is None else str(v) for k, v in updates.items()}
+        table = _quote(_table_name(filename))
+        if not stored:
+            return self._conn.execute(
+                f"SELECT 1 FROM {table} WHERE {_quote(key_field)} = ? LIMIT 1", (key_value,)).fetchone() is not None
+        reindexed = [field for field in self._search_fields(filename) if field in stored]
+        recounted = [field for field in self._counted_fields(filename) if field in stored]
+        touched = [*reindexed, *(f for f in recounted if f not in reindexed)]
+        if touched:
+            old = self._conn.execute(
+                f"SELECT _rowid, {', '.join(_quote(f) for f in touched)} FROM {table} WHERE {_quote(key_field)} = ?",
+                (key_value,)).fetchall()
+        assignments = ', '.join(f"{_quote(k)} = ?" for k in stored)
+        cur = self._conn.execute(f"UPDATE {table} SET {assignments} WHERE {_quote(key_field)} = ?", [*stored.values(), key_value])
+        for i, field in enumerate(reindexed, 1):
+            self._remove_search_keys(filename, field, [(row[0], row[i]) for row in old])
+            self._add_search_keys(filename, field, [(row[0], stored[field]) for row in old])
+        if recounted:
+            deltas = Counter()
+            for field in recounted:
+                i = touched.index(field) + 1
+                for row in old:
+                    deltas[(field, row[i])] -= 1
+                    deltas[(field, stored[field])] += 1
+            self._add_counts(filename, deltas)
+        if cur.rowcount > 0:
+            self._bump_version(filename)
+        return cur.rowcount > 0
+
+    def commit(self, ops):
+        """Apply a Transaction's buffered ops inside one SQLite transaction."""
+        with self._lock:
+            with self._conn:
+                for op in ops:
+                    if op[0] == 'append':
+                        self._insert(op[1], [op[2]])
+                    else:
+                        self._update(*op[1:])
+
+    def write(self, filename, rows, headers=None):
+        if headers and headers != self._fieldnames.get(filename):
+            with self._lock:
+                with self._conn:
+                    self._conn.execute(f"DROP TABLE IF EXISTS {_quote(_table_name(filename))}")
+                    self._conn.execute(f"DELETE FROM {SQLITE_SEARCH_FIELDS_TABLE} WHERE name = ?", (filename,))
+                    self._conn.execute(f"DELETE FROM {SQLITE_COUNTED_FIELDS_TABLE} WHERE name = ?", (filename,))
+            self.create_table(filename, headers)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(f"DELETE FROM {_quote(_table_name(filename))}")
+                self._conn.execute(f"DELETE FROM {SQLITE_SEARCH_KEYS_TABLE} WHERE name = ?", (filename,))
+                self._conn.execute(f"DELETE FROM {SQLITE_COUNTS_TABLE} WHERE name = ?", (filename,))
+                self._insert(filename, rows)
+                self._bump_version(filename)
+
+    def export(self, filename):
+        """CSVExport of the table, written exactly as csv.DictWriter would have written the file.
+
+        A separate connection holds one WAL read transaction for the change counter and the rows,
+        so the validators describe exactly the bytes streamed, without holding the writer lock.
+        """
+        columns, select = self._select(filename)
+        conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        conn.execute('BEGIN')
+        found = conn.execute(f"SELECT version, modified FROM {SQLITE_VERSIONS_TABLE} WHERE name = ?", (filename,)).fetchone()
+        version, modified = found or (0, self.db_path.stat().st_mtime)
+        etag = f'W/"sqlite-{_table_name(filename)}-{version:x}"'
+        last_modified = datetime.fromtimestamp(modified, timezone.utc)
+        return CSVExport(etag, last_modified, self._export_chunks(conn, columns, select), conn.close)
+
+    def _export_chunks(self, conn, columns, select):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        try:
+            for row in conn.execute(select + ' ORDER BY _rowid'):
+                writer.writerow(row)
+                if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                    yield buffer.getvalue().encode('utf-8')
+                    buffer.seek(0)
+                    buffer.truncate()
+        finally:
+            conn.close()
+        yield buffer.getvalue().encode('utf-8')
+
+    def iter_csv(self, filename):
+        """Yield the table as CSV bytes, written exactly as csv.DictWriter would have written the file."""
+        return iter(self.export(filename))
+
+    def compact(self, filename):
+        return False
+
+    def compact_all(self):
+        pass
+
+    def seal(self, filename, before):
+        return []
+
+    def seal_all(self, before=None):
+        return {}
+
+    def start_compactor(self, interval=30):
+        pass
+
+    def stop_compactor(self):
+        pass
+
+
+def migrate_csv_to_sqlite(data_dir, target, schemas, partitions=None):
+    """One-shot copy of data_dir/*.csv (journals and sealed partitions included) into a SQLiteStorage or database path."""
+    # Empty schemas: read what is on disk without creating missing files
+    source = CSVStorage(data_dir, {}, partitions=partitions)
+    db = target if isinstance(target, SQLiteStorage) else SQLiteStorage(target, schemas, partitions=partitions)
+    counts = {}
+    for filename in schemas:
+        headers = source.fieldnames(filename)
+        if headers is None:
+            continue
+        db.create_table(filename, headers)
+        if db.read(filename):
+            logger.info(f"Skipping {filename}: SQLite table already has rows")
+            continue
+        rows = source.read(filename)
+        db.append_many(filename, rows)
+        counts[filename] = len(rows)
+        logger.info(f"Migrated {len(rows)} rows from {filename}")
+    return counts
+
+
+if __name__ == '__main__':
+    import argparse
+    from csv_manager import PARTITIONS, SCHEMAS
+
+    parser = argparse.ArgumentParser(description='Copy the CSV tables into the SQLite storage backend')
+    parser.add_argument('--data-dir', default=str(Path(__file__).parent / 'data'))
+    parser.add_argument('--db', default=None, help=f'defaults to <data-dir>/{SQLITE_FILENAME}')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    db_path = args.db or str(Path(args.data_dir) / SQLITE_FILENAME)
+    print(json.dumps(migrate_csv_to_sqlite(args.data_dir, db_path, SCHEMAS, PARTITIONS), indent=2))
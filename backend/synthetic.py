@@ -0,0 +1,215 @@
+"""
+Deterministic synthetic customers, mail requests and reports for load testing.
+
+    python backend/synthetic.py --customers 1000000 --requests 200000 --reports 100000 --seed 7
+
+The same seed against the same starting tables produces the same rows. IDs come from the
+normal allocators, and emails, phones and request IDs are derived from them, so repeated
+runs keep adding unique records.
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from pdf_service import DOCUMENTS
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50000
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+SPREAD_SECONDS = 365 * 24 * 3600
+# Odd and not a multiple of 5, so n -> n * MULTIPLIER mod 2**32 (or 4e9) is a bijection
+MULTIPLIER = 2654435761
+REQUEST_SEQUENCE = 'REQ-SYN'
+
+FIRST_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Ayaan", "Krishna", "Ishaan",
+    "Rohan", "Kabir", "Rahul", "Vikram", "Karan", "Amit", "Deepak", "Manish", "Rajesh", "Suresh",
+    "Gaurav", "Harish", "Nikhil", "Vishal", "Anil", "Sanjay", "Pranav", "Yash", "Dev", "Siddharth",
+    "Priya", "Ananya", "Ishita", "Diya", "Kavya", "Neha", "Pooja", "Shreya", "Riya", "Meera",
+    "Sunita", "Lakshmi", "Anjali", "Nisha", "Divya", "Swati", "Pallavi", "Aditi", "Sneha", "Tanvi",
+    "Aishwarya", "Kritika", "Nandini", "Radhika", "Sakshi", "Bhavna", "Jyoti", "Rekha", "Farah", "Zoya",
+]
+LAST_NAMES = [
+    "Sharma", "Patel", "Gupta", "Singh", "Kumar", "Reddy", "Nair", "Joshi", "Mehta", "Iyer",
+    "Prasad", "Banerjee", "Choudhary", "Deshmukh", "Verma", "Bhat", "Malhotra", "Kapoor", "Saxena", "Pillai",
+    "Tiwari", "Rao", "Agarwal", "Menon", "Pandey", "Mishra", "Kulkarni", "Chauhan", "Sinha", "Thakur",
+    "Bhatt", "Dubey", "Jain", "Hegde", "Yadav", "Das", "Ghosh", "Mukherjee", "Naidu", "Shetty",
+    "Khan", "Ahmed", "Fernandes", "D'Souza", "Gill", "Sandhu", "Bose", "Chatterjee", "Kaur", "Sethi",
+]
+DOMAINS = ["example.com", "example.in", "mail.example.org", "inbox.example.net"]
+
+REQUEST_TEMPLATES = {
+    'DELETE': [
+        ("Delete my account", "Please delete all my personal data. My customer ID is {cid}."),
+        ("Right to erasure", "I want to exercise my right to erasure for {cid}."),
+    ],
+    'SHOW': [
+        ("Send me my data", "Please share my data for customer {cid}."),
+        ("Data access request", "Under the DPDP Act, please export all data you hold on {cid}."),
+    ],
+    'CORRECT': [
+        ("Correct my phone number", "My phone number is wrong, please correct it. Customer ID {cid}."),
+        ("Update my email", "Please update the email on file for {cid}."),
+    ],
+    'UNKNOWN': [
+        ("Question", "Hello, I had a question about my account {cid}."),
+    ],
+}
+# intent -> weight, (otp_status, action_status) outcomes with weights
+INTENT_WEIGHTS = {'DELETE': 4, 'SHOW': 3, 'CORRECT': 2, 'UNKNOWN': 1}
+REQUEST_OUTCOMES = [
+    (('OTP_VERIFIED', 'COMPLETED'), 6),
+    (('OTP_SENT', 'PENDING'), 2),
+    (('OTP_EXPIRED', 'FAILED'), 1),
+    (('NOT_SENT', 'NEEDS_INFO'), 1),
+]
+# report_type -> (channel, status, pdf_service document kind, (cid, incident) -> the filename arguments it reads)
+REPORT_KINDS = {
+    'DATA_EXPORT': ('EMAIL', 'SENT', 'data_export', lambda cid, incident: ({'customer_id': cid},)),
+    'DELETION_CERTIFICATE': ('EMAIL', 'SENT', 'deletion_certificate', lambda cid, incident: (cid, None)),
+    'CORRECTION_CONFIRMATION': ('EMAIL', 'SENT', 'correction_confirmation', lambda cid, incident: (cid, None, None)),
+    'CUSTOMER_BREACH_NOTICE': ('EMAIL', 'SENT', 'customer_breach_notice',
+                               lambda cid, incident: ({'incident_id': incident}, {'customer_id': cid})),
+    'AUDIT_REPORT': ('DOWNLOAD_ONLY', 'GENERATED', 'audit_report', lambda cid, incident: ({'incident_id': incident},)),
+}
+BREACH_REPORTS = {'CUSTOMER_BREACH_NOTICE', 'AUDIT_REPORT'}
+INTENT_REPORTS = {'DELETE': 'DELETION_CERTIFICATE', 'SHOW': 'DATA_EXPORT', 'CORRECT': 'CORRECTION_CONFIRMATION'}
+
+
+def _timestamp(rng):
+    return (BASE_TIME + timedelta(seconds=rng.randrange(SPREAD_SECONDS))).isoformat()
+
+
+def _number(identifier, prefix):
+    return int(identifier[len(prefix):])
+
+
+def _phone(n, rng):
+    national = str(6000000000 + (n * MULTIPLIER) % 4000000000)
+    return f"+91 {national[:5]} {national[5:]}" if rng.random() < 0.5 else national
+
+
+def _batches(count, batch_size):
+    while count > 0:
+        size = min(batch_size, count)
+        yield size
+        count -= size
+
+
+def generate_customers(csv_mgr, count, rng, batch_size=BATCH_SIZE):
+    """Append count customers; returns their (customer_id, email) pairs."""
+    pool = []
+    for size in _batches(count, batch_size):
+        rows = []
+        for cid in csv_mgr.reserve_ids('CUST-', size):
+            n = _number(cid, 'CUST-')
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            email = f"{first}.{last}.{n}@{rng.choice(DOMAINS)}".lower().replace("'", '')
+            created = _timestamp(rng)
+            rows.append({
+                'customer_id': cid, 'name': f"{first} {last}", 'email': email, 'phone': _phone(n, rng),
+                'status': 'DELETED' if rng.random() < 0.05 else 'ACTIVE',
+                'created_at': created, 'updated_at': created,
+            })
+            pool.append((cid, email))
+        csv_mgr.append_rows('customers.csv', rows)
+    return pool
+
+
+def generate_requests(csv_mgr, count, customers, rng, batch_size=BATCH_SIZE):
+    """Append count mail requests from the given customers; returns (request_id, customer_id, intent) triples."""
+    intents, weights = zip(*INTENT_WEIGHTS.items())
+    outcomes, outcome_weights = zip(*REQUEST_OUTCOMES)
+    made = []
+    for size in _batches(count, batch_size):
+        rows = []
+        for seq in csv_mgr.reserve_ids(REQUEST_SEQUENCE, size):
+            request_id = f"REQ-{(_number(seq, REQUEST_SEQUENCE) * MULTIPLIER) % 2**32:08X}"
+            cid, email = rng.choice(customers)
+            intent = rng.choices(intents, weights)[0]
+            subject, body = rng.choice(REQUEST_TEMPLATES[intent])
+            otp_status, action_status = rng.choices(outcomes, outcome_weights)[0]
+            received = _timestamp(rng)
+            verified = otp_status == 'OTP_VERIFIED'
+            rows.append({
+                'request_id': request_id, 'received_at': received, 'from_email': email,
+                'subject': subject, 'body': body.format(cid=cid), 'customer_id': cid, 'intent': intent,
+                'otp_status': otp_status, 'otp_sent_at': received if otp_status != 'NOT_SENT' else '',
+                'otp_verified_at': received if verified else '',
+                'action_taken': f"{intent.title()} request {action_status.lower()}", 'action_status': action_status,
+                'replied_at': received, 'pdf_files': '', 'notes': 'synthetic',
+            })
+            made.append((request_id, cid, intent))
+        csv_mgr.append_rows('mail_replies.csv', rows)
+    return made
+
+
+def generate_reports(csv_mgr, count, customers, requests, rng, batch_size=BATCH_SIZE):
+    """Append count reports: per-request documents where there are requests, breach paperwork otherwise."""
+    kinds = list(REPORT_KINDS)
+    written = 0
+    for size in _batches(count, batch_size):
+        rows = []
+        for report_id in csv_mgr.reserve_ids('REP-', size):
+            request_id = ''
+            incident = f"INC-{rng.randrange(1000):03d}"
+            if requests and rng.random() < 0.7:
+                request_id, cid, intent = rng.choice(requests)
+                report_type = INTENT_REPORTS.get(intent, 'DATA_EXPORT')
+            else:
+                cid, _ = rng.choice(customers)
+                report_type = rng.choice(kinds)
+            channel, status, kind, filename_args = REPORT_KINDS[report_type]
+            rows.append({
+                'report_id': report_id, 'generated_at': _timestamp(rng), 'generated_by': 'SYSTEM',
+                'report_type': report_type, 'incident_id': incident if report_type in BREACH_REPORTS else '',
+                'request_id': request_id, 'customer_id': cid,
+                'recipient': 'SELF_DOWNLOAD' if channel == 'DOWNLOAD_ONLY' else f"{cid.lower()}@example.com",
+                'delivery_channel': channel, 'delivery_status': status,
+                'pdf_filename': DOCUMENTS[kind][0](*filename_args(cid, incident)),
+                'pdf_sha256': '%064x' % rng.getrandbits(256), 'notes': 'synthetic',
+            })
+        csv_mgr.append_rows('reports_sent.csv', rows)
+        written += len(rows)
+    return written
+
+
+def generate(csv_mgr, customers=0, requests=0, reports=0, seed=42, batch_size=BATCH_SIZE):
+    """Append synthetic rows to csv_mgr's tables in bulk writes; returns the number written per table.
+
+    Requests and reports reference the customers generated in this run, or the existing
+    customers when none are generated.
+    """
+    started = time.monotonic()
+    pool = generate_customers(csv_mgr, customers, random.Random(f"{seed}:customers"), batch_size)
+    if not pool and (requests or reports):
+        pool = [(c['customer_id'], c['email']) for c in csv_mgr.iter_rows('customers.csv')]
+        if not pool:
+            raise ValueError("No customers to attach requests and reports to")
+    made = generate_requests(csv_mgr, requests, pool, random.Random(f"{seed}:requests"), batch_size)
+    written = generate_reports(csv_mgr, reports, pool, made, random.Random(f"{seed}:reports"), batch_size)
+    counts = {'customers': customers, 'requests': len(made), 'reports': written}
+    logger.info(f"Generated {counts} in {time.monotonic() - started:.1f}s")
+    return counts
+
+
+if __name__ == '__main__':
+    from csv_manager import CSVManager
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=str(Path(__file__).parent / 'data'))
+    parser.add_argument('--backend', default='csv', choices=['csv', 'sqlite'])
+    parser.add_argument('--customers', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=0)
+    parser.add_argument('--reports', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    mgr = CSVManager(args.data_dir, backend=args.backend)
+    print(json.dumps(generate(mgr, args.customers, args.requests, args.reports, args.seed, args.batch_size), indent=2))
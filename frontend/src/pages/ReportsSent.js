@@ -65,9 +65,10 @@ export default function ReportsSent() {
     setFilteredReports(filtered);
   }, [reports, typeFilter, statusFilter, searchQuery]);
 
-  const downloadPdf = (filename) => {
+  const downloadPdf = (filename, sha256) => {
     if (!filename) return;
-    window.open(`${API_BASE}/api/pdf/${filename}`, '_blank');
+    const version = sha256 ? `?sha256=${sha256}` : '';
+    window.open(`${API_BASE}/api/pdf/${filename}${version}`, '_blank');
     toast.success('PDF download initiated');
   };
 
@@ -162,7 +163,7 @@ export default function ReportsSent() {
                     <td className="py-3 px-4"><Badge className={`text-[10px] ${STATUS_COLORS[r.delivery_status] || ''}`}>{r.delivery_status}</Badge></td>
                     <td className="py-3 px-4">
                       {r.pdf_filename && (
-                        <Button variant="ghost" size="sm" className="h-7 text-xs text-blue-400" onClick={() => downloadPdf(r.pdf_filename)} data-testid={`download-report-${r.report_id}`}>
+                        <Button variant="ghost" size="sm" className="h-7 text-xs text-blue-400" onClick={() => downloadPdf(r.pdf_filename, r.pdf_sha256)} data-testid={`download-report-${r.report_id}`}>
                           <Eye className="w-3 h-3 mr-1" /> View
                         </Button>
                       )}
@@ -48,7 +48,7 @@ export default function WarRoom() {
         toast.success('DPB Notice generated');
       } else if (action === 'notify') {
         res = await axios.post(`${API}/breach/notify-users`, { channel }, authHeaders());
-        toast.success(`Notifications sent to ${res.data.count} users`);
+        toast.success(`Sending personalised notices to ${res.data.count} users`);
       } else if (action === 'close') {
         res = await axios.post(`${API}/breach/close`, {}, authHeaders());
         toast.success('Incident closed. Audit report generated.');
@@ -0,0 +1,47 @@
+"""Bulk customer import: column-wise validation, duplicates within and across batches."""
+import io
+import json
+
+from csv_manager import CSVManager
+
+RECORDS = [
+    {'name': 'Aarav Sharma', 'email': 'aarav@example.com', 'phone': '+91 98765-43210'},
+    {'name': '  ', 'email': 'blank@example.com', 'phone': '9876543210'},
+    {'name': 'No Email', 'email': 'not-an-email', 'phone': '9876543210'},
+    {'name': 'Bad Phone', 'email': 'bad.phone@example.com', 'phone': '12345'},
+    {'name': 'Aarav Again', 'email': 'AARAV@example.com', 'phone': '9876543210'},
+    # The first use of this email fails on its phone, so the second one claims it
+    {'name': 'Riya Kapoor', 'email': 'riya@example.com', 'phone': 'x'},
+    {'name': 'Riya Kapoor', 'email': 'riya@example.com', 'phone': '(0) 9123456789'},
+    {'name': 'Existing', 'email': 'existing@example.com', 'phone': 9123456789},
+    'not an object',
+    {'name': 'Diya Joshi', 'email': 'diya@example.com', 'phone': 9123456789},
+]
+
+
+def _ndjson(records):
+    return io.BytesIO(''.join(json.dumps(r) + '\n' for r in records).encode())
+
+
+def test_import_reports_each_bad_line(tmp_path):
+    mgr = CSVManager(tmp_path)
+    mgr.append_row('customers.csv', {'customer_id': 'CUST-0001', 'name': 'Existing', 'email': 'Existing@Example.com'})
+    for batch_size in (3, 100):
+        result = mgr.import_customers(_ndjson(RECORDS), fmt='ndjson', batch_size=batch_size)
+        if batch_size == 3:
+            assert result['imported'] == 3
+            assert [(e['line'], e['error']) for e in result['errors']] == [
+                (2, 'name is required'),
+                (3, "invalid email: 'not-an-email'"),
+                (4, "invalid phone: '12345'"),
+                (5, 'duplicate email: AARAV@example.com'),
+                (6, "invalid phone: 'x'"),
+                (8, 'duplicate email: existing@example.com'),
+                (9, 'expected a JSON object'),
+            ]
+        else:
+            # Everything valid the first time is now already a customer
+            assert result['imported'] == 0
+    emails = [row['email'] for row in mgr.read_csv('customers.csv')]
+    assert emails == ['Existing@Example.com', 'aarav@example.com', 'riya@example.com', 'diya@example.com']
+    assert mgr.find_customer_by_email('diya@example.com')['phone'] == '9123456789'
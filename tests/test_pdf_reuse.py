@@ -0,0 +1,46 @@
+"""Render reuse: identical records share one stored PDF, dated documents are rendered every time."""
+from datetime import datetime, timezone
+
+import pytest
+
+import pdf_service
+from pdf_service import PDFService
+
+DAY_ONE = datetime(2026, 3, 1, 9, 30, tzinfo=timezone.utc)
+DAY_TWO = datetime(2026, 3, 2, 9, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Set the render time PDFService stamps documents with."""
+    now = {'value': DAY_ONE}
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now['value']
+
+    monkeypatch.setattr(pdf_service, 'datetime', FrozenDatetime)
+    return now
+
+
+@pytest.mark.parametrize('kind, args', [
+    ('deletion_certificate', ('CUST-0001', ['name', 'email', 'phone'])),
+    ('vector_analysis', ({'likely_source': 'Phishing', 'confidence': 'High', 'findings': ['Reused password']},)),
+])
+def test_dated_documents_are_rendered_on_each_day(tmp_path, clock, kind, args):
+    svc = PDFService(tmp_path)
+    first, first_sha, _ = svc.generate(kind, *args)
+    clock['value'] = DAY_TWO
+    second, second_sha, _ = svc.generate(kind, *args)
+    assert first != second
+    assert first_sha != second_sha
+
+
+def test_unchanged_customer_export_is_reused(tmp_path, clock):
+    svc = PDFService(tmp_path)
+    customer = {'customer_id': 'CUST-0001', 'name': 'Aarav Sharma', 'updated_at': '2026-02-27T10:00:00+00:00'}
+    first = svc.generate_data_export(customer)
+    clock['value'] = DAY_TWO
+    assert svc.generate_data_export(customer)[1] == first[1]
+    assert svc.generate_data_export({**customer, 'updated_at': '2026-03-02T08:00:00+00:00'})[1] != first[1]
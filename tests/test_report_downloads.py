@@ -0,0 +1,22 @@
+"""mark_report_downloaded flags the report row of the downloaded file version."""
+import pytest
+
+from csv_manager import CSVManager
+
+
+@pytest.mark.parametrize('backend', ['csv', 'sqlite'])
+def test_pinned_download_marks_that_version(tmp_path, backend):
+    mgr = CSVManager(tmp_path, backend=backend)
+    for report_id, sha256 in (('REP-0001', 'a' * 64), ('REP-0002', 'b' * 64)):
+        mgr.append_row('reports_sent.csv', {'report_id': report_id, 'pdf_filename': 'data_export_CUST-0001.pdf',
+                                            'pdf_sha256': sha256, 'delivery_status': 'SENT'})
+
+    def status(report_id):
+        return mgr.storage.find('reports_sent.csv', 'report_id', report_id)['delivery_status']
+
+    assert mgr.mark_report_downloaded('data_export_CUST-0001.pdf', 'b' * 64)
+    assert (status('REP-0001'), status('REP-0002')) == ('SENT', 'DOWNLOADED')
+    assert not mgr.mark_report_downloaded('data_export_CUST-0001.pdf', 'b' * 64)
+    assert not mgr.mark_report_downloaded('other.pdf', 'a' * 64)
+    assert mgr.mark_report_downloaded('data_export_CUST-0001.pdf')
+    assert status('REP-0001') == 'DOWNLOADED'
@@ -0,0 +1,49 @@
+"""Parquet / Arrow IPC snapshots read back to the rows they were written from."""
+from datetime import datetime, timezone
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq  # noqa: E402
+
+import synthetic  # noqa: E402
+from csv_manager import CSVManager  # noqa: E402
+from snapshot_export import snapshot_name, write_snapshot  # noqa: E402
+
+
+TIME_COLUMNS = {'customers.csv': 'created_at', 'mail_replies.csv': 'received_at', 'reports_sent.csv': 'generated_at'}
+
+
+def _as_stored(value, typed):
+    """What a snapshot value reads back as, from the CSV text it was written from."""
+    if not typed:
+        return value
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_snapshot_round_trip(tmp_path, fmt):
+    mgr = CSVManager(tmp_path / 'data')
+    synthetic.generate(mgr, 300, 250, 200, seed=7)
+    for filename, time_column in TIME_COLUMNS.items():
+        out = tmp_path / snapshot_name(filename, fmt)
+        # A small row group size: several groups, and Arrow dictionaries extended by deltas
+        result = write_snapshot(mgr, filename, str(out), fmt, row_group_size=64)
+        rows = mgr.read_csv(filename)
+        assert result['rows'] == len(rows)
+        assert result['row_groups'] == -(-len(rows) // 64)
+
+        if fmt == 'parquet':
+            table = pq.read_table(out)
+        else:
+            with pa.ipc.open_file(out) as reader:
+                table = reader.read_all()
+        assert table.schema.metadata[b'source'] == filename.encode()
+        assert {f: str(table.schema.field(f).type) for f in table.column_names} == result['schema']
+        assert result['schema'][time_column] == 'timestamp[us, tz=UTC]'
+
+        typed = {f: t.startswith('timestamp') for f, t in result['schema'].items()}
+        assert table.to_pylist() == [{f: _as_stored(v, typed[f]) for f, v in row.items()} for row in rows]
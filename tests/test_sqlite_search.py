@@ -0,0 +1,31 @@
+"""SQLite search through its key table returns what the resident CSV indexes return."""
+import synthetic
+from csv_manager import CSVManager
+
+QUERIES = [
+    {'status': 'ACTIVE'}, {'status': 'deleted'}, {'phone': '98'}, {'phone': '+91 9'}, {'phone': ''},
+    {'name': 'ar'}, {'name': ''}, {'name': '!!'}, {'name': 'ar', 'status': 'ACTIVE'},
+]
+
+
+def test_search_matches_csv_backend(tmp_path):
+    csv_mgr = CSVManager(tmp_path / 'csv')
+    synthetic.generate(csv_mgr, 2000, 0, 0, seed=5)
+    sqlite_mgr = CSVManager(tmp_path / 'sqlite', backend='sqlite')
+    sqlite_mgr.append_rows('customers.csv', csv_mgr.read_csv('customers.csv'))
+    some = csv_mgr.read_csv('customers.csv')[::97]
+    queries = QUERIES + [{'name': c['name'][:-2], 'phone': c['phone'][-10:][:5]} for c in some]
+    for criteria in queries:
+        for limit in (None, 20):
+            expected = [row['customer_id'] for row in csv_mgr.search_customers(criteria, limit or 10 ** 9)]
+            assert [row['customer_id'] for row in sqlite_mgr.search_customers(criteria, limit or 10 ** 9)] == expected
+
+
+def test_updates_move_search_keys(tmp_path):
+    mgr = CSVManager(tmp_path / 'sqlite', backend='sqlite')
+    mgr.append_row('customers.csv', {'customer_id': 'CUST-0001', 'name': 'Aarav Sharma', 'phone': '9876543210', 'status': 'ACTIVE'})
+    with mgr.transaction() as tx:
+        tx.update_row('customers.csv', 'customer_id', 'CUST-0001', {'name': 'Priya Patel', 'phone': '+91 91234 56789'})
+    assert mgr.search_customers({'name': 'aarav'}) == []
+    assert mgr.search_customers({'phone': '98765'}) == []
+    assert [row['customer_id'] for row in mgr.search_customers({'name': 'priya pat', 'phone': '9123'})] == ['CUST-0001']
@@ -0,0 +1,105 @@
+"""Multi-table commits in multiprocess (flock) mode, with a second process committing alongside."""
+import multiprocessing
+import os
+
+from csv_manager import CSVManager
+
+SPAWN = multiprocessing.get_context('spawn')
+
+
+def _customer(n):
+    return {'customer_id': f'CUST-{n:04d}', 'name': f'Customer {n}', 'email': f'c{n}@example.com', 'status': 'ACTIVE'}
+
+
+def _session(n):
+    return {'session_id': f'S-{n}', 'admin_email': 'admin@example.com', 'login_time': '2026-10-01T00:00:00+00:00'}
+
+
+def _commit_and_die(data_dir):
+    """Commit to customers.csv, then die between writing the roll-forward log and the renames."""
+    mgr = CSVManager(data_dir, multiprocess=True)
+    mgr.storage._finish_transaction = lambda filenames, log_path: os._exit(0)
+    with mgr.transaction() as tx:
+        tx.append_row('customers.csv', _customer(1))
+
+
+def _commit_sessions(data_dir, count):
+    mgr = CSVManager(data_dir, multiprocess=True)
+    for n in range(count):
+        with mgr.transaction() as tx:
+            tx.append_row('admin_access.csv', _session(n))
+
+
+def _commit_customers(data_dir, count):
+    mgr = CSVManager(data_dir, multiprocess=True)
+    for n in range(count):
+        with mgr.transaction() as tx:
+            tx.append_row('customers.csv', _customer(n))
+
+
+def _seal_and_die(data_dir):
+    """Seal mail_replies, then die between writing the roll-forward log and the renames."""
+    mgr = CSVManager(data_dir, multiprocess=True)
+    mgr.storage._finish_transaction = lambda filenames, log_path: os._exit(0)
+    mgr.storage.seal('mail_replies.csv', '2026-01')
+
+
+def _run(target, *args):
+    process = SPAWN.Process(target=target, args=args)
+    process.start()
+    process.join(60)
+    assert process.exitcode == 0
+
+
+def test_crashed_commit_survives_a_commit_on_another_table(tmp_path):
+    data_dir = tmp_path / 'data'
+    survivor = CSVManager(data_dir, multiprocess=True)
+    _run(_commit_and_die, data_dir)
+    assert (data_dir / 'customers.csv.tmp').exists()
+
+    # A commit on a disjoint table must neither overwrite nor unlink the dead commit's log
+    with survivor.transaction() as tx:
+        tx.append_row('admin_access.csv', _session(1))
+
+    recovered = CSVManager(data_dir, multiprocess=True)
+    assert [row['customer_id'] for row in recovered.read_csv('customers.csv')] == ['CUST-0001']
+    assert [row['session_id'] for row in recovered.read_csv('admin_access.csv')] == ['S-1']
+    assert not list(data_dir.glob('.transaction*'))
+
+
+def test_crashed_seal_survives_a_commit_on_another_table(tmp_path):
+    data_dir = tmp_path / 'data'
+    survivor = CSVManager(data_dir, multiprocess=True)
+    survivor.append_rows('mail_replies.csv', [
+        {'request_id': 'REQ-OLD', 'received_at': '2025-03-02T00:00:00+00:00', 'action_status': 'COMPLETED'},
+        {'request_id': 'REQ-NEW', 'received_at': '2026-02-02T00:00:00+00:00', 'action_status': 'COMPLETED'},
+    ])
+    _run(_seal_and_die, data_dir)
+
+    with survivor.transaction() as tx:
+        tx.append_row('customers.csv', _customer(1))
+
+    recovered = CSVManager(data_dir, multiprocess=True)
+    assert [row['request_id'] for row in recovered.read_csv('mail_replies.csv')] == ['REQ-OLD', 'REQ-NEW']
+    assert [row['request_id'] for row in recovered.iter_rows('mail_replies.csv', since='2026-01-01')] == ['REQ-NEW']
+    assert len(recovered.storage._current('mail_replies.csv').rows) == 1
+    assert [row['customer_id'] for row in recovered.read_csv('customers.csv')] == ['CUST-0001']
+    assert not list(data_dir.glob('.transaction*'))
+
+
+def test_concurrent_commits_on_disjoint_tables(tmp_path):
+    data_dir = tmp_path / 'data'
+    CSVManager(data_dir, multiprocess=True)
+    processes = [SPAWN.Process(target=_commit_customers, args=(data_dir, 40)),
+                 SPAWN.Process(target=_commit_sessions, args=(data_dir, 40))]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(120)
+        assert process.exitcode == 0
+
+    mgr = CSVManager(data_dir, multiprocess=True)
+    assert len(mgr.read_csv('customers.csv')) == 40
+    assert len(mgr.read_csv('admin_access.csv')) == 40
+    assert not list(data_dir.glob('.transaction*'))
+    assert not list(data_dir.glob('*.tmp'))